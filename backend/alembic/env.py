@@ -11,6 +11,7 @@ sys.path.append(os.path.dirname(os.path.dirname(__file__)))
 from app.config import settings
 from app.database import Base
 from app.models import *  # Импортируем все модели
+from app.models.application_constraints import application_user_internship_unique  # noqa: F401 - регистрируем индекс заявок
 
 # this is the Alembic Config object, which provides
 # access to the values within the .ini file in use.
@@ -1,6 +1,12 @@
-from fastapi import APIRouter
+from fastapi import APIRouter, Depends
 
-api_router = APIRouter()
+from ..db_routing import track_writes
+from ..utils.admission import admission, statement_timeout
+from ..utils.rate_limit import rate_limit
+
+# Общий лимит частоты по IP (в памяти воркера) и read-your-writes: запросы на запись
+# на короткое время переключают чтение клиента на основную БД
+api_router = APIRouter(dependencies=[Depends(rate_limit("api")), Depends(track_writes)])
 
 from .auth import router as auth_router
 from .internships import router as internships_router
@@ -8,10 +14,51 @@ from .applications import router as applications_router
 from .admin import router as admin_router
 from .files import router as files_router
 from .users import router as users_router
+from .reference import router as reference_router
+
+# Приоритет доступа к БД и таймаут SQL-запросов для каждой группы маршрутов:
+# при перегрузке первыми отбрасываются админские отчеты, последними - подача заявок
+def _db_limits(priority: str, timeout_ms: int):
+    return [Depends(admission(priority)), Depends(statement_timeout(timeout_ms))]
+
+api_router.include_router(auth_router, prefix="/auth", tags=["auth"], dependencies=_db_limits("normal", 3000))
+api_router.include_router(internships_router, prefix="/internships", tags=["internships"], dependencies=_db_limits("normal", 3000))
+api_router.include_router(applications_router, prefix="/applications", tags=["applications"], dependencies=_db_limits("high", 5000))
+api_router.include_router(admin_router, prefix="/admin", tags=["admin"], dependencies=_db_limits("low", 10000))
+api_router.include_router(files_router, prefix="/files", tags=["files"], dependencies=_db_limits("normal", 3000))
+api_router.include_router(users_router, prefix="/users", tags=["users"], dependencies=_db_limits("normal", 3000))
+api_router.include_router(reference_router, prefix="/reference", tags=["reference"], dependencies=_db_limits("normal", 3000))
+
+# Фоновые задачи (выполняются только в воркере-лидере)
+from ..utils.scheduler import scheduler
+from ..utils.lifecycle import run_internship_lifecycle, LIFECYCLE_INTERVAL_SECONDS
+from ..utils.rollups import refresh_rollups, ROLLUP_INTERVAL_SECONDS
+from ..utils.events import application_events
+from ..utils.storage_gc import run_storage_reconciliation, STORAGE_GC_INTERVAL_SECONDS
+from ..utils.resume_index import run_resume_extraction, shutdown_extraction_pool, EXTRACTION_INTERVAL_SECONDS
+from ..utils.saved_searches import send_saved_search_digests, DIGEST_INTERVAL_SECONDS
+from ..utils.review_queue import purge_expired_leases, LEASE_PURGE_INTERVAL_SECONDS
+from ..utils.idempotency import purge_expired_idempotency_keys, IDEMPOTENCY_PURGE_INTERVAL_SECONDS
+from ..utils.revocation import revocations, purge_expired_revocations, REVOCATION_REBUILD_SECONDS
+from ..utils.reference import reference_registry
+
+scheduler.register("internship_lifecycle", LIFECYCLE_INTERVAL_SECONDS, run_internship_lifecycle)
+scheduler.register("application_rollups", ROLLUP_INTERVAL_SECONDS, refresh_rollups)
+scheduler.register("storage_reconciliation", STORAGE_GC_INTERVAL_SECONDS, run_storage_reconciliation)
+scheduler.register("resume_extraction", EXTRACTION_INTERVAL_SECONDS, run_resume_extraction)
+scheduler.register("saved_search_digests", DIGEST_INTERVAL_SECONDS, send_saved_search_digests)
+scheduler.register("review_lease_purge", LEASE_PURGE_INTERVAL_SECONDS, purge_expired_leases)
+scheduler.register("idempotency_key_purge", IDEMPOTENCY_PURGE_INTERVAL_SECONDS, purge_expired_idempotency_keys)
+scheduler.register("revocation_purge", REVOCATION_REBUILD_SECONDS, purge_expired_revocations)
 
-api_router.include_router(auth_router, prefix="/auth", tags=["auth"])
-api_router.include_router(internships_router, prefix="/internships", tags=["internships"])
-api_router.include_router(applications_router, prefix="/applications", tags=["applications"])
-api_router.include_router(admin_router, prefix="/admin", tags=["admin"])
-api_router.include_router(files_router, prefix="/files", tags=["files"])
-api_router.include_router(users_router, prefix="/users", tags=["users"])
+api_router.add_event_handler("startup", scheduler.start)
+api_router.add_event_handler("startup", application_events.start)
+# Список отозванных токенов синхронизируется в каждом воркере, а не только в лидере
+api_router.add_event_handler("startup", revocations.start)
+# Справочники тоже загружаются при старте и обновляются в каждом воркере
+api_router.add_event_handler("startup", reference_registry.start)
+api_router.add_event_handler("shutdown", scheduler.stop)
+api_router.add_event_handler("shutdown", application_events.stop)
+api_router.add_event_handler("shutdown", revocations.stop)
+api_router.add_event_handler("shutdown", reference_registry.stop)
+api_router.add_event_handler("shutdown", shutdown_extraction_pool)
@@ -1,38 +1,76 @@
+from datetime import date, timedelta
 from typing import List, Optional
-from fastapi import APIRouter, Depends, HTTPException, status, Query
+from fastapi import APIRouter, Depends, File, Header, HTTPException, status, Query, Request, Response, UploadFile
+from fastapi.responses import StreamingResponse
 from sqlalchemy.orm import Session, joinedload
-from sqlalchemy import and_, or_, func, desc
+from sqlalchemy import and_, or_, func
 
 from ..database import get_db
+from ..db_routing import get_read_db
 from ..models.user import User
 from ..models.internship import Internship
 from ..models.application import Application
 from ..models.campus import Campus
 from ..models.department import Department
+from ..models.analytics import ApplicationStatusChange
+from ..models.review_lease import ReviewLease
 from ..schemas.application import ApplicationResponse, ApplicationStatusUpdate
 from ..schemas.user import UserResponse
 from ..schemas.internship import InternshipResponse
-from ..auth.dependencies import require_admin
+from ..schemas.review_queue import ReviewClaimRequest, ReviewLeaseRequest
+from ..auth.tokens import Principal, require_admin_principal, revoke_user_tokens
+from ..utils.events import application_events
+from ..utils.rollups import get_trends
+from ..utils.admission import statement_timeout
+from ..utils.review_queue import (
+    VERSION_FIELDS, application_version, claim_applications, lease_holder, release_leases, renew_leases
+)
+from ..utils.serialization import item_response, json_response, list_response, serialize_item
+from ..utils.fieldsets import Fields, fieldset, load_options, project_schema
+from ..utils.file_handler import query_bundle_files, zip_response
+from ..utils.resume_index import extraction_progress, resume_search_filter, retry_failed_extractions
+from ..utils.seasons import optional_season, season_filter, selected_season
+from ..utils.archive import archived_application, archived_applications, count_by_status, is_archived, top_internships
+from ..utils.profiling import ProfiledRoute, profile_store
+from ..utils.roster_import import MAX_ROSTER_BYTES, RosterError, import_roster, parse_roster
+from ..utils.http_cache import cache_headers, if_match_satisfied, is_not_modified, not_modified_response
+from .applications import application_list_validators, detail_loaders
 
-router = APIRouter()
+router = APIRouter(route_class=ProfiledRoute)
 
 @router.get("/applications", response_model=List[ApplicationResponse])
 async def get_all_applications(
+    request: Request,
     skip: int = Query(0, ge=0),
     limit: int = Query(50, ge=1, le=100),
     status_filter: Optional[str] = Query(None),
     internship_id: Optional[int] = Query(None),
     search: Optional[str] = Query(None),
-    current_user: User = Depends(require_admin),
-    db: Session = Depends(get_db)
+    resume_q: Optional[str] = Query(None, min_length=2, max_length=200),
+    season: int = Depends(selected_season),
+    fields: Fields = Depends(fieldset(ApplicationResponse)),
+    current_user: Principal = Depends(require_admin_principal),
+    db: Session = Depends(get_read_db)
 ):
-    """Получить все заявки (только для админов)"""
+    """Получить все заявки сезона (только для админов)
+    
+    resume_q - поиск по тексту загруженных резюме и других файлов заявки.
+    season - учебный год, по умолчанию текущий; архивные сезоны читаются из архива.
+    """
+    
+    schema = project_schema(ApplicationResponse, fields)
+    if is_archived(db, season):
+        if resume_q:
+            raise HTTPException(
+                status_code=status.HTTP_400_BAD_REQUEST,
+                detail="Поиск по тексту резюме недоступен для архивных сезонов"
+            )
+        return list_response(archived_applications(
+            db, season, internship_id=internship_id, status_filter=status_filter,
+            search=search, skip=skip, limit=limit
+        ), schema)
     
-    query = db.query(Application).options(
-        joinedload(Application.user),
-        joinedload(Application.internship),
-        joinedload(Application.files)
-    )
+    query = db.query(Application).filter(season_filter(Application.created_at, season))
     
     # Фильтр по статусу
     if status_filter:
@@ -52,26 +90,71 @@ async def get_all_applications(
             )
         )
     
-    applications = query.order_by(Application.created_at.desc()).offset(skip).limit(limit).all()
+    # Поиск по тексту файлов (текст извлекается в фоне, новые файлы находятся не сразу)
+    if resume_q:
+        query = query.filter(resume_search_filter(db, resume_q))
     
-    return applications
+    etag, last_modified = application_list_validators(query)
+    headers = cache_headers(etag, last_modified)
+    if is_not_modified(request, etag, last_modified):
+        return not_modified_response(headers)
+    
+    applications = query.options(*load_options(Application, fields, {
+        "user": joinedload(Application.user),
+        "internship": joinedload(Application.internship),
+        "files": joinedload(Application.files),
+    })).order_by(Application.created_at.desc()).offset(skip).limit(limit).all()
+    
+    return list_response(applications, schema, headers=headers)
 
 @router.put("/applications/{application_id}/status")
 async def update_application_status(
     application_id: int,
     status_data: ApplicationStatusUpdate,
-    current_user: User = Depends(require_admin),
+    if_match: Optional[str] = Header(None),
+    current_user: Principal = Depends(require_admin_principal),
     db: Session = Depends(get_db)
 ):
-    """Обновить статус заявки (только для админов)"""
+    """Обновить статус заявки (только для админов)
+    
+    If-Match с версией заявки (ETag из карточки или из очереди рассмотрения)
+    защищает от перезаписи чужого решения: при несовпадении - 412.
+    """
     
-    application = db.query(Application).filter(Application.id == application_id).first()
+    # Блокировка строки держится только до коммита: проверка версии и запись атомарны
+    application = db.query(Application).filter(
+        Application.id == application_id
+    ).with_for_update().first()
     if not application:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
             detail="Заявка не найдена"
         )
     
+    if not if_match_satisfied(if_match, application_version(application)):
+        db.rollback()
+        raise HTTPException(
+            status_code=status.HTTP_412_PRECONDITION_FAILED,
+            detail="Заявка изменена другим рецензентом, обновите данные"
+        )
+    
+    holder = lease_holder(db, application_id)
+    if holder is not None and holder != current_user.id:
+        db.rollback()
+        raise HTTPException(
+            status_code=status.HTTP_409_CONFLICT,
+            detail="Заявка взята в работу другим рецензентом"
+        )
+    
+    # Записываем смену статуса в историю (используется аналитикой)
+    if application.status != status_data.status:
+        db.add(ApplicationStatusChange(
+            application_id=application.id,
+            from_status=application.status,
+            to_status=status_data.status,
+            changed_by_id=current_user.id
+        ))
+    
     # Обновляем статус
     application.status = status_data.status
     if status_data.feedback:
@@ -83,34 +166,119 @@ async def update_application_status(
     
     application.reviewed_by_id = current_user.id
     
+    # Решение принято - заявка уходит из очереди рассмотрения
+    if holder is not None and application.status != "pending":
+        db.query(ReviewLease).filter(
+            ReviewLease.application_id == application_id
+        ).delete(synchronize_session=False)
+    
+    # Уведомляем студента через push-канал (событие уйдет после коммита)
+    application_events.publish(db, application.user_id, "application_status", {
+        "application_id": application.id,
+        "internship_id": application.internship_id,
+        "status": application.status,
+    })
+    
     db.commit()
     db.refresh(application)
     
-    # TODO: Отправить уведомление студенту
+    version = application_version(application)
+    return json_response(
+        {
+            "message": "Статус заявки обновлен",
+            "application": serialize_item(application, ApplicationResponse),
+            "version": version,
+        },
+        headers={"ETag": version}
+    )
+
+@router.post("/review-queue/claim")
+async def claim_review_applications(
+    claim: ReviewClaimRequest,
+    current_user: Principal = Depends(require_admin_principal),
+    db: Session = Depends(get_db)
+):
+    """Взять в работу следующие заявки на рассмотрении
+    
+    Заявки закрепляются за рецензентом до lease_expires_at; другие рецензенты
+    их не получат. Аренду можно продлить или вернуть заявки в очередь.
+    """
+    
+    claimed_ids, expires_at = claim_applications(
+        db,
+        current_user.id,
+        claim.limit,
+        internship_id=claim.internship_id,
+        campus_id=claim.campus_id,
+        department_id=claim.department_id
+    )
     
-    return {"message": "Статус заявки обновлен", "application": application}
+    applications = db.query(Application).options(*detail_loaders().values()).filter(
+        Application.id.in_(claimed_ids)
+    ).all() if claimed_ids else []
+    by_id = {application.id: application for application in applications}
+    
+    items = []
+    for application_id in claimed_ids:
+        application = by_id.get(application_id)
+        if application is not None:
+            items.append({
+                **serialize_item(application, ApplicationResponse),
+                "version": application_version(application),
+            })
+    
+    return json_response({"lease_expires_at": expires_at.isoformat(), "items": items})
+
+@router.post("/review-queue/renew")
+async def renew_review_leases(
+    lease_data: ReviewLeaseRequest,
+    current_user: Principal = Depends(require_admin_principal),
+    db: Session = Depends(get_db)
+):
+    """Продлить аренду взятых заявок (истекшие продлить нельзя - их нужно взять заново)"""
+    renewed_ids, expires_at = renew_leases(db, current_user.id, lease_data.application_ids)
+    return {"application_ids": renewed_ids, "lease_expires_at": expires_at}
+
+@router.post("/review-queue/release")
+async def release_review_leases(
+    lease_data: ReviewLeaseRequest,
+    current_user: Principal = Depends(require_admin_principal),
+    db: Session = Depends(get_db)
+):
+    """Вернуть взятые заявки в очередь"""
+    released = release_leases(db, current_user.id, lease_data.application_ids)
+    return {"message": f"Возвращено в очередь заявок: {released}"}
 
 @router.get("/applications/{application_id}", response_model=ApplicationResponse)
 async def get_application_admin(
     application_id: int,
-    current_user: User = Depends(require_admin),
-    db: Session = Depends(get_db)
+    response: Response,
+    fields: Fields = Depends(fieldset(ApplicationResponse)),
+    current_user: Principal = Depends(require_admin_principal),
+    db: Session = Depends(get_read_db)
 ):
-    """Получить заявку для админа"""
+    """Получить заявку для админа (заявки прошлых сезонов - из архива)"""
     
     application = db.query(Application).options(
-        joinedload(Application.user),
-        joinedload(Application.internship),
-        joinedload(Application.files),
-        joinedload(Application.reviews)
+        *load_options(Application, fields, detail_loaders(), required=VERSION_FIELDS)
     ).filter(Application.id == application_id).first()
     
     if not application:
+        # Архивная заявка только для чтения - без версии для If-Match
+        application = archived_application(db, application_id)
+        if application is not None:
+            return item_response(application, project_schema(ApplicationResponse, fields))
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
             detail="Заявка не найдена"
         )
     
+    # Версия для If-Match при изменении статуса
+    headers = {"ETag": application_version(application)}
+    if fields is not None:
+        return item_response(application, project_schema(ApplicationResponse, fields), headers=headers)
+    
+    response.headers.update(headers)
     return application
 
 @router.get("/users", response_model=List[UserResponse])
@@ -119,8 +287,9 @@ async def get_all_users(
     limit: int = Query(50, ge=1, le=100),
     role_filter: Optional[str] = Query(None),
     search: Optional[str] = Query(None),
-    current_user: User = Depends(require_admin),
-    db: Session = Depends(get_db)
+    fields: Fields = Depends(fieldset(UserResponse)),
+    current_user: Principal = Depends(require_admin_principal),
+    db: Session = Depends(get_read_db)
 ):
     """Получить всех пользователей (только для админов)"""
     
@@ -141,16 +310,49 @@ async def get_all_users(
             )
         )
     
-    users = query.order_by(User.created_at.desc()).offset(skip).limit(limit).all()
+    users = query.options(*load_options(User, fields, {})).order_by(
+        User.created_at.desc()
+    ).offset(skip).limit(limit).all()
     
-    return users
+    return list_response(users, project_schema(UserResponse, fields))
+
+@router.post("/users/import")
+async def import_users(
+    file: UploadFile = File(...),
+    current_user: Principal = Depends(require_admin_principal)
+):
+    """Импортировать студентов из CSV (только для админов)
+
+    Колонки: email, first_name, last_name, student_id, необязательные course, gpa,
+    phone, password и skills (теги через ";"). Ответ - поток NDJSON с ошибками
+    по строкам и прогрессом; студентам без пароля он генерируется и
+    возвращается в событии created.
+    """
 
-@router.get("/stats/dashboard")
+    content = await file.read(MAX_ROSTER_BYTES + 1)
+    if len(content) > MAX_ROSTER_BYTES:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=f"Размер файла не должен превышать {MAX_ROSTER_BYTES // (1024 * 1024)}MB"
+        )
+    try:
+        rows, errors = parse_roster(content)
+    except RosterError as error:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=str(error))
+
+    return StreamingResponse(
+        import_roster(rows, errors),
+        media_type="application/x-ndjson",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    )
+
+@router.get("/stats/dashboard", dependencies=[Depends(statement_timeout(30000))])
 async def get_admin_dashboard_stats(
-    current_user: User = Depends(require_admin),
-    db: Session = Depends(get_db)
+    season: int = Depends(selected_season),
+    current_user: Principal = Depends(require_admin_principal),
+    db: Session = Depends(get_read_db)
 ):
-    """Получить статистику для админ-панели"""
+    """Получить статистику для админ-панели (заявки - за сезон, по умолчанию текущий)"""
     
     # Статистика стажировок
     internship_stats = {
@@ -160,13 +362,14 @@ async def get_admin_dashboard_stats(
         "expired": db.query(Internship).filter(Internship.status == "expired").count(),
     }
     
-    # Статистика заявок
+    # Статистика заявок за сезон
+    application_counts = count_by_status(db, season)
     application_stats = {
-        "total": db.query(Application).count(),
-        "pending": db.query(Application).filter(Application.status == "pending").count(),
-        "reviewed": db.query(Application).filter(Application.status == "reviewed").count(),
-        "accepted": db.query(Application).filter(Application.status == "accepted").count(),
-        "rejected": db.query(Application).filter(Application.status == "rejected").count(),
+        "total": sum(application_counts.values()),
+        "pending": application_counts.get("pending", 0),
+        "reviewed": application_counts.get("reviewed", 0),
+        "accepted": application_counts.get("accepted", 0),
+        "rejected": application_counts.get("rejected", 0),
     }
     
     # Статистика пользователей
@@ -177,13 +380,8 @@ async def get_admin_dashboard_stats(
         "active": db.query(User).filter(User.is_active == True).count(),
     }
     
-    # Топ стажировок по количеству заявок
-    top_internships = db.query(
-        Internship.title,
-        func.count(Application.id).label("application_count")
-    ).join(Application).group_by(Internship.id, Internship.title).order_by(
-        desc("application_count")
-    ).limit(5).all()
+    # Топ стажировок по количеству заявок за сезон
+    top = top_internships(db, season)
     
     # Статистика по корпусам
     campus_stats = db.query(
@@ -192,12 +390,13 @@ async def get_admin_dashboard_stats(
     ).join(Internship).group_by(Campus.id, Campus.name).all()
     
     return {
+        "season": season,
         "internships": internship_stats,
         "applications": application_stats,
         "users": user_stats,
         "top_internships": [
             {"title": title, "applications": count} 
-            for title, count in top_internships
+            for title, count in top
         ],
         "campus_distribution": [
             {"campus": name, "internships": count}
@@ -205,13 +404,111 @@ async def get_admin_dashboard_stats(
         ]
     }
 
+@router.get("/stats/trends")
+async def get_application_trends(
+    granularity: str = Query("week", regex="^(day|week)$"),
+    dimension: str = Query("all", regex="^(all|campus|department|tag)$"),
+    dimension_id: Optional[int] = Query(None),
+    date_from: Optional[date] = Query(None),
+    date_to: Optional[date] = Query(None),
+    current_user: Principal = Depends(require_admin_principal),
+    db: Session = Depends(get_read_db)
+):
+    """Динамика подач, решений и времени рассмотрения по дням/неделям"""
+    
+    date_to = date_to or date.today()
+    if not date_from:
+        date_from = date_to - timedelta(days=90 if granularity == "day" else 365)
+    
+    if date_from > date_to:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="Начало периода позже его окончания"
+        )
+    
+    return {
+        "granularity": granularity,
+        "dimension": dimension,
+        "date_from": date_from,
+        "date_to": date_to,
+        "series": get_trends(db, granularity, dimension, date_from, date_to, dimension_id)
+    }
+
+@router.get("/resume-index/status")
+async def get_resume_index_status(
+    current_user: Principal = Depends(require_admin_principal),
+    db: Session = Depends(get_read_db)
+):
+    """Прогресс извлечения текста из файлов заявок"""
+    return extraction_progress(db)
+
+@router.post("/resume-index/retry")
+async def retry_resume_index(
+    current_user: Principal = Depends(require_admin_principal),
+    db: Session = Depends(get_db)
+):
+    """Повторно поставить в очередь файлы, которые не удалось разобрать"""
+    count = retry_failed_extractions(db)
+    return {"message": f"В очередь возвращено файлов: {count}"}
+
+@router.get("/profiles")
+async def get_profiles(
+    current_user: Principal = Depends(require_admin_principal)
+):
+    """Последние профили запросов этого воркера (заголовок X-Profile или выборка PROFILE_SAMPLE_RATE)"""
+    return json_response([capture.summary() for capture in profile_store.list()])
+
+@router.get("/profiles/{capture_id}")
+async def get_profile(
+    capture_id: str,
+    current_user: Principal = Depends(require_admin_principal)
+):
+    """Профиль запроса: длительность и SQL-запросы с их временем"""
+    return json_response(_get_capture(capture_id).details())
+
+@router.get("/profiles/{capture_id}/speedscope")
+async def get_profile_speedscope(
+    capture_id: str,
+    current_user: Principal = Depends(require_admin_principal)
+):
+    """Профиль в формате speedscope (открывается на https://www.speedscope.app)"""
+    capture = _get_capture(capture_id)
+    return Response(
+        content=capture.speedscope,
+        media_type="application/json",
+        headers={"Content-Disposition": f'attachment; filename="profile_{capture.id}.speedscope.json"'}
+    )
+
+@router.delete("/profiles")
+async def clear_profiles(
+    current_user: Principal = Depends(require_admin_principal)
+):
+    """Удалить сохраненные профили этого воркера"""
+    profile_store.clear()
+    return {"message": "Профили удалены"}
+
+def _get_capture(capture_id: str):
+    capture = profile_store.get(capture_id)
+    if capture is None:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="Профиль не найден (профили хранятся в памяти воркера, который обработал запрос)"
+        )
+    return capture
+
 @router.get("/internships/{internship_id}/applications", response_model=List[ApplicationResponse])
 async def get_internship_applications(
+    request: Request,
     internship_id: int,
-    current_user: User = Depends(require_admin),
-    db: Session = Depends(get_db)
+    season: Optional[int] = Depends(optional_season),
+    fields: Fields = Depends(fieldset(ApplicationResponse)),
+    current_user: Principal = Depends(require_admin_principal),
+    db: Session = Depends(get_read_db)
 ):
-    """Получить все заявки на конкретную стажировку"""
+    """Получить все заявки на конкретную стажировку
+    
+    Без season - заявки из рабочих таблиц, с season - заявки этого сезона (в том числе из архива).
+    """
     
     internship = db.query(Internship).filter(Internship.id == internship_id).first()
     if not internship:
@@ -220,19 +517,54 @@ async def get_internship_applications(
             detail="Стажировка не найдена"
         )
     
-    applications = db.query(Application).options(
-        joinedload(Application.user),
-        joinedload(Application.files)
-    ).filter(Application.internship_id == internship_id).order_by(
-        Application.created_at.desc()
-    ).all()
+    schema = project_schema(ApplicationResponse, fields)
+    if season is not None and is_archived(db, season):
+        return list_response(archived_applications(db, season, internship_id=internship_id), schema)
+    
+    query = db.query(Application).filter(Application.internship_id == internship_id)
+    if season is not None:
+        query = query.filter(season_filter(Application.created_at, season))
+    
+    etag, last_modified = application_list_validators(query)
+    headers = cache_headers(etag, last_modified)
+    if is_not_modified(request, etag, last_modified):
+        return not_modified_response(headers)
+    
+    applications = query.options(*load_options(Application, fields, {
+        "user": joinedload(Application.user),
+        "files": joinedload(Application.files),
+    })).order_by(Application.created_at.desc()).all()
+    
+    return list_response(applications, schema, headers=headers)
+
+@router.get("/internships/{internship_id}/files.zip")
+async def download_internship_files_zip(
+    internship_id: int,
+    file_type: Optional[str] = Query(None, regex="^(resume|portfolio|cover_letter)$"),
+    status_filter: Optional[str] = Query(None, alias="status"),
+    current_user: Principal = Depends(require_admin_principal),
+    db: Session = Depends(get_read_db)
+):
+    """Скачать файлы всех заявок на стажировку одним ZIP-архивом"""
+    
+    if not db.query(Internship.id).filter(Internship.id == internship_id).first():
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="Стажировка не найдена"
+        )
     
-    return applications
+    rows = query_bundle_files(
+        db,
+        Application.internship_id == internship_id,
+        file_type=file_type,
+        status=status_filter
+    )
+    return zip_response(rows, f"internship_{internship_id}_files.zip")
 
 @router.post("/users/{user_id}/toggle-status")
 async def toggle_user_status(
     user_id: int,
-    current_user: User = Depends(require_admin),
+    current_user: Principal = Depends(require_admin_principal),
     db: Session = Depends(get_db)
 ):
     """Активировать/деактивировать пользователя"""
@@ -253,5 +585,9 @@ async def toggle_user_status(
     user.is_active = not user.is_active
     db.commit()
     
+    if not user.is_active:
+        # Уже выданные токены перестают действовать сразу, а не по истечении срока
+        revoke_user_tokens(db, user.id)
+    
     status_text = "активирован" if user.is_active else "деактивирован"
     return {"message": f"Пользователь {status_text}"}
@@ -1,10 +1,15 @@
+import asyncio
 from typing import List, Optional
-from fastapi import APIRouter, Depends, HTTPException, status, Query, UploadFile, File
+from fastapi import APIRouter, Depends, HTTPException, status, Query, UploadFile, File, Header, Request
+from fastapi.concurrency import run_in_threadpool
+from fastapi.responses import StreamingResponse
 from sqlalchemy.orm import Session, joinedload
-from sqlalchemy import and_, or_
+from sqlalchemy import or_, select, literal, func
+from sqlalchemy.dialects.postgresql import insert as pg_insert
+from sqlalchemy.dialects.sqlite import insert as sqlite_insert
+from sqlalchemy.exc import IntegrityError
 
 from ..database import get_db
-from ..models.user import User
 from ..models.internship import Internship
 from ..models.application import Application
 from ..models.file import FileModel
@@ -12,47 +17,126 @@ from ..schemas.application import (
     ApplicationCreate, ApplicationUpdate, ApplicationResponse,
     ApplicationListResponse, ApplicationStatusUpdate
 )
-from ..auth.dependencies import get_current_user, require_admin
-from ..utils.file_handler import save_uploaded_file
+from ..auth.tokens import Principal, get_current_principal
+from ..utils.file_handler import save_uploaded_file, delete_file as delete_stored_file
+from ..utils.recommendations import invalidate_user_recommendations
+from ..utils.events import application_events
+from ..utils.serialization import item_response, list_response
+from ..utils.fieldsets import Fields, fieldset, load_options, project_schema
+from ..utils.profiling import ProfiledRoute
+from ..utils.rate_limit import rate_limit
+from ..utils.http_cache import cache_headers, collection_validators, is_not_modified, not_modified_response
+from ..utils.seasons import current_season, season_filter, selected_season
+from ..utils.archive import archived_application, archived_applications, count_by_status, is_archived
+from ..utils.permissions import authorize_application
+from ..utils.idempotency import find_key, matches, request_fingerprint, store_key
 
-router = APIRouter()
+router = APIRouter(route_class=ProfiledRoute)
+
+# Интервал комментариев-пингов в SSE, чтобы прокси не закрывали соединение
+SSE_HEARTBEAT_SECONDS = 20
 
 @router.get("/", response_model=List[ApplicationListResponse])
 async def get_my_applications(
+    request: Request,
     skip: int = Query(0, ge=0),
     limit: int = Query(50, ge=1, le=100),
     status_filter: Optional[str] = Query(None),
-    current_user: User = Depends(get_current_user),
+    season: int = Depends(selected_season),
+    fields: Fields = Depends(fieldset(ApplicationListResponse)),
+    current_user: Principal = Depends(get_current_principal),
     db: Session = Depends(get_db)
 ):
-    """Получить заявки текущего пользователя"""
+    """Получить заявки текущего пользователя за сезон (по умолчанию - текущий)"""
+    
+    schema = project_schema(ApplicationListResponse, fields)
+    if is_archived(db, season):
+        return list_response(archived_applications(
+            db, season, user_id=current_user.id, status_filter=status_filter, skip=skip, limit=limit
+        ), schema)
     
-    query = db.query(Application).options(
-        joinedload(Application.internship),
-        joinedload(Application.files)
-    ).filter(Application.user_id == current_user.id)
+    query = db.query(Application).filter(
+        Application.user_id == current_user.id,
+        season_filter(Application.created_at, season)
+    )
     
     if status_filter:
         query = query.filter(Application.status == status_filter)
     
-    applications = query.order_by(Application.created_at.desc()).offset(skip).limit(limit).all()
+    etag, last_modified = application_list_validators(query, scope=(current_user.id,))
+    headers = cache_headers(etag, last_modified)
+    if is_not_modified(request, etag, last_modified):
+        return not_modified_response(headers)
+    
+    applications = query.options(*load_options(Application, fields, {
+        "internship": joinedload(Application.internship),
+        "files": joinedload(Application.files),
+    })).order_by(Application.created_at.desc()).offset(skip).limit(limit).all()
     
-    return applications
+    return list_response(applications, schema, headers=headers)
+
+def application_list_validators(query, scope=()):
+    """ETag списка заявок: учитывает и сами заявки, и прикрепленные к ним файлы"""
+    return collection_validators(
+        query.outerjoin(FileModel, FileModel.application_id == Application.id),
+        func.coalesce(Application.updated_at, Application.created_at),
+        func.count(FileModel.id),
+        func.max(FileModel.id),
+        scope=scope
+    )
+
+@router.get("/events")
+async def stream_application_events(
+    request: Request,
+    current_user: Principal = Depends(get_current_principal),
+    db: Session = Depends(get_db)
+):
+    """Поток событий об изменении статусов заявок (Server-Sent Events)"""
+    
+    user_id = current_user.id
+    # Соединение с БД и слот доступа к ней нужны только для аутентификации -
+    # не держим их весь поток
+    db.close()
+    request.state.admission.release()
+    
+    queue = application_events.subscribe(user_id)
+    
+    async def event_stream():
+        try:
+            yield f"retry: {SSE_HEARTBEAT_SECONDS * 1000}\n\n"
+            while True:
+                try:
+                    name, data = await asyncio.wait_for(queue.get(), timeout=SSE_HEARTBEAT_SECONDS)
+                except asyncio.TimeoutError:
+                    if await request.is_disconnected():
+                        break
+                    yield ": ping\n\n"
+                    continue
+                yield f"event: {name}\ndata: {data}\n\n"
+        finally:
+            application_events.unsubscribe(user_id, queue)
+    
+    return StreamingResponse(
+        event_stream(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    )
 
 @router.get("/{application_id}", response_model=ApplicationResponse)
 async def get_application(
     application_id: int,
-    current_user: User = Depends(get_current_user),
+    fields: Fields = Depends(fieldset(ApplicationResponse)),
+    current_user: Principal = Depends(get_current_principal),
     db: Session = Depends(get_db)
 ):
-    """Получить детальную информацию о заявке"""
+    """Получить детальную информацию о заявке (заявки прошлых сезонов - из архива)"""
     
     application = db.query(Application).options(
-        joinedload(Application.internship),
-        joinedload(Application.user),
-        joinedload(Application.files),
-        joinedload(Application.reviews)
+        *load_options(Application, fields, detail_loaders(), required=("user_id",))
     ).filter(Application.id == application_id).first()
+    archived = application is None
+    if archived:
+        application = archived_application(db, application_id)
     
     if not application:
         raise HTTPException(
@@ -67,62 +151,136 @@ async def get_application(
             detail="Нет прав для просмотра этой заявки"
         )
     
+    if fields is not None or archived:
+        return item_response(application, project_schema(ApplicationResponse, fields))
+    
     return application
 
+def detail_loaders() -> dict:
+    return {
+        "internship": joinedload(Application.internship),
+        "user": joinedload(Application.user),
+        "files": joinedload(Application.files),
+        "reviews": joinedload(Application.reviews),
+    }
+
 @router.post("/", response_model=ApplicationResponse)
 async def create_application(
     application_data: ApplicationCreate,
-    current_user: User = Depends(get_current_user),
+    idempotency_key: Optional[str] = Header(None, alias="Idempotency-Key", max_length=128),
+    current_user: Principal = Depends(get_current_principal),
     db: Session = Depends(get_db)
 ):
-    """Подать заявку на стажировку"""
+    """Подать заявку на стажировку
+    
+    Повтор с тем же Idempotency-Key и тем же телом возвращает уже созданную заявку.
+    """
+    
+    internship_id = application_data.internship_id
+    request_hash = request_fingerprint(application_data.dict()) if idempotency_key else None
     
-    # Проверяем существование стажировки
-    internship = db.query(Internship).filter(Internship.id == application_data.internship_id).first()
-    if not internship:
+    # Повтор запроса клиентом - отдаем уже созданную заявку
+    if idempotency_key:
+        application = _replay_submission(db, current_user.id, idempotency_key, internship_id, request_hash)
+        if application is not None:
+            return application
+    
+    # Один запрос: вставка только для активной стажировки, дубликаты
+    # отсекает уникальный индекс (user_id, internship_id)
+    db_application = db.scalars(
+        _submit_application_statement(db, application_data, current_user.id)
+    ).first()
+    
+    if db_application is None:
+        db.rollback()
+        # Тот же запрос мог одновременно обработать другой воркер
+        if idempotency_key:
+            application = _replay_submission(db, current_user.id, idempotency_key, internship_id, request_hash)
+            if application is not None:
+                return application
+        _resolve_rejected_submission(db, internship_id)
+    
+    # Ключ пишется в той же транзакции, что и заявка
+    if idempotency_key and not store_key(
+        db, current_user.id, idempotency_key, internship_id, request_hash, db_application.id
+    ):
+        db.rollback()
         raise HTTPException(
-            status_code=status.HTTP_404_NOT_FOUND,
-            detail="Стажировка не найдена"
+            status_code=status.HTTP_422_UNPROCESSABLE_ENTITY,
+            detail="Ключ Idempotency-Key уже использован для другого запроса"
         )
     
-    if internship.status != "active":
+    db.commit()
+    invalidate_user_recommendations(current_user.id)
+    
+    return db_application
+
+def _replay_submission(
+    db: Session, user_id: int, idempotency_key: str, internship_id: int, request_hash: str
+) -> Optional[Application]:
+    """Заявка, созданная запросом с этим ключом; другой запрос с тем же ключом - ошибка"""
+    
+    record = find_key(db, user_id, idempotency_key)
+    if record is None:
+        return None
+    
+    if not matches(record, internship_id, request_hash):
         raise HTTPException(
-            status_code=status.HTTP_400_BAD_REQUEST,
-            detail="Стажировка неактивна"
+            status_code=status.HTTP_422_UNPROCESSABLE_ENTITY,
+            detail="Ключ Idempotency-Key уже использован для другого запроса"
         )
+    return db.get(Application, record.application_id)
+
+def _submit_application_statement(db: Session, application_data: ApplicationCreate, user_id: int):
+    """INSERT ... SELECT ... WHERE стажировка активна ON CONFLICT DO NOTHING RETURNING"""
+    
+    columns = Application.__table__.c
+    values = application_data.dict(exclude={"internship_id"})
+    values.update(user_id=user_id, status="pending")
+    
+    source = select(
+        *[literal(value, type_=columns[name].type) for name, value in values.items()],
+        Internship.id
+    ).where(
+        Internship.id == application_data.internship_id,
+        Internship.status == "active"
+    )
     
-    # Проверяем, не подавал ли пользователь уже заявку
-    existing_application = db.query(Application).filter(
-        and_(
-            Application.user_id == current_user.id,
-            Application.internship_id == application_data.internship_id
+    dialect_insert = pg_insert if db.get_bind().dialect.name == "postgresql" else sqlite_insert
+    return dialect_insert(Application).from_select(
+        [*values, "internship_id"], source
+    ).on_conflict_do_nothing(
+        index_elements=["user_id", "internship_id"]
+    ).returning(Application)
+
+def _resolve_rejected_submission(db: Session, internship_id: int) -> None:
+    """Выяснить, почему вставка не произошла, и вернуть прежние ошибки"""
+    
+    # Активная стажировка есть - значит, вставку отсек уникальный индекс
+    internship_status = db.query(Internship.status).filter(Internship.id == internship_id).scalar()
+    
+    if internship_status is None:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="Стажировка не найдена"
         )
-    ).first()
     
-    if existing_application:
+    if internship_status != "active":
         raise HTTPException(
             status_code=status.HTTP_400_BAD_REQUEST,
-            detail="Вы уже подали заявку на эту стажировку"
+            detail="Стажировка неактивна"
         )
     
-    # Создаем заявку
-    db_application = Application(
-        **application_data.dict(),
-        user_id=current_user.id,
-        status="pending"
+    raise HTTPException(
+        status_code=status.HTTP_400_BAD_REQUEST,
+        detail="Вы уже подали заявку на эту стажировку"
     )
-    
-    db.add(db_application)
-    db.commit()
-    db.refresh(db_application)
-    
-    return db_application
 
 @router.put("/{application_id}", response_model=ApplicationResponse)
 async def update_application(
     application_id: int,
     application_data: ApplicationUpdate,
-    current_user: User = Depends(get_current_user),
+    current_user: Principal = Depends(get_current_principal),
     db: Session = Depends(get_db)
 ):
     """Обновить заявку (только если статус pending)"""
@@ -160,7 +318,7 @@ async def update_application(
 @router.delete("/{application_id}")
 async def withdraw_application(
     application_id: int,
-    current_user: User = Depends(get_current_user),
+    current_user: Principal = Depends(get_current_principal),
     db: Session = Depends(get_db)
 ):
     """Отозвать заявку"""
@@ -185,33 +343,33 @@ async def withdraw_application(
             detail="Нельзя отозвать заявку с финальным статусом"
         )
     
+    file_paths = [path for (path,) in db.query(FileModel.file_path).filter(
+        FileModel.application_id == application_id
+    )]
+    
     db.delete(application)
     db.commit()
     
+    # Файлы удаляем после коммита; что не удалось удалить, подберет сверка хранилища.
+    # Удаление из S3 - сетевой запрос, поэтому не в event loop
+    for file_path in file_paths:
+        await run_in_threadpool(delete_stored_file, file_path)
+    
     return {"message": "Заявка успешно отозвана"}
 
-@router.post("/{application_id}/files")
+@router.post("/{application_id}/files", dependencies=[Depends(rate_limit("upload", account=get_current_principal))])
 async def upload_application_file(
     application_id: int,
     file: UploadFile = File(...),
     file_type: str = Query(..., regex="^(resume|portfolio|cover_letter)$"),
-    current_user: User = Depends(get_current_user),
+    current_user: Principal = Depends(get_current_principal),
     db: Session = Depends(get_db)
 ):
     """Загрузить файл к заявке"""
     
-    application = db.query(Application).filter(Application.id == application_id).first()
-    if not application:
-        raise HTTPException(
-            status_code=status.HTTP_404_NOT_FOUND,
-            detail="Заявка не найдена"
-        )
-    
-    if application.user_id != current_user.id:
-        raise HTTPException(
-            status_code=status.HTTP_403_FORBIDDEN,
-            detail="Нет прав для загрузки файлов к этой заявке"
-        )
+    authorize_application(
+        db, current_user, application_id, "Нет прав для загрузки файлов к этой заявке", allow_admin=False
+    )
     
     # Проверяем тип файла
     allowed_types = ["application/pdf", "application/msword", 
@@ -244,36 +402,42 @@ async def upload_application_file(
     )
     
     db.add(db_file)
-    db.commit()
+    try:
+        db.commit()
+    except Exception as error:
+        # Без записи в БД файл на диске никому не нужен
+        db.rollback()
+        await run_in_threadpool(delete_stored_file, file_path)
+        # Заявку отозвали или перенесли в архив, пока файл загружался
+        if isinstance(error, IntegrityError):
+            raise HTTPException(
+                status_code=status.HTTP_404_NOT_FOUND,
+                detail="Заявка не найдена"
+            )
+        raise
     db.refresh(db_file)
     
     return {"message": "Файл успешно загружен", "file_id": db_file.id}
 
 @router.get("/stats/my")
 async def get_my_application_stats(
-    current_user: User = Depends(get_current_user),
+    season: int = Depends(selected_season),
+    current_user: Principal = Depends(get_current_principal),
     db: Session = Depends(get_db)
 ):
-    """Получить статистику заявок пользователя"""
-    
-    total = db.query(Application).filter(Application.user_id == current_user.id).count()
-    pending = db.query(Application).filter(
-        and_(Application.user_id == current_user.id, Application.status == "pending")
-    ).count()
-    reviewed = db.query(Application).filter(
-        and_(Application.user_id == current_user.id, Application.status == "reviewed")
-    ).count()
-    accepted = db.query(Application).filter(
-        and_(Application.user_id == current_user.id, Application.status == "accepted")
-    ).count()
-    rejected = db.query(Application).filter(
-        and_(Application.user_id == current_user.id, Application.status == "rejected")
-    ).count()
+    """Получить статистику заявок пользователя за сезон"""
+    
+    return count_applications_by_status(db, current_user.id, season)
+
+def count_applications_by_status(db: Session, user_id: int, season: Optional[int] = None) -> dict:
+    """Статистика заявок пользователя за сезон (по умолчанию текущий) одним GROUP BY"""
+    
+    counts = count_by_status(db, season if season is not None else current_season(), user_id)
     
     return {
-        "total": total,
-        "pending": pending,
-        "reviewed": reviewed,
-        "accepted": accepted,
-        "rejected": rejected
+        "total": sum(counts.values()),
+        "pending": counts.get("pending", 0),
+        "reviewed": counts.get("reviewed", 0),
+        "accepted": counts.get("accepted", 0),
+        "rejected": counts.get("rejected", 0)
     }
@@ -1,4 +1,3 @@
-from datetime import timedelta
 from fastapi import APIRouter, Depends, HTTPException, status
 from fastapi.security import OAuth2PasswordRequestForm
 from sqlalchemy.orm import Session
@@ -7,13 +6,23 @@ from sqlalchemy import or_
 from ..database import get_db
 from ..models.user import User
 from ..models.campus import Campus
-from ..schemas.auth import Token, UserRegister, UserResponse
-from ..auth.jwt import create_access_token, get_password_hash, verify_password
-from ..config import settings
+from ..schemas.auth import UserRegister, UserResponse
+from ..schemas.tokens import RefreshRequest, TokenPair
+from ..auth.jwt import get_password_hash, verify_password
+from ..auth.tokens import (
+    Principal, decode_token, get_current_active_user, get_current_principal,
+    issue_token_pair, oauth2_scheme, revoke_family, revoke_user_tokens, rotate_refresh_token
+)
+from ..utils.profiling import ProfiledRoute
+from ..utils.rate_limit import rate_limit
 
-router = APIRouter()
+router = APIRouter(route_class=ProfiledRoute)
 
-@router.post("/register", response_model=UserResponse)
+def login_account(form_data: OAuth2PasswordRequestForm = Depends()) -> str:
+    """Аккаунт для лимита попыток входа (форма разбирается один раз вместе с login)"""
+    return form_data.username
+
+@router.post("/register", response_model=UserResponse, dependencies=[Depends(rate_limit("register"))])
 async def register(user_data: UserRegister, db: Session = Depends(get_db)):
     """Регистрация нового пользователя"""
     
@@ -62,7 +71,7 @@ async def register(user_data: UserRegister, db: Session = Depends(get_db)):
     
     return db_user
 
-@router.post("/login", response_model=Token)
+@router.post("/login", response_model=TokenPair, dependencies=[Depends(rate_limit("login", account=login_account))])
 async def login(form_data: OAuth2PasswordRequestForm = Depends(), db: Session = Depends(get_db)):
     """Вход в систему"""
     
@@ -81,32 +90,29 @@ async def login(form_data: OAuth2PasswordRequestForm = Depends(), db: Session =
             detail="Аккаунт деактивирован"
         )
     
-    access_token_expires = timedelta(minutes=settings.ACCESS_TOKEN_EXPIRE_MINUTES)
-    access_token = create_access_token(
-        data={"sub": user.email}, expires_delta=access_token_expires
-    )
-    
-    return {
-        "access_token": access_token,
-        "token_type": "bearer",
-        "user": user
-    }
+    return issue_token_pair(user)
 
 @router.get("/me", response_model=UserResponse)
-async def get_current_user_info(current_user: User = Depends(get_current_user)):
+async def get_current_user_info(current_user: User = Depends(get_current_active_user)):
     """Получить информацию о текущем пользователе"""
     return current_user
 
-@router.post("/refresh", response_model=Token)
-async def refresh_token(current_user: User = Depends(get_current_user)):
-    """Обновить токен"""
-    access_token_expires = timedelta(minutes=settings.ACCESS_TOKEN_EXPIRE_MINUTES)
-    access_token = create_access_token(
-        data={"sub": current_user.email}, expires_delta=access_token_expires
-    )
+@router.post("/refresh", response_model=TokenPair)
+async def refresh_token(data: RefreshRequest, db: Session = Depends(get_db)):
+    """Обменять refresh-токен на новую пару токенов
     
-    return {
-        "access_token": access_token,
-        "token_type": "bearer",
-        "user": current_user
-    }
+    Refresh-токен одноразовый: повторное использование отзывает все токены этого входа.
+    """
+    return rotate_refresh_token(db, data.refresh_token)
+
+@router.post("/logout")
+async def logout(token: str = Depends(oauth2_scheme), db: Session = Depends(get_db)):
+    """Выйти: отзываются access- и refresh-токены текущего входа"""
+    revoke_family(db, decode_token(token, "access"))
+    return {"message": "Выход выполнен"}
+
+@router.post("/logout-all")
+async def logout_all(current_user: Principal = Depends(get_current_principal), db: Session = Depends(get_db)):
+    """Выйти на всех устройствах"""
+    revoke_user_tokens(db, current_user.id)
+    return {"message": "Все сессии завершены"}
@@ -1,52 +1,48 @@
-from fastapi import APIRouter, Depends, HTTPException, status
-from fastapi.responses import FileResponse
+from typing import Optional
+from fastapi import APIRouter, Depends, HTTPException, status, Query
+from fastapi.concurrency import run_in_threadpool
+from fastapi.responses import FileResponse, RedirectResponse
 from sqlalchemy.orm import Session
-import os
 
 from ..database import get_db
-from ..models.user import User
 from ..models.file import FileModel
-from ..auth.dependencies import get_current_user, require_admin
-from ..config import settings
+from ..models.application import Application
+from ..auth.tokens import Principal, get_current_principal
+from ..utils.profiling import ProfiledRoute
+from ..utils.file_handler import query_bundle_files, zip_response, delete_file as delete_stored_file
+from ..utils.permissions import authorize_application, authorize_file
+from ..utils.archive import archived_application_files
+from ..utils.storage import storage
 
-router = APIRouter()
+router = APIRouter(route_class=ProfiledRoute)
 
 @router.get("/{file_id}")
 async def download_file(
     file_id: int,
-    current_user: User = Depends(get_current_user),
+    current_user: Principal = Depends(get_current_principal),
     db: Session = Depends(get_db)
 ):
     """Скачать файл"""
     
-    file_record = db.query(FileModel).filter(FileModel.id == file_id).first()
-    if not file_record:
-        raise HTTPException(
-            status_code=status.HTTP_404_NOT_FOUND,
-            detail="Файл не найден"
-        )
+    # Студент может скачивать свои файлы и файлы своих заявок
+    file_record = authorize_file(
+        db, current_user, file_id, "Нет прав для скачивания этого файла", include_archive=True
+    )
     
-    # Проверяем права доступа
-    if current_user.role != "admin":
-        # Студент может скачивать только свои файлы
-        if file_record.uploaded_by_id != current_user.id:
-            # Или файлы из своих заявок
-            if not file_record.application or file_record.application.user_id != current_user.id:
-                raise HTTPException(
-                    status_code=status.HTTP_403_FORBIDDEN,
-                    detail="Нет прав для скачивания этого файла"
-                )
+    # Внешнее хранилище отдает файл по подписанной ссылке - байты не идут через API
+    download_url = storage.download_url(file_record.file_path, file_record.filename, file_record.content_type)
+    if download_url:
+        return RedirectResponse(download_url, status_code=status.HTTP_307_TEMPORARY_REDIRECT)
     
     # Проверяем существование файла
-    file_path = os.path.join(settings.UPLOAD_DIR, file_record.file_path)
-    if not os.path.exists(file_path):
+    if not await run_in_threadpool(storage.exists, file_record.file_path):
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
             detail="Файл не найден на сервере"
         )
     
     return FileResponse(
-        path=file_path,
+        path=storage.path(file_record.file_path),
         filename=file_record.filename,
         media_type=file_record.content_type
     )
@@ -54,54 +50,63 @@ async def download_file(
 @router.delete("/{file_id}")
 async def delete_file(
     file_id: int,
-    current_user: User = Depends(get_current_user),
+    current_user: Principal = Depends(get_current_principal),
     db: Session = Depends(get_db)
 ):
     """Удалить файл"""
     
-    file_record = db.query(FileModel).filter(FileModel.id == file_id).first()
-    if not file_record:
-        raise HTTPException(
-            status_code=status.HTTP_404_NOT_FOUND,
-            detail="Файл не найден"
-        )
-    
-    # Проверяем права доступа
-    if current_user.role != "admin" and file_record.uploaded_by_id != current_user.id:
-        raise HTTPException(
-            status_code=status.HTTP_403_FORBIDDEN,
-            detail="Нет прав для удаления этого файла"
-        )
-    
-    # Удаляем файл с диска
-    file_path = os.path.join(settings.UPLOAD_DIR, file_record.file_path)
-    if os.path.exists(file_path):
-        os.remove(file_path)
+    file_record = authorize_file(
+        db, current_user, file_id, "Нет прав для удаления этого файла", allow_application_owner=False
+    )
     
-    # Удаляем запись из БД
-    db.delete(file_record)
+    # Сначала удаляем запись из БД, затем файл с диска: если удалить файл
+    # не получится, его подберет сверка хранилища, а не останется битая запись
+    file_path = file_record.file_path
+    db.query(FileModel).filter(FileModel.id == file_id).delete(synchronize_session=False)
     db.commit()
     
+    # Удаление из S3 - сетевой запрос, поэтому не в event loop
+    await run_in_threadpool(delete_stored_file, file_path)
+    
     return {"message": "Файл успешно удален"}
 
+@router.get("/application/{application_id}.zip")
+async def download_application_files_zip(
+    application_id: int,
+    file_type: Optional[str] = Query(None, regex="^(resume|portfolio|cover_letter)$"),
+    current_user: Principal = Depends(get_current_principal),
+    db: Session = Depends(get_db)
+):
+    """Скачать все файлы заявки одним ZIP-архивом"""
+    
+    authorize_application(
+        db, current_user, application_id, "Нет прав для скачивания файлов этой заявки", include_archive=True
+    )
+    
+    rows = query_bundle_files(db, Application.id == application_id, file_type=file_type)
+    # Заявки прошлых сезонов лежат в архиве
+    if not rows:
+        rows = archived_application_files(db, application_id, file_type)
+    return zip_response(rows, f"application_{application_id}_files.zip")
+
 @router.get("/application/{application_id}")
 async def get_application_files(
     application_id: int,
-    current_user: User = Depends(get_current_user),
+    current_user: Principal = Depends(get_current_principal),
     db: Session = Depends(get_db)
 ):
     """Получить список файлов заявки"""
     
-    files = db.query(FileModel).filter(FileModel.application_id == application_id).all()
+    # Права проверяются до выборки файлов
+    authorize_application(
+        db, current_user, application_id, "Нет прав для просмотра файлов этой заявки", include_archive=True
+    )
     
-    # Проверяем права доступа к заявке
-    if files and current_user.role != "admin":
-        application = files[0].application
-        if application.user_id != current_user.id:
-            raise HTTPException(
-                status_code=status.HTTP_403_FORBIDDEN,
-                detail="Нет прав для просмотра файлов этой заявки"
-            )
+    files = db.query(
+        FileModel.id, FileModel.filename, FileModel.file_type, FileModel.file_size, FileModel.uploaded_at
+    ).filter(FileModel.application_id == application_id).all()
+    if not files:
+        files = archived_application_files(db, application_id)
     
     return [
         {
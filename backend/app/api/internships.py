@@ -1,39 +1,56 @@
-from typing import List, Optional
-from fastapi import APIRouter, Depends, HTTPException, status, Query
+from typing import List, Optional, Union
+from fastapi import APIRouter, Depends, HTTPException, status, Query, Request
 from sqlalchemy.orm import Session, joinedload
-from sqlalchemy import and_, or_
+from sqlalchemy import and_, or_, func, exists, select
 
 from ..database import get_db
-from ..models.user import User
+from ..db_routing import get_read_db
 from ..models.internship import Internship
-from ..models.campus import Campus
-from ..models.department import Department
-from ..models.tag import Tag
 from ..schemas.internship import (
     InternshipCreate, InternshipUpdate, InternshipResponse, 
     InternshipListResponse, InternshipSearchParams
 )
-from ..auth.dependencies import get_current_user, require_admin
+from ..schemas.facets import InternshipSearchResponse
+from ..schemas.schedule import PublicationSchedule
+from ..models.internship_schedule import InternshipPublication
+from ..auth.tokens import Principal, get_current_principal, require_admin_principal
+from ..utils.internship_index import internship_index
+from ..utils.recommendations import load_recommended_internships
+from ..utils.reference import reference_columns, reference_loaders, reference_registry, with_references
+from ..utils.saved_searches import notify_published_internship
+from ..utils.serialization import item_response, json_response, list_response, serialize_items
+from ..utils.fieldsets import Fields, fieldset, load_options, project_schema
+from ..utils.profiling import ProfiledRoute
+from ..utils.http_cache import cache_headers, collection_validators, is_not_modified, not_modified_response
 
-router = APIRouter()
+router = APIRouter(route_class=ProfiledRoute)
 
-@router.get("/", response_model=List[InternshipListResponse])
+# Максимум id в пакетном запросе GET /internships?ids=...
+MAX_BATCH_IDS = 100
+
+@router.get("/", response_model=Union[List[InternshipListResponse], InternshipSearchResponse])
 async def get_internships(
+    request: Request,
     skip: int = Query(0, ge=0),
     limit: int = Query(50, ge=1, le=100),
     search: Optional[str] = Query(None),
     campus_id: Optional[int] = Query(None),
     department_id: Optional[int] = Query(None),
+    tag_ids: Optional[List[int]] = Query(None),
+    tag_mode: str = Query("and", regex="^(and|or)$"),
+    facets: bool = Query(False),
     is_active: bool = Query(True),
-    db: Session = Depends(get_db)
+    ids: Optional[str] = Query(None, description="Пакетная выборка по id через запятую, например 1,2,3"),
+    fields: Fields = Depends(fieldset(InternshipListResponse)),
+    db: Session = Depends(get_read_db)
 ):
     """Получить список стажировок с фильтрацией"""
     
-    query = db.query(Internship).options(
-        joinedload(Internship.campus),
-        joinedload(Internship.department),
-        joinedload(Internship.tags)
-    )
+    # Пакетная выборка заменяет серию запросов GET /internships/{id}
+    if ids is not None:
+        return _get_internships_by_ids(db, _parse_ids(ids), fields)
+    
+    query = db.query(Internship)
     
     # Фильтр по активности
     if is_active:
@@ -56,23 +73,160 @@ async def get_internships(
     if department_id:
         query = query.filter(Internship.department_id == department_id)
     
+    # Фильтр по тегам - в SQL: индекс воркера узнает о правках тегов в других воркерах с задержкой
+    if tag_ids:
+        query = query.filter(_tag_filter(tag_ids, match_all=tag_mode == "and"))
+    
+    # Если выборка не менялась - отвечаем 304, не загружая строки
+    etag, last_modified = collection_validators(
+        query, func.coalesce(Internship.updated_at, Internship.created_at)
+    )
+    headers = cache_headers(etag, last_modified, private=False)
+    if is_not_modified(request, etag, last_modified):
+        return not_modified_response(headers)
+    
+    if facets:
+        # Битовые карты индекса - только для счетчиков фасетов, total считает БД.
+        # Индекс сверяется с таблицей, чтобы фасеты не расходились с выборкой
+        # после правок в других воркерах
+        internship_index.ensure_current(db)
+        total = query.order_by(None).count()
+        tag_bitmap = internship_index.match_tags(tag_ids, match_all=tag_mode == "and") if tag_ids else None
+        result_bitmap = _result_bitmap(
+            query, search, campus_id, department_id, tag_bitmap, is_active
+        )
+    
+    # Узкий набор полей - читаем из БД только нужные колонки; корпус, кафедра и теги - из реестра
+    query = query.options(*_list_options(fields))
+    
     # Сортировка по дате создания (новые первыми)
     query = query.order_by(Internship.created_at.desc())
     
-    internships = query.offset(skip).limit(limit).all()
+    internships = with_references(db, query.offset(skip).limit(limit).all())
+    schema = project_schema(InternshipListResponse, fields)
+    
+    if not facets:
+        return list_response(internships, schema, headers=headers)
+    
+    return json_response({
+        "items": serialize_items(internships, schema),
+        "total": total,
+        "facets": {
+            "campuses": _facet_list("campus", result_bitmap),
+            "departments": _facet_list("department", result_bitmap),
+            "tags": _facet_list("tag", result_bitmap),
+        }
+    }, headers=headers)
+
+def _parse_ids(ids: str) -> List[int]:
+    try:
+        parsed = [int(value) for value in ids.split(",") if value.strip()]
+    except ValueError:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="Параметр ids должен содержать числа через запятую"
+        )
+    
+    if len(parsed) > MAX_BATCH_IDS:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=f"Можно запросить не больше {MAX_BATCH_IDS} стажировок за раз"
+        )
+    
+    # Убираем повторы, сохраняя порядок
+    return list(dict.fromkeys(parsed))
+
+def _get_internships_by_ids(db: Session, internship_ids: List[int], fields: Fields):
+    """Стажировки по списку id одним запросом, в порядке запроса (несуществующие пропускаются)"""
+    
+    if not internship_ids:
+        return list_response([], InternshipListResponse)
+    
+    internships = with_references(db, db.query(Internship).options(
+        *_list_options(fields)
+    ).filter(Internship.id.in_(internship_ids)).all())
+    
+    by_id = {internship.id: internship for internship in internships}
+    return list_response(
+        [by_id[internship_id] for internship_id in internship_ids if internship_id in by_id],
+        project_schema(InternshipListResponse, fields)
+    )
+
+def _list_options(fields: Fields, loaders: Optional[dict] = None) -> list:
+    return load_options(
+        Internship, fields, {**reference_loaders(), **(loaders or {})}, required=reference_columns(fields)
+    )
+
+def _tag_filter(tag_ids: List[int], match_all: bool):
+    """Условие по таблице связей стажировка-тег: все теги (AND) или хотя бы один (OR)"""
+    tags = Internship.tags.property
+    internship_column = tags.synchronize_pairs[0][1]
+    tag_column = tags.secondary_synchronize_pairs[0][1]
+    tag_ids = list(dict.fromkeys(tag_ids))
+    
+    if not match_all:
+        return exists().where(internship_column == Internship.id, tag_column.in_(tag_ids))
+    
+    return Internship.id.in_(
+        select(internship_column)
+        .where(tag_column.in_(tag_ids))
+        .group_by(internship_column)
+        .having(func.count(func.distinct(tag_column)) == len(tag_ids))
+    )
+
+def _result_bitmap(query, search, campus_id, department_id, tag_bitmap, is_active) -> int:
+    """Битовая карта всей выборки (без пагинации) для подсчета фасетов"""
+    
+    # Текстовый поиск есть только в БД - достаем id одним легким запросом
+    if search:
+        result = 0
+        for (internship_id,) in query.with_entities(Internship.id):
+            result |= 1 << internship_id
+        return result
+    
+    # Остальные фильтры считаются пересечением битовых карт в памяти
+    if is_active:
+        result = internship_index.bitmap("status", "active")
+    else:
+        result = internship_index.all_bitmap()
+    if campus_id:
+        result &= internship_index.bitmap("campus", campus_id)
+    if department_id:
+        result &= internship_index.bitmap("department", department_id)
+    if tag_bitmap is not None:
+        result &= tag_bitmap
+    return result
+
+def _facet_list(facet: str, result_bitmap: int) -> List[dict]:
+    counts = internship_index.facet_counts(facet, result_bitmap)
+    return [
+        {"id": value, "count": count}
+        for value, count in sorted(counts.items(), key=lambda item: -item[1])
+        if value is not None
+    ]
+
+@router.get("/recommended", response_model=List[InternshipListResponse])
+async def get_recommended_internships(
+    limit: int = Query(20, ge=1, le=50),
+    current_user: Principal = Depends(get_current_principal),
+    db: Session = Depends(get_read_db)
+):
+    """Получить рекомендованные стажировки по навыкам пользователя"""
     
-    return internships
+    internships = load_recommended_internships(db, current_user.id, limit)
+    return list_response(internships, InternshipListResponse)
 
 @router.get("/{internship_id}", response_model=InternshipResponse)
-async def get_internship(internship_id: int, db: Session = Depends(get_db)):
+async def get_internship(
+    internship_id: int,
+    fields: Fields = Depends(fieldset(InternshipResponse)),
+    db: Session = Depends(get_read_db)
+):
     """Получить детальную информацию о стажировке"""
     
-    internship = db.query(Internship).options(
-        joinedload(Internship.campus),
-        joinedload(Internship.department),
-        joinedload(Internship.tags),
-        joinedload(Internship.applications)
-    ).filter(Internship.id == internship_id).first()
+    internship = db.query(Internship).options(*_list_options(fields, {
+        "applications": joinedload(Internship.applications),
+    })).filter(Internship.id == internship_id).first()
     
     if not internship:
         raise HTTPException(
@@ -80,26 +234,24 @@ async def get_internship(internship_id: int, db: Session = Depends(get_db)):
             detail="Стажировка не найдена"
         )
     
-    return internship
+    return item_response(with_references(db, [internship])[0], project_schema(InternshipResponse, fields))
 
 @router.post("/", response_model=InternshipResponse)
 async def create_internship(
     internship_data: InternshipCreate,
-    current_user: User = Depends(require_admin),
+    current_user: Principal = Depends(require_admin_principal),
     db: Session = Depends(get_db)
 ):
     """Создать новую стажировку (только для админов)"""
     
-    # Проверяем существование корпуса и кафедры
-    campus = db.query(Campus).filter(Campus.id == internship_data.campus_id).first()
-    if not campus:
+    # Проверяем существование корпуса и кафедры по реестру справочников
+    if not reference_registry.campus(db, internship_data.campus_id):
         raise HTTPException(
             status_code=status.HTTP_400_BAD_REQUEST,
             detail="Корпус не найден"
         )
     
-    department = db.query(Department).filter(Department.id == internship_data.department_id).first()
-    if not department:
+    if not reference_registry.department(db, internship_data.department_id):
         raise HTTPException(
             status_code=status.HTTP_400_BAD_REQUEST,
             detail="Кафедра не найдена"
@@ -116,19 +268,23 @@ async def create_internship(
     
     # Добавляем теги
     if internship_data.tag_ids:
-        tags = db.query(Tag).filter(Tag.id.in_(internship_data.tag_ids)).all()
-        db_internship.tags = tags
+        db_internship.tags = reference_registry.attach_tags(db, internship_data.tag_ids)
     
     db.commit()
     db.refresh(db_internship)
     
+    internship_index.upsert(db_internship)
+    
+    if db_internship.status == "active":
+        notify_published_internship(db, db_internship)
+    
     return db_internship
 
 @router.put("/{internship_id}", response_model=InternshipResponse)
 async def update_internship(
     internship_id: int,
     internship_data: InternshipUpdate,
-    current_user: User = Depends(require_admin),
+    current_user: Principal = Depends(require_admin_principal),
     db: Session = Depends(get_db)
 ):
     """Обновить стажировку (только для админов)"""
@@ -140,6 +296,8 @@ async def update_internship(
             detail="Стажировка не найдена"
         )
     
+    was_active = internship.status == "active"
+    
     # Обновляем поля
     update_data = internship_data.dict(exclude_unset=True, exclude={"tag_ids"})
     for field, value in update_data.items():
@@ -147,18 +305,67 @@ async def update_internship(
     
     # Обновляем теги
     if internship_data.tag_ids is not None:
-        tags = db.query(Tag).filter(Tag.id.in_(internship_data.tag_ids)).all()
-        internship.tags = tags
+        internship.tags = reference_registry.attach_tags(db, internship_data.tag_ids)
+        # Смена тегов не затрагивает колонки стажировки - обновляем отметку явно для ETag
+        internship.updated_at = func.now()
     
     db.commit()
     db.refresh(internship)
     
+    internship_index.upsert(internship)
+    
+    # Черновик опубликован - ищем подходящие сохраненные поиски
+    if internship.status == "active" and not was_active:
+        notify_published_internship(db, internship)
+    
     return internship
 
+@router.put("/{internship_id}/schedule")
+async def schedule_internship_publication(
+    internship_id: int,
+    schedule: PublicationSchedule,
+    current_user: Principal = Depends(require_admin_principal),
+    db: Session = Depends(get_db)
+):
+    """Запланировать публикацию черновика (только для админов)"""
+    
+    internship = db.query(Internship).filter(Internship.id == internship_id).first()
+    if not internship:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="Стажировка не найдена"
+        )
+    
+    publication = db.query(InternshipPublication).filter(
+        InternshipPublication.internship_id == internship_id
+    ).first()
+    
+    # Отмена публикации
+    if schedule.publish_at is None:
+        if publication:
+            db.delete(publication)
+            db.commit()
+        return {"message": "Публикация отменена"}
+    
+    if internship.status != "draft":
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="Запланировать публикацию можно только для черновика"
+        )
+    
+    if publication:
+        publication.publish_at = schedule.publish_at
+    else:
+        db.add(InternshipPublication(internship_id=internship_id, publish_at=schedule.publish_at))
+    
+    db.commit()
+    
+    return {"message": "Публикация запланирована", "publish_at": schedule.publish_at}
+
 @router.delete("/{internship_id}")
 async def delete_internship(
     internship_id: int,
-    current_user: User = Depends(require_admin),
+    current_user: Principal = Depends(require_admin_principal),
     db: Session = Depends(get_db)
 ):
     """Удалить стажировку (только для админов)"""
@@ -180,6 +387,8 @@ async def delete_internship(
     db.delete(internship)
     db.commit()
     
+    internship_index.remove(internship_id)
+    
     return {"message": "Стажировка успешно удалена"}
 
 @router.get("/campus/{campus_id}", response_model=List[InternshipListResponse])
@@ -187,34 +396,32 @@ async def get_internships_by_campus(
     campus_id: int,
     skip: int = Query(0, ge=0),
     limit: int = Query(50, ge=1, le=100),
-    db: Session = Depends(get_db)
+    fields: Fields = Depends(fieldset(InternshipListResponse)),
+    db: Session = Depends(get_read_db)
 ):
     """Получить стажировки по корпусу"""
     
-    campus = db.query(Campus).filter(Campus.id == campus_id).first()
-    if not campus:
+    if not reference_registry.campus(db, campus_id):
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
             detail="Корпус не найден"
         )
     
-    internships = db.query(Internship).options(
-        joinedload(Internship.campus),
-        joinedload(Internship.department),
-        joinedload(Internship.tags)
+    internships = with_references(db, db.query(Internship).options(
+        *_list_options(fields)
     ).filter(
         and_(
             Internship.campus_id == campus_id,
             Internship.status == "active"
         )
-    ).order_by(Internship.created_at.desc()).offset(skip).limit(limit).all()
+    ).order_by(Internship.created_at.desc()).offset(skip).limit(limit).all())
     
-    return internships
+    return list_response(internships, project_schema(InternshipListResponse, fields))
 
 @router.get("/stats/summary")
 async def get_internships_stats(
-    current_user: User = Depends(require_admin),
-    db: Session = Depends(get_db)
+    current_user: Principal = Depends(require_admin_principal),
+    db: Session = Depends(get_read_db)
 ):
     """Получить статистику по стажировкам (только для админов)"""
     
@@ -0,0 +1,29 @@
+from fastapi import APIRouter, Depends, Request
+from sqlalchemy.orm import Session
+
+from ..db_routing import get_read_db
+from ..utils.profiling import ProfiledRoute
+from ..utils.http_cache import is_not_modified, not_modified_response
+from ..utils.reference import reference_registry
+from ..utils.serialization import json_response
+
+router = APIRouter(route_class=ProfiledRoute)
+
+@router.get("/")
+async def get_reference(
+    request: Request,
+    db: Session = Depends(get_read_db)
+):
+    """Справочники: корпуса, кафедры и теги одним ответом
+
+    version меняется при любом изменении справочников; клиент перепроверяет
+    кэш по ETag и получает 304, пока данные те же.
+    """
+
+    reference_registry.ensure_loaded(db)
+    etag, payload = reference_registry.published()
+    headers = {"ETag": etag, "Cache-Control": "no-cache"}
+    if is_not_modified(request, etag, None):
+        return not_modified_response(headers)
+
+    return json_response(payload, headers=headers)
@@ -1,22 +1,69 @@
-from fastapi import APIRouter, Depends, HTTPException, status
-from sqlalchemy.orm import Session
+from typing import List
+from fastapi import APIRouter, Depends, HTTPException, Query, status
+from sqlalchemy.orm import Session, joinedload
 
 from ..database import get_db
 from ..models.user import User
+from ..models.application import Application
+from ..models.internship import Internship
+from ..models.saved_search import SavedSearch, SavedSearchMatch
 from ..schemas.user import UserUpdate, UserResponse
-from ..auth.dependencies import get_current_user
+from ..schemas.application import ApplicationListResponse
+from ..schemas.internship import InternshipListResponse
+from ..schemas.saved_search import SavedSearchCreate, SavedSearchMatchResponse, SavedSearchResponse
+from ..auth.tokens import Principal, get_current_active_user, get_current_principal
+from ..utils.profiling import ProfiledRoute
+from ..utils.recommendations import load_recommended_internships
+from ..utils.reference import reference_registry
+from ..utils.saved_searches import MAX_SAVED_SEARCHES_PER_USER, saved_search_index
+from ..utils.seasons import current_season, season_filter
+from ..utils.serialization import json_response, list_response, serialize_item, serialize_items
+from .applications import count_applications_by_status
 
-router = APIRouter()
+router = APIRouter(route_class=ProfiledRoute)
 
 @router.get("/me", response_model=UserResponse)
-async def get_current_user_profile(current_user: User = Depends(get_current_user)):
+async def get_current_user_profile(current_user: User = Depends(get_current_active_user)):
     """Получить профиль текущего пользователя"""
     return current_user
 
+@router.get("/me/home")
+async def get_student_home(
+    applications_limit: int = Query(5, ge=1, le=20),
+    recommendations_limit: int = Query(6, ge=0, le=20),
+    current_user: User = Depends(get_current_active_user),
+    db: Session = Depends(get_db)
+):
+    """Данные главной страницы студента за один запрос
+    
+    Профиль, последние заявки со стажировками, статистика и рекомендации
+    собираются в той же сессии, что и аутентификация, фиксированным числом запросов.
+    """
+    
+    recent_applications = db.query(Application).options(
+        joinedload(Application.internship),
+        joinedload(Application.files)
+    ).filter(
+        Application.user_id == current_user.id,
+        season_filter(Application.created_at, current_season())
+    ).order_by(Application.created_at.desc()).limit(applications_limit).all()
+    
+    recommended = (
+        load_recommended_internships(db, current_user.id, recommendations_limit)
+        if recommendations_limit else []
+    )
+    
+    return json_response({
+        "profile": serialize_item(current_user, UserResponse),
+        "recent_applications": serialize_items(recent_applications, ApplicationListResponse),
+        "stats": count_applications_by_status(db, current_user.id),
+        "recommended": serialize_items(recommended, InternshipListResponse),
+    })
+
 @router.put("/me", response_model=UserResponse)
 async def update_current_user_profile(
     user_data: UserUpdate,
-    current_user: User = Depends(get_current_user),
+    current_user: User = Depends(get_current_active_user),
     db: Session = Depends(get_db)
 ):
     """Обновить профиль текущего пользователя"""
@@ -32,10 +79,103 @@ async def update_current_user_profile(
     
     return current_user
 
+@router.get("/me/saved-searches", response_model=List[SavedSearchResponse])
+async def get_saved_searches(
+    current_user: Principal = Depends(get_current_principal),
+    db: Session = Depends(get_db)
+):
+    """Сохраненные поиски текущего пользователя"""
+    return db.query(SavedSearch).filter(
+        SavedSearch.user_id == current_user.id
+    ).order_by(SavedSearch.created_at.desc()).all()
+
+@router.post("/me/saved-searches", response_model=SavedSearchResponse)
+async def create_saved_search(
+    search_data: SavedSearchCreate,
+    current_user: Principal = Depends(get_current_principal),
+    db: Session = Depends(get_db)
+):
+    """Сохранить поиск: о новых подходящих стажировках придет уведомление"""
+    
+    count = db.query(SavedSearch).filter(SavedSearch.user_id == current_user.id).count()
+    if count >= MAX_SAVED_SEARCHES_PER_USER:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=f"Можно сохранить не больше {MAX_SAVED_SEARCHES_PER_USER} поисков"
+        )
+    
+    # Несуществующий корпус или кафедра - ошибка клиента, а не нарушение внешнего ключа
+    if search_data.campus_id is not None and not reference_registry.campus(db, search_data.campus_id):
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="Корпус не найден"
+        )
+    if search_data.department_id is not None and not reference_registry.department(db, search_data.department_id):
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="Кафедра не найдена"
+        )
+    
+    values = search_data.dict()
+    values["search"] = (values["search"] or "").strip() or None
+    values["tag_ids"] = sorted(set(values["tag_ids"]))
+    saved_search = SavedSearch(**values, user_id=current_user.id)
+    
+    db.add(saved_search)
+    db.commit()
+    db.refresh(saved_search)
+    
+    saved_search_index.add(saved_search)
+    
+    return saved_search
+
+@router.delete("/me/saved-searches/{search_id}")
+async def delete_saved_search(
+    search_id: int,
+    current_user: Principal = Depends(get_current_principal),
+    db: Session = Depends(get_db)
+):
+    """Удалить сохраненный поиск"""
+    
+    deleted = db.query(SavedSearch).filter(
+        SavedSearch.id == search_id,
+        SavedSearch.user_id == current_user.id
+    ).delete(synchronize_session=False)
+    db.commit()
+    
+    if not deleted:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="Сохраненный поиск не найден"
+        )
+    
+    saved_search_index.remove(search_id)
+    
+    return {"message": "Сохраненный поиск удален"}
+
+@router.get("/me/saved-searches/matches", response_model=List[SavedSearchMatchResponse])
+async def get_saved_search_matches(
+    skip: int = Query(0, ge=0),
+    limit: int = Query(50, ge=1, le=100),
+    current_user: Principal = Depends(get_current_principal),
+    db: Session = Depends(get_db)
+):
+    """Новые стажировки по сохраненным поискам (новые первыми)"""
+    
+    matches = db.query(SavedSearchMatch).options(
+        joinedload(SavedSearchMatch.internship).joinedload(Internship.campus),
+        joinedload(SavedSearchMatch.internship).joinedload(Internship.department),
+        joinedload(SavedSearchMatch.internship).joinedload(Internship.tags),
+    ).filter(
+        SavedSearchMatch.user_id == current_user.id
+    ).order_by(SavedSearchMatch.id.desc()).offset(skip).limit(limit).all()
+    
+    return list_response(matches, SavedSearchMatchResponse)
+
 @router.get("/{user_id}", response_model=UserResponse)
 async def get_user_profile(
     user_id: int,
-    current_user: User = Depends(get_current_user),
+    current_user: Principal = Depends(get_current_principal),
     db: Session = Depends(get_db)
 ):
     """Получить профиль пользователя (только для админов или самого пользователя)"""
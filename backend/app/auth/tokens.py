@@ -0,0 +1,165 @@
+"""
+Пары access/refresh токенов с ротацией и проверкой отзыва без обращения к БД
+"""
+import os
+import time
+import uuid
+from typing import NamedTuple, Optional
+
+from fastapi import Depends, HTTPException, status
+from fastapi.security import OAuth2PasswordBearer
+from jose import JWTError, jwt
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.orm import Session
+
+from ..config import settings
+from ..database import get_db
+from ..models.revoked_token import RevokedToken
+from ..models.user import User
+from ..utils.revocation import check_revoked_in_db, revocations, utc_naive
+
+JWT_ALGORITHM = os.getenv("JWT_ALGORITHM", "HS256")
+ACCESS_TOKEN_TTL_SECONDS = settings.ACCESS_TOKEN_EXPIRE_MINUTES * 60
+REFRESH_TOKEN_TTL_SECONDS = int(os.getenv("REFRESH_TOKEN_EXPIRE_DAYS", "14")) * 86400
+
+oauth2_scheme = OAuth2PasswordBearer(tokenUrl="/api/auth/login")
+
+
+class Principal(NamedTuple):
+    """Пользователь из claims access-токена (без загрузки из БД)"""
+    id: int
+    email: str
+    role: str
+
+
+def _credentials_error(detail: str = "Недействительный токен") -> HTTPException:
+    return HTTPException(
+        status_code=status.HTTP_401_UNAUTHORIZED,
+        detail=detail,
+        headers={"WWW-Authenticate": "Bearer"},
+    )
+
+
+def _encode(user: User, token_type: str, family: str, issued_at: float, ttl: int) -> str:
+    claims = {
+        "sub": user.email,
+        "uid": user.id,
+        "role": user.role,
+        "type": token_type,
+        "jti": uuid.uuid4().hex,
+        "fam": family,
+        # Дробная часть нужна, чтобы токен, выданный сразу после отзыва, не попал под него
+        "iat": issued_at,
+        "exp": int(issued_at) + ttl,
+    }
+    return jwt.encode(claims, settings.SECRET_KEY, algorithm=JWT_ALGORITHM)
+
+
+def issue_token_pair(user: User, family: Optional[str] = None) -> dict:
+    """Выдать access и refresh токены; при ротации семейство сохраняется"""
+    family = family or uuid.uuid4().hex
+    issued_at = time.time()
+    return {
+        "access_token": _encode(user, "access", family, issued_at, ACCESS_TOKEN_TTL_SECONDS),
+        "refresh_token": _encode(user, "refresh", family, issued_at, REFRESH_TOKEN_TTL_SECONDS),
+        "token_type": "bearer",
+        "expires_in": ACCESS_TOKEN_TTL_SECONDS,
+        "user": user,
+    }
+
+
+def decode_token(token: str, token_type: str) -> dict:
+    try:
+        claims = jwt.decode(token, settings.SECRET_KEY, algorithms=[JWT_ALGORITHM])
+    except JWTError:
+        raise _credentials_error()
+
+    # Токены старого формата (без uid/jti) не принимаются - нужен повторный вход
+    if claims.get("type") != token_type or not all(key in claims for key in ("uid", "jti", "fam", "iat")):
+        raise _credentials_error()
+    return claims
+
+
+async def get_current_principal(token: str = Depends(oauth2_scheme)) -> Principal:
+    """Аутентификация по access-токену: подпись и фильтр отзыва, без запроса к БД
+
+    К БД обращаемся, только пока фильтр не загружен или при его срабатывании - в пуле потоков.
+    """
+    claims = decode_token(token, "access")
+    if await revocations.is_revoked_async(claims):
+        raise _credentials_error("Токен отозван")
+    return Principal(claims["uid"], claims["sub"], claims["role"])
+
+
+async def require_admin_principal(principal: Principal = Depends(get_current_principal)) -> Principal:
+    if principal.role != "admin":
+        raise HTTPException(
+            status_code=status.HTTP_403_FORBIDDEN,
+            detail="Недостаточно прав"
+        )
+    return principal
+
+
+async def get_current_active_user(
+    principal: Principal = Depends(get_current_principal),
+    db: Session = Depends(get_db)
+) -> User:
+    """Пользователь из БД - для эндпоинтов, которым нужен профиль целиком"""
+    user = db.get(User, principal.id)
+    if user is None or not user.is_active:
+        raise _credentials_error()
+    return user
+
+
+def _revoke(db: Session, kind: str, value: str, user_id: int, expires_at: float, not_before: Optional[float] = None) -> bool:
+    """Записать отзыв; False - такой отзыв уже есть"""
+    db.add(RevokedToken(
+        kind=kind,
+        value=value,
+        user_id=user_id,
+        not_before=utc_naive(not_before) if not_before is not None else None,
+        expires_at=utc_naive(expires_at),
+    ))
+    try:
+        db.commit()
+    except IntegrityError:
+        db.rollback()
+        return False
+    revocations.add(kind, value, user_id, not_before)
+    return True
+
+
+def revoke_token(db: Session, claims: dict) -> bool:
+    return _revoke(db, "token", claims["jti"], claims["uid"], claims["exp"])
+
+
+def revoke_family(db: Session, claims: dict) -> bool:
+    """Отозвать все токены, полученные ротацией от одного входа"""
+    # Любой токен семейства выдан раньше текущего момента и истечет до этого срока
+    return _revoke(db, "family", claims["fam"], claims["uid"], time.time() + REFRESH_TOKEN_TTL_SECONDS)
+
+
+def revoke_user_tokens(db: Session, user_id: int) -> None:
+    """Отозвать все уже выданные токены пользователя (деактивация, смена пароля)"""
+    now = time.time()
+    _revoke(db, "user", f"{user_id}:{now}", user_id, now + REFRESH_TOKEN_TTL_SECONDS, not_before=now)
+
+
+def rotate_refresh_token(db: Session, refresh_token: str) -> dict:
+    """Обменять refresh-токен на новую пару
+
+    Каждый refresh-токен одноразовый. Повторное предъявление уже использованного
+    токена означает утечку - отзывается все семейство.
+    """
+    claims = decode_token(refresh_token, "refresh")
+
+    # Для refresh - точная проверка по БД: обмен редкий, а гонки здесь важнее
+    if check_revoked_in_db(db, claims) or not revoke_token(db, claims):
+        revoke_family(db, claims)
+        raise _credentials_error("Токен отозван")
+
+    user = db.get(User, claims["uid"])
+    if user is None or not user.is_active:
+        raise _credentials_error()
+
+    return issue_token_pair(user, family=claims["fam"])
@@ -0,0 +1,154 @@
+"""
+Маршрутизация чтения между основной БД и репликой
+"""
+import hashlib
+import logging
+import os
+import threading
+import time
+from typing import Optional
+
+from fastapi import Request, Response
+from sqlalchemy import create_engine, text
+from sqlalchemy.orm import sessionmaker
+
+from .database import get_db
+from .utils.cache import TTLCache
+
+logger = logging.getLogger(__name__)
+
+# Реплика для GET-запросов; если не задана - все читается с основной БД
+REPLICA_DATABASE_URL = os.getenv("REPLICA_DATABASE_URL")
+# Сколько секунд после записи клиент читает с основной БД (read-your-writes)
+READ_YOUR_WRITES_SECONDS = float(os.getenv("READ_YOUR_WRITES_SECONDS", "5"))
+# При большем отставании реплики чтение уходит на основную БД
+MAX_REPLICA_LAG_SECONDS = float(os.getenv("MAX_REPLICA_LAG_SECONDS", "2"))
+LAG_CHECK_INTERVAL_SECONDS = 1.0
+
+STICKY_COOKIE = "read_primary_until"
+READ_METHODS = ("GET", "HEAD", "OPTIONS")
+
+
+def pool_options(url: str) -> dict:
+    """Параметры пула соединений из окружения (SQLite работает без пула)"""
+    if url.startswith("sqlite"):
+        return {"connect_args": {"check_same_thread": False}}
+
+    return {
+        "pool_size": int(os.getenv("DB_POOL_SIZE", "10")),
+        "max_overflow": int(os.getenv("DB_MAX_OVERFLOW", "5")),
+        # Ожидание свободного соединения; дольше - ошибка вместо бесконечной очереди
+        "pool_timeout": float(os.getenv("DB_POOL_TIMEOUT", "3")),
+        "pool_recycle": int(os.getenv("DB_POOL_RECYCLE", "1800")),
+        "pool_pre_ping": os.getenv("DB_POOL_PRE_PING", "true").lower() == "true",
+    }
+
+
+def _create_replica_engine(url: str):
+    return create_engine(url, **pool_options(url))
+
+
+replica_engine = _create_replica_engine(REPLICA_DATABASE_URL) if REPLICA_DATABASE_URL else None
+ReplicaSessionLocal = (
+    sessionmaker(autocommit=False, autoflush=False, bind=replica_engine) if replica_engine else None
+)
+
+
+class ReplicaLagMonitor:
+    """Периодически проверяет отставание реплики (не чаще раза в секунду)"""
+
+    def __init__(self, engine, max_lag: float, interval: float = LAG_CHECK_INTERVAL_SECONDS):
+        self.engine = engine
+        self.max_lag = max_lag
+        self.interval = interval
+        self.lag: Optional[float] = None
+        self._healthy = True
+        self._checked_at = 0.0
+        self._lock = threading.Lock()
+
+    def healthy(self) -> bool:
+        if time.monotonic() - self._checked_at > self.interval and self._lock.acquire(blocking=False):
+            try:
+                self._refresh()
+            finally:
+                self._lock.release()
+        return self._healthy
+
+    def _refresh(self) -> None:
+        self._checked_at = time.monotonic()
+        try:
+            self.lag = self._measure()
+            self._healthy = self.lag <= self.max_lag
+        except Exception:
+            logger.warning("Реплика недоступна, чтение переключено на основную БД")
+            self.lag = None
+            self._healthy = False
+
+    def _measure(self) -> float:
+        with self.engine.connect() as connection:
+            if self.engine.dialect.name != "postgresql":
+                # Локальный стенд на двух файлах SQLite: отставания нет
+                connection.execute(text("SELECT 1"))
+                return 0.0
+
+            # Если реплика применила весь полученный WAL - отставания нет,
+            # даже если на основной БД давно не было записей
+            lag = connection.execute(text(
+                "SELECT CASE "
+                "WHEN NOT pg_is_in_recovery() THEN 0 "
+                "WHEN pg_last_wal_receive_lsn() = pg_last_wal_replay_lsn() THEN 0 "
+                "ELSE COALESCE(EXTRACT(EPOCH FROM now() - pg_last_xact_replay_timestamp()), 0) "
+                "END"
+            )).scalar()
+            return float(lag or 0)
+
+
+lag_monitor = ReplicaLagMonitor(replica_engine, MAX_REPLICA_LAG_SECONDS) if replica_engine else None
+
+# Клиенты, недавно выполнявшие запись (на случай клиентов без cookie)
+_recent_writers = TTLCache(ttl=READ_YOUR_WRITES_SECONDS, maxsize=100000)
+
+
+def _client_key(request: Request) -> str:
+    identity = request.headers.get("authorization") or (request.client.host if request.client else "")
+    return hashlib.sha1(identity.encode()).hexdigest()
+
+
+def _prefers_primary(request: Request) -> bool:
+    sticky_until = request.cookies.get(STICKY_COOKIE)
+    if sticky_until:
+        try:
+            if float(sticky_until) > time.time():
+                return True
+        except ValueError:
+            pass
+    return _recent_writers.get(_client_key(request)) is not None
+
+
+def track_writes(request: Request, response: Response):
+    """Запомнить клиента, выполняющего запись, чтобы следующие чтения шли на основную БД"""
+    if request.method in READ_METHODS:
+        return
+
+    _recent_writers.set(_client_key(request), True)
+    # Cookie работает и тогда, когда следующий запрос попадет в другой воркер
+    response.set_cookie(
+        STICKY_COOKIE,
+        str(time.time() + READ_YOUR_WRITES_SECONDS),
+        max_age=int(READ_YOUR_WRITES_SECONDS) + 1,
+        httponly=True,
+        samesite="lax",
+    )
+
+
+def get_read_db(request: Request):
+    """Сессия для чтения: реплика, если она есть, свежая и клиент недавно не писал"""
+    if ReplicaSessionLocal is None or _prefers_primary(request) or not lag_monitor.healthy():
+        yield from get_db()
+        return
+
+    db = ReplicaSessionLocal()
+    try:
+        yield db
+    finally:
+        db.close()
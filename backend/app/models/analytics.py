@@ -0,0 +1,47 @@
+from sqlalchemy import Column, Date, DateTime, Float, ForeignKey, Integer, String
+from sqlalchemy.sql import func
+
+from ..database import Base
+
+
+class ApplicationStatusChange(Base):
+    """История смены статусов заявок (источник для аналитики)"""
+
+    __tablename__ = "application_status_changes"
+
+    id = Column(Integer, primary_key=True, index=True)
+    application_id = Column(Integer, ForeignKey("applications.id", ondelete="CASCADE"), nullable=False, index=True)
+    from_status = Column(String(20), nullable=False)
+    to_status = Column(String(20), nullable=False)
+    changed_by_id = Column(Integer, ForeignKey("users.id"), nullable=True)
+    changed_at = Column(DateTime, server_default=func.now(), nullable=False, index=True)
+
+
+class ApplicationRollup(Base):
+    """Предагрегированные показатели заявок за день или неделю
+
+    dimension - срез (all, campus, department, tag), dimension_id - id корпуса,
+    кафедры или тега (0 для среза all).
+    """
+
+    __tablename__ = "application_rollups"
+
+    granularity = Column(String(10), primary_key=True)
+    bucket_start = Column(Date, primary_key=True)
+    dimension = Column(String(20), primary_key=True)
+    dimension_id = Column(Integer, primary_key=True)
+    submitted = Column(Integer, nullable=False, default=0)
+    reviewed = Column(Integer, nullable=False, default=0)
+    accepted = Column(Integer, nullable=False, default=0)
+    rejected = Column(Integer, nullable=False, default=0)
+    review_count = Column(Integer, nullable=False, default=0)
+    review_seconds_total = Column(Float, nullable=False, default=0)
+
+
+class RollupWatermark(Base):
+    """До какого момента данные уже учтены в агрегатах"""
+
+    __tablename__ = "rollup_watermarks"
+
+    name = Column(String(50), primary_key=True)
+    processed_until = Column(DateTime, nullable=False)
@@ -0,0 +1,91 @@
+from functools import lru_cache
+from typing import Dict
+
+from sqlalchemy import Column, DateTime, Index, Integer, MetaData, String, Table
+from sqlalchemy.orm import configure_mappers
+from sqlalchemy.sql import func
+
+from ..database import Base
+from .analytics import ApplicationStatusChange
+from .application import Application
+from .file import FileModel
+
+
+class ArchivedSeason(Base):
+    """Учебный сезон, заявки которого перенесены в архивные таблицы
+
+    status: archiving - перенос идет, заявки сезона еще читаются из рабочих таблиц;
+    archived - сезон целиком в архиве.
+    """
+
+    __tablename__ = "archived_seasons"
+
+    season = Column(Integer, primary_key=True, autoincrement=False)
+    status = Column(String(20), nullable=False, default="archiving")
+    applications = Column(Integer, nullable=False, default=0)
+    started_at = Column(DateTime, server_default=func.now(), nullable=False)
+    archived_at = Column(DateTime, nullable=True)
+
+
+# Индексы рабочей таблицы под выборки "заявки сезона": по пользователю и по всем заявкам
+application_season_indexes = (
+    Index("ix_applications_user_created_at", Application.user_id, Application.created_at),
+    Index("ix_applications_created_at", Application.created_at),
+)
+
+# Архивные таблицы живут в отдельных метаданных: без внешних ключей, чтобы
+# рабочие таблицы не зависели от архива, и создаются только ensure_season_storage
+archive_metadata = MetaData()
+
+
+def _archive_copy(source: Table, *indexes: Index) -> Table:
+    columns = [
+        Column(column.name, column.type, primary_key=column.primary_key, nullable=column.nullable)
+        for column in source.columns
+    ]
+    return Table(
+        f"{source.name}_archive", archive_metadata, *columns,
+        Column("season", Integer, nullable=False), *indexes,
+    )
+
+
+@lru_cache(maxsize=None)
+def archive_tables() -> Dict[str, Table]:
+    """Архивные копии заявок и зависимых строк: имя рабочей таблицы -> архивная таблица
+
+    Таблица отзывов известна только через связь Application.reviews, поэтому
+    копии строятся лениво, после загрузки всех моделей.
+    """
+    configure_mappers()
+    reviews = Application.reviews.property.mapper.local_table
+    applications = Application.__table__
+
+    tables = {
+        applications.name: _archive_copy(
+            applications,
+            Index("ix_applications_archive_season_user", "season", "user_id"),
+            Index("ix_applications_archive_season_internship", "season", "internship_id"),
+        ),
+        FileModel.__table__.name: _archive_copy(
+            FileModel.__table__,
+            Index("ix_files_archive_application", "application_id"),
+            Index("ix_files_archive_file_path", "file_path"),
+        ),
+        ApplicationStatusChange.__table__.name: _archive_copy(
+            ApplicationStatusChange.__table__,
+            Index("ix_application_status_changes_archive_application", "application_id"),
+        ),
+    }
+    if reviews.name not in tables:
+        tables[reviews.name] = _archive_copy(
+            reviews, Index(f"ix_{reviews.name}_archive_application", "application_id")
+        )
+    return tables
+
+
+def ensure_season_storage(bind) -> None:
+    """Создать архивные таблицы и сезонные индексы на существующей БД"""
+    archive_tables()
+    archive_metadata.create_all(bind=bind)
+    for index in application_season_indexes:
+        index.create(bind=bind, checkfirst=True)
@@ -0,0 +1,27 @@
+import logging
+
+from sqlalchemy import Index
+
+from .application import Application
+
+logger = logging.getLogger(__name__)
+
+# Одна заявка пользователя на стажировку - гарантируется БД, а не проверкой в коде.
+# На этот индекс опирается INSERT ... ON CONFLICT DO NOTHING в create_application
+application_user_internship_unique = Index(
+    "uq_applications_user_internship",
+    Application.user_id,
+    Application.internship_id,
+    unique=True,
+)
+
+
+def ensure_application_constraints(bind) -> None:
+    """Создать уникальный индекс на существующей БД, если его еще нет"""
+    try:
+        application_user_internship_unique.create(bind=bind, checkfirst=True)
+    except Exception:
+        logger.exception(
+            "Не удалось создать индекс uq_applications_user_internship - "
+            "проверьте, нет ли дублирующихся заявок"
+        )
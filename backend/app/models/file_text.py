@@ -0,0 +1,38 @@
+from sqlalchemy import Column, DateTime, ForeignKey, Index, Integer, String, Text
+from sqlalchemy.dialects.postgresql import TSVECTOR
+from sqlalchemy.sql import func
+
+from ..database import Base
+from .file import FileModel
+
+
+class FileText(Base):
+    """Извлеченный текст документа; одинаковые файлы (по SHA-256) разбираются один раз"""
+
+    __tablename__ = "file_texts"
+
+    content_hash = Column(String(64), primary_key=True)
+    text = Column(Text, nullable=False, default="")
+    # Полнотекстовый индекс есть только в PostgreSQL, в остальных БД колонка пустая
+    search_vector = Column(Text().with_variant(TSVECTOR(), "postgresql"), nullable=True)
+    extracted_at = Column(DateTime, server_default=func.now(), nullable=False)
+
+    __table_args__ = (
+        Index("ix_file_texts_search_vector", "search_vector", postgresql_using="gin"),
+    )
+
+
+class FileExtraction(Base):
+    """Результат обработки загруженного файла конвейером извлечения текста
+
+    status: done - текст в file_texts, unsupported - формат не поддерживается,
+    failed - ошибка разбора или файл недоступен.
+    """
+
+    __tablename__ = "file_extractions"
+
+    file_id = Column(Integer, ForeignKey(FileModel.id, ondelete="CASCADE"), primary_key=True)
+    content_hash = Column(String(64), nullable=True, index=True)
+    status = Column(String(20), nullable=False, index=True)
+    error = Column(String(200), nullable=True)
+    processed_at = Column(DateTime, server_default=func.now(), nullable=False)
@@ -0,0 +1,22 @@
+from sqlalchemy import Column, DateTime, ForeignKey, Integer, String
+from sqlalchemy.sql import func
+
+from ..database import Base
+
+
+class ApplicationIdempotencyKey(Base):
+    """Idempotency-Key подачи заявки, привязанный к телу запроса
+
+    Пишется в той же транзакции, что и заявка, поэтому повтор в любом воркере
+    находит ее, а тот же ключ с другим телом распознается как ошибка клиента.
+    """
+
+    __tablename__ = "application_idempotency_keys"
+
+    user_id = Column(Integer, ForeignKey("users.id", ondelete="CASCADE"), primary_key=True)
+    key = Column(String(128), primary_key=True)
+    internship_id = Column(Integer, nullable=False)
+    # SHA-256 тела запроса
+    request_hash = Column(String(64), nullable=False)
+    application_id = Column(Integer, ForeignKey("applications.id", ondelete="CASCADE"), nullable=False, index=True)
+    created_at = Column(DateTime, server_default=func.now(), nullable=False, index=True)
@@ -0,0 +1,14 @@
+from sqlalchemy import Column, DateTime, ForeignKey, Integer
+from sqlalchemy.sql import func
+
+from ..database import Base
+
+
+class InternshipPublication(Base):
+    """Запланированная публикация черновика стажировки"""
+
+    __tablename__ = "internship_publications"
+
+    internship_id = Column(Integer, ForeignKey("internships.id", ondelete="CASCADE"), primary_key=True)
+    publish_at = Column(DateTime, nullable=False, index=True)
+    created_at = Column(DateTime, server_default=func.now())
@@ -0,0 +1,18 @@
+from sqlalchemy import Column, DateTime, ForeignKey, Integer
+from sqlalchemy.sql import func
+
+from ..database import Base
+
+
+class ReviewLease(Base):
+    """Заявка, взятая рецензентом в работу до expires_at
+
+    Истекшая аренда не мешает взять заявку другому рецензенту.
+    """
+
+    __tablename__ = "review_leases"
+
+    application_id = Column(Integer, ForeignKey("applications.id", ondelete="CASCADE"), primary_key=True)
+    reviewer_id = Column(Integer, ForeignKey("users.id", ondelete="CASCADE"), nullable=False, index=True)
+    claimed_at = Column(DateTime, server_default=func.now(), nullable=False)
+    expires_at = Column(DateTime, nullable=False, index=True)
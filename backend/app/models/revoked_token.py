@@ -0,0 +1,28 @@
+from sqlalchemy import Column, DateTime, ForeignKey, Integer, String, UniqueConstraint
+from sqlalchemy.sql import func
+
+from ..database import Base
+
+
+class RevokedToken(Base):
+    """Отзыв токенов: один токен (jti), семейство refresh-токенов или все токены пользователя
+
+    Для kind=user value - уникальная метка события, а not_before - момент отзыва:
+    токены пользователя, выданные не позже него, недействительны.
+    """
+
+    __tablename__ = "revoked_tokens"
+
+    id = Column(Integer, primary_key=True, index=True)
+    kind = Column(String(10), nullable=False)
+    value = Column(String(64), nullable=False)
+    user_id = Column(Integer, ForeignKey("users.id", ondelete="CASCADE"), nullable=True, index=True)
+    not_before = Column(DateTime, nullable=True)
+    # После истечения всех затронутых токенов запись больше не нужна
+    expires_at = Column(DateTime, nullable=False, index=True)
+    created_at = Column(DateTime, server_default=func.now(), nullable=False)
+
+    __table_args__ = (
+        # Повторный отзыв того же refresh-токена (гонка ротации) упирается в ограничение
+        UniqueConstraint("kind", "value", name="uq_revoked_tokens_kind_value"),
+    )
@@ -0,0 +1,47 @@
+from sqlalchemy import JSON, Column, DateTime, ForeignKey, Integer, String, UniqueConstraint
+from sqlalchemy.orm import relationship
+from sqlalchemy.sql import func
+
+from ..database import Base
+from .campus import Campus
+from .department import Department
+
+
+class SavedSearch(Base):
+    """Сохраненный поиск стажировок: те же фильтры, что у GET /internships"""
+
+    __tablename__ = "saved_searches"
+
+    id = Column(Integer, primary_key=True, index=True)
+    user_id = Column(Integer, ForeignKey("users.id", ondelete="CASCADE"), nullable=False, index=True)
+    name = Column(String(100), nullable=False)
+    search = Column(String(200), nullable=True)
+    campus_id = Column(Integer, ForeignKey(Campus.id, ondelete="CASCADE"), nullable=True)
+    department_id = Column(Integer, ForeignKey(Department.id, ondelete="CASCADE"), nullable=True)
+    tag_ids = Column(JSON, nullable=False, default=list)
+    tag_mode = Column(String(3), nullable=False, default="and")
+    created_at = Column(DateTime, server_default=func.now(), nullable=False)
+
+
+class SavedSearchMatch(Base):
+    """Новая стажировка, подходящая под сохраненный поиск
+
+    notified_at заполняется, когда совпадение попало в дайджест.
+    """
+
+    __tablename__ = "saved_search_matches"
+
+    id = Column(Integer, primary_key=True, index=True)
+    saved_search_id = Column(Integer, ForeignKey("saved_searches.id", ondelete="CASCADE"), nullable=False)
+    user_id = Column(Integer, ForeignKey("users.id", ondelete="CASCADE"), nullable=False, index=True)
+    internship_id = Column(Integer, ForeignKey("internships.id", ondelete="CASCADE"), nullable=False)
+    created_at = Column(DateTime, server_default=func.now(), nullable=False)
+    notified_at = Column(DateTime, nullable=True, index=True)
+
+    saved_search = relationship("SavedSearch")
+    internship = relationship("Internship")
+
+    __table_args__ = (
+        # Повторная публикация той же стажировки не создает второе уведомление
+        UniqueConstraint("saved_search_id", "internship_id", name="uq_saved_search_matches_search_internship"),
+    )
@@ -0,0 +1,21 @@
+from typing import List
+from pydantic import BaseModel
+
+from .internship import InternshipListResponse
+
+
+class FacetCount(BaseModel):
+    id: int
+    count: int
+
+
+class InternshipFacets(BaseModel):
+    campuses: List[FacetCount]
+    departments: List[FacetCount]
+    tags: List[FacetCount]
+
+
+class InternshipSearchResponse(BaseModel):
+    items: List[InternshipListResponse]
+    total: int
+    facets: InternshipFacets
@@ -0,0 +1,16 @@
+from typing import List, Optional
+from pydantic import BaseModel, Field
+
+# Сколько заявок рецензент может взять за один запрос
+MAX_CLAIM_SIZE = 20
+
+
+class ReviewClaimRequest(BaseModel):
+    limit: int = Field(5, ge=1, le=MAX_CLAIM_SIZE)
+    internship_id: Optional[int] = None
+    campus_id: Optional[int] = None
+    department_id: Optional[int] = None
+
+
+class ReviewLeaseRequest(BaseModel):
+    application_ids: List[int] = Field(..., min_length=1, max_length=100)
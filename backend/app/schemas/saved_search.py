@@ -0,0 +1,36 @@
+from datetime import datetime
+from typing import List, Optional
+from pydantic import BaseModel, ConfigDict, Field
+
+from .internship import InternshipListResponse
+
+
+class SavedSearchCreate(BaseModel):
+    name: str = Field(..., min_length=1, max_length=100)
+    search: Optional[str] = Field(None, max_length=200)
+    campus_id: Optional[int] = None
+    department_id: Optional[int] = None
+    tag_ids: List[int] = []
+    tag_mode: str = Field("and", pattern="^(and|or)$")
+
+
+class SavedSearchResponse(BaseModel):
+    model_config = ConfigDict(from_attributes=True)
+
+    id: int
+    name: str
+    search: Optional[str]
+    campus_id: Optional[int]
+    department_id: Optional[int]
+    tag_ids: List[int]
+    tag_mode: str
+    created_at: datetime
+
+
+class SavedSearchMatchResponse(BaseModel):
+    model_config = ConfigDict(from_attributes=True)
+
+    id: int
+    saved_search_id: int
+    created_at: datetime
+    internship: InternshipListResponse
@@ -0,0 +1,8 @@
+from datetime import datetime
+from typing import Optional
+from pydantic import BaseModel
+
+
+class PublicationSchedule(BaseModel):
+    # None отменяет запланированную публикацию
+    publish_at: Optional[datetime] = None
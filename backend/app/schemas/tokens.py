@@ -0,0 +1,13 @@
+from pydantic import BaseModel
+
+from .auth import Token
+
+
+class TokenPair(Token):
+    refresh_token: str
+    expires_in: int
+
+
+class RefreshRequest(BaseModel):
+    refresh_token: str
+
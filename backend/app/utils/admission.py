@@ -0,0 +1,155 @@
+import asyncio
+import os
+from collections import deque
+from contextvars import ContextVar
+from typing import Deque, Dict, Optional
+
+from fastapi import HTTPException, Request, status
+from sqlalchemy import event
+from sqlalchemy.orm import Session
+
+# Приоритеты в порядке обслуживания
+PRIORITIES = ("high", "normal", "low")
+
+# Сколько запрос каждого приоритета готов ждать свободного слота (секунды)
+WAIT_BUDGETS = {
+    "high": float(os.getenv("ADMISSION_WAIT_HIGH", "5")),
+    "normal": float(os.getenv("ADMISSION_WAIT_NORMAL", "1")),
+    "low": 0.0,
+}
+
+# Одновременных запросов к БД на воркер - по умолчанию размер пула + overflow
+ADMISSION_LIMIT = int(os.getenv("DB_ADMISSION_LIMIT", "15"))
+
+# Если среднее ожидание слота выше порога - низкоприоритетные запросы сразу получают 503
+SHED_WAIT_THRESHOLD = float(os.getenv("ADMISSION_SHED_WAIT", "0.2"))
+
+_statement_timeout_ms: ContextVar[Optional[int]] = ContextVar("statement_timeout_ms", default=None)
+
+
+class AdmissionController:
+    """Ограничение числа одновременных запросов к БД с приоритетами
+
+    Освободившийся слот передается самому приоритетному ожидающему запросу.
+    Низкоприоритетные запросы (статистика, выгрузки) никогда не ждут: при
+    нехватке слотов или росте времени ожидания они сразу получают 503.
+    """
+
+    def __init__(self, limit: int = ADMISSION_LIMIT, budgets: Dict[str, float] = WAIT_BUDGETS):
+        self.limit = limit
+        self.budgets = budgets
+        self.in_flight = 0
+        self.shed = 0
+        self.average_wait = 0.0
+        self._waiters: Dict[str, Deque[asyncio.Future]] = {priority: deque() for priority in PRIORITIES}
+
+    @property
+    def waiting(self) -> int:
+        return sum(len(waiters) for waiters in self._waiters.values())
+
+    async def acquire(self, priority: str) -> bool:
+        if self.in_flight < self.limit and not self.waiting:
+            if priority == "low" and self.average_wait > SHED_WAIT_THRESHOLD:
+                self.shed += 1
+                return False
+            self.in_flight += 1
+            return True
+
+        budget = self.budgets[priority]
+        if budget <= 0:
+            self.shed += 1
+            return False
+
+        loop = asyncio.get_running_loop()
+        future = loop.create_future()
+        self._waiters[priority].append(future)
+        started = loop.time()
+
+        try:
+            await asyncio.wait({future}, timeout=budget)
+        except asyncio.CancelledError:
+            # Клиент отключился: снимаем заявку с очереди, а уже переданный слот возвращаем
+            if future.done():
+                self.release()
+            else:
+                self._waiters[priority].remove(future)
+                future.cancel()
+            raise
+        self._record_wait(loop.time() - started)
+
+        if future.done():
+            # Слот передан нам в release()
+            return True
+
+        self._waiters[priority].remove(future)
+        self.shed += 1
+        return False
+
+    def release(self) -> None:
+        for priority in PRIORITIES:
+            waiters = self._waiters[priority]
+            while waiters:
+                future = waiters.popleft()
+                if not future.done():
+                    future.set_result(True)
+                    return
+        self.in_flight -= 1
+        # Без очереди ожидание постепенно "остывает"
+        self._record_wait(0.0)
+
+    def _record_wait(self, seconds: float) -> None:
+        self.average_wait = self.average_wait * 0.9 + seconds * 0.1
+
+
+admission_controller = AdmissionController()
+
+
+class AdmissionTicket:
+    """Занятый слот; release() можно вызвать раньше (например, для долгих потоков)"""
+
+    def __init__(self, controller: AdmissionController):
+        self.controller = controller
+        self.released = False
+
+    def release(self) -> None:
+        if not self.released:
+            self.released = True
+            self.controller.release()
+
+
+def admission(priority: str):
+    """Зависимость: занять слот доступа к БД с заданным приоритетом"""
+
+    async def admit(request: Request):
+        if not await admission_controller.acquire(priority):
+            raise HTTPException(
+                status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+                detail="Сервер перегружен, повторите запрос позже",
+                headers={"Retry-After": "1"},
+            )
+
+        ticket = AdmissionTicket(admission_controller)
+        request.state.admission = ticket
+        try:
+            yield
+        finally:
+            ticket.release()
+
+    return admit
+
+
+def statement_timeout(milliseconds: int):
+    """Зависимость: ограничить время выполнения SQL-запросов маршрута"""
+
+    async def apply_statement_timeout():
+        _statement_timeout_ms.set(milliseconds)
+
+    return apply_statement_timeout
+
+
+@event.listens_for(Session, "after_begin")
+def _set_statement_timeout(session, transaction, connection) -> None:
+    milliseconds = _statement_timeout_ms.get()
+    if milliseconds and connection.dialect.name == "postgresql":
+        # SET LOCAL действует до конца транзакции, поэтому повторяем в каждой
+        connection.exec_driver_sql(f"SET LOCAL statement_timeout = {int(milliseconds)}")
@@ -0,0 +1,273 @@
+"""
+Архив заявок по учебным сезонам: перенос закрытых сезонов и чтение истории
+"""
+import logging
+import os
+from collections import defaultdict
+from datetime import datetime
+from types import SimpleNamespace
+from typing import Dict, List, Optional, Tuple
+
+from sqlalchemy import Table, delete, desc, func, literal, or_, select
+from sqlalchemy.orm import Session
+
+from ..models.application import Application
+from ..models.application_archive import ArchivedSeason, archive_tables
+from ..models.file import FileModel
+from ..models.file_text import FileExtraction
+from ..models.idempotency import ApplicationIdempotencyKey
+from ..models.internship import Internship
+from ..models.review_lease import ReviewLease
+from ..models.user import User
+from .cache import TTLCache
+from .seasons import current_season, season_filter
+
+logger = logging.getLogger(__name__)
+
+ARCHIVE_BATCH_SIZE = int(os.getenv("ARCHIVE_BATCH_SIZE", "1000"))
+OPEN_STATUSES = ("pending", "reviewed")
+
+# Состояние сезона меняется раз в год - другие воркеры увидят архив не позже чем через минуту
+_archived_seasons = TTLCache(ttl=60, maxsize=100)
+
+
+def is_archived(db: Session, season: int) -> bool:
+    """Читать ли заявки сезона из архива (текущий сезон всегда в рабочих таблицах)"""
+    if season >= current_season():
+        return False
+    archived = _archived_seasons.get(season)
+    if archived is None:
+        archived = db.query(ArchivedSeason.status).filter(
+            ArchivedSeason.season == season
+        ).scalar() == "archived"
+        _archived_seasons.set(season, archived)
+    return archived
+
+
+def _source_tables() -> List[Tuple[Table, Table]]:
+    """(рабочая, архивная) таблица; заявки - первыми"""
+    tables = archive_tables()
+    sources = {table.name: table for table in (Application.__table__, FileModel.__table__)}
+    sources.update(
+        (name, Application.metadata.tables[name]) for name in tables if name not in sources
+    )
+    return [(sources[name], archive) for name, archive in tables.items()]
+
+
+def _application_key(table: Table):
+    return table.c.id if table is Application.__table__ else table.c.application_id
+
+
+def count_live_applications(db: Session, season: int, statuses: Optional[Tuple[str, ...]] = None) -> int:
+    """Число заявок сезона, еще лежащих в рабочих таблицах"""
+    query = db.query(func.count(Application.id)).filter(season_filter(Application.created_at, season))
+    if statuses:
+        query = query.filter(Application.status.in_(statuses))
+    return query.scalar()
+
+
+def _move_batch(db: Session, season: int, application_ids: List[int]) -> None:
+    """Скопировать пачку заявок с файлами, отзывами и историей в архив и удалить из рабочих таблиц"""
+    # Извлеченный текст, аренды рецензентов и ключи идемпотентности - производные данные, в архив не идут
+    db.execute(delete(FileExtraction).where(FileExtraction.file_id.in_(
+        select(FileModel.id).where(FileModel.application_id.in_(application_ids))
+    )))
+    db.execute(delete(ReviewLease).where(ReviewLease.application_id.in_(application_ids)))
+    db.execute(delete(ApplicationIdempotencyKey).where(ApplicationIdempotencyKey.application_id.in_(application_ids)))
+
+    tables = _source_tables()
+    for source, archive in tables:
+        db.execute(archive.insert().from_select(
+            [column.name for column in source.columns] + ["season"],
+            select(*source.columns, literal(season)).where(_application_key(source).in_(application_ids))
+        ))
+    # Зависимые строки удаляются раньше заявок
+    for source, _ in reversed(tables):
+        db.execute(delete(source).where(_application_key(source).in_(application_ids)))
+
+
+def archive_season(db: Session, season: int, batch_size: int = ARCHIVE_BATCH_SIZE) -> int:
+    """Перенести все заявки сезона в архив пачками; возвращает число перенесенных
+
+    Каждая пачка - отдельная транзакция, поэтому перенос можно прервать и
+    запустить снова. Пока перенос идет, сезон читается из рабочих таблиц.
+    """
+    if season >= current_season():
+        raise ValueError("Текущий сезон нельзя перенести в архив")
+
+    record = db.get(ArchivedSeason, season)
+    if record is None:
+        record = ArchivedSeason(season=season, status="archiving", applications=0)
+        db.add(record)
+        db.commit()
+
+    moved = 0
+    while True:
+        application_ids = [
+            application_id for (application_id,) in
+            db.query(Application.id).filter(
+                season_filter(Application.created_at, season)
+            ).order_by(Application.id).limit(batch_size)
+        ]
+        if not application_ids:
+            break
+        _move_batch(db, season, application_ids)
+        record.applications += len(application_ids)
+        db.commit()
+        moved += len(application_ids)
+        logger.info("Сезон %s: перенесено в архив %d заявок", season, moved)
+
+    record.status = "archived"
+    record.archived_at = datetime.now()
+    db.commit()
+    _archived_seasons.delete(season)
+    return moved
+
+
+def _season_source(db: Session, season: int) -> Tuple[Table, object]:
+    """Таблица заявок сезона и условие отбора его строк"""
+    if is_archived(db, season):
+        archive = archive_tables()[Application.__table__.name]
+        return archive, archive.c.season == season
+    return Application.__table__, season_filter(Application.created_at, season)
+
+
+def count_by_status(db: Session, season: int, user_id: Optional[int] = None) -> Dict[str, int]:
+    """Число заявок сезона по статусам одним GROUP BY"""
+    table, condition = _season_source(db, season)
+    query = select(table.c.status, func.count()).where(condition)
+    if user_id is not None:
+        query = query.where(table.c.user_id == user_id)
+    return {
+        getattr(status_value, "value", status_value): count
+        for status_value, count in db.execute(query.group_by(table.c.status))
+    }
+
+
+def top_internships(db: Session, season: int, limit: int = 5) -> List[Tuple[str, int]]:
+    """Стажировки с наибольшим числом заявок за сезон"""
+    table, condition = _season_source(db, season)
+    return db.query(
+        Internship.title,
+        func.count(table.c.id).label("application_count")
+    ).join(table, table.c.internship_id == Internship.id).filter(condition).group_by(
+        Internship.id, Internship.title
+    ).order_by(desc("application_count")).limit(limit).all()
+
+
+def archived_applications(
+    db: Session,
+    season: int,
+    user_id: Optional[int] = None,
+    internship_id: Optional[int] = None,
+    status_filter: Optional[str] = None,
+    search: Optional[str] = None,
+    skip: int = 0,
+    limit: Optional[int] = None,
+) -> List[SimpleNamespace]:
+    """Заявки архивного сезона в том же виде, что ORM-объекты (для сериализаторов схем)"""
+    tables = archive_tables()
+    archive = tables[Application.__table__.name]
+
+    query = select(archive).where(archive.c.season == season)
+    if user_id is not None:
+        query = query.where(archive.c.user_id == user_id)
+    if internship_id is not None:
+        query = query.where(archive.c.internship_id == internship_id)
+    if status_filter:
+        query = query.where(archive.c.status == status_filter)
+    if search:
+        query = query.join(User, User.id == archive.c.user_id).where(or_(
+            User.first_name.ilike(f"%{search}%"),
+            User.last_name.ilike(f"%{search}%"),
+            User.email.ilike(f"%{search}%")
+        ))
+    rows = db.execute(
+        query.order_by(archive.c.created_at.desc(), archive.c.id.desc()).offset(skip).limit(limit)
+    ).mappings().all()
+    return _with_relations(db, rows)
+
+
+def archived_application(db: Session, application_id: int) -> Optional[SimpleNamespace]:
+    """Заявка из архива по id (при переносе id сохраняются)"""
+    archive = archive_tables()[Application.__table__.name]
+    rows = db.execute(select(archive).where(archive.c.id == application_id)).mappings().all()
+    applications = _with_relations(db, rows)
+    return applications[0] if applications else None
+
+
+def archived_application_owner(db: Session, application_id: int) -> Optional[int]:
+    archive = archive_tables()[Application.__table__.name]
+    return db.execute(select(archive.c.user_id).where(archive.c.id == application_id)).scalar()
+
+
+def archived_file(db: Session, file_id: int):
+    """Файл архивной заявки с владельцем заявки - те же поля, что у проверки прав по рабочим таблицам"""
+    tables = archive_tables()
+    files = tables[FileModel.__table__.name]
+    applications = tables[Application.__table__.name]
+    return db.execute(select(
+        files.c.id, files.c.file_path, files.c.filename, files.c.content_type,
+        files.c.uploaded_by_id, files.c.application_id,
+        applications.c.user_id.label("owner_id")
+    ).outerjoin(
+        applications, applications.c.id == files.c.application_id
+    ).where(files.c.id == file_id)).first()
+
+
+def archived_application_files(db: Session, application_id: int, file_type: Optional[str] = None) -> list:
+    """Файлы архивной заявки с колонками списка файлов и ZIP-архива"""
+    tables = archive_tables()
+    files = tables[FileModel.__table__.name]
+    applications = tables[Application.__table__.name]
+    query = select(
+        files.c.id, files.c.file_path, files.c.filename, files.c.file_type,
+        files.c.file_size, files.c.uploaded_at,
+        files.c.application_id, User.last_name, User.first_name
+    ).join(
+        applications, applications.c.id == files.c.application_id
+    ).join(
+        User, User.id == applications.c.user_id
+    ).where(files.c.application_id == application_id)
+    if file_type:
+        query = query.where(files.c.file_type == file_type)
+    return db.execute(query.order_by(files.c.id)).all()
+
+
+def _with_relations(db: Session, rows) -> List[SimpleNamespace]:
+    """Строки архивных заявок со стажировкой, студентом, файлами и отзывами"""
+    if not rows:
+        return []
+
+    tables = archive_tables()
+    application_ids = [row["id"] for row in rows]
+    related = {
+        "files": FileModel.__table__.name,
+        "reviews": Application.reviews.property.mapper.local_table.name,
+    }
+    children: Dict[str, Dict[int, list]] = {}
+    for relation, name in related.items():
+        table = tables[name]
+        grouped = defaultdict(list)
+        for child in db.execute(select(table).where(table.c.application_id.in_(application_ids))).mappings():
+            grouped[child["application_id"]].append(SimpleNamespace(**child))
+        children[relation] = grouped
+
+    internships = {
+        internship.id: internship for internship in
+        db.query(Internship).filter(Internship.id.in_({row["internship_id"] for row in rows}))
+    }
+    users = {
+        user.id: user for user in
+        db.query(User).filter(User.id.in_({row["user_id"] for row in rows}))
+    }
+
+    return [
+        SimpleNamespace(
+            **row,
+            internship=internships.get(row["internship_id"]),
+            user=users.get(row["user_id"]),
+            **{relation: grouped.get(row["id"], []) for relation, grouped in children.items()},
+        )
+        for row in rows
+    ]
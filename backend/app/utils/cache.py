@@ -0,0 +1,63 @@
+import threading
+import time
+from itertools import islice
+from typing import Any, Callable, Dict, Hashable, Optional, Tuple
+
+
+class TTLCache:
+    """Потокобезопасный in-memory кэш с ограничением времени жизни и размера"""
+
+    def __init__(self, ttl: float, maxsize: int = 10000):
+        self.ttl = ttl
+        self.maxsize = maxsize
+        self._data: Dict[Hashable, Tuple[float, Any]] = {}
+        self._lock = threading.Lock()
+
+    def get(self, key: Hashable, default: Any = None) -> Any:
+        entry = self._data.get(key)
+        if entry is None:
+            return default
+
+        expires_at, value = entry
+        if expires_at < time.monotonic():
+            with self._lock:
+                self._data.pop(key, None)
+            return default
+
+        return value
+
+    def set(self, key: Hashable, value: Any, ttl: Optional[float] = None) -> None:
+        with self._lock:
+            if key not in self._data and len(self._data) >= self.maxsize:
+                self._evict()
+            self._data[key] = (time.monotonic() + (ttl or self.ttl), value)
+
+    def delete(self, key: Hashable) -> None:
+        with self._lock:
+            self._data.pop(key, None)
+
+    def delete_where(self, predicate: Callable[[Hashable], bool]) -> int:
+        """Удалить все ключи, удовлетворяющие условию"""
+        with self._lock:
+            keys = [key for key in self._data if predicate(key)]
+            for key in keys:
+                del self._data[key]
+        return len(keys)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._data.clear()
+
+    def __len__(self) -> int:
+        return len(self._data)
+
+    def _evict(self) -> None:
+        # Сначала удаляем просроченные записи
+        now = time.monotonic()
+        for key in [key for key, (expires_at, _) in self._data.items() if expires_at < now]:
+            del self._data[key]
+
+        # Если места все равно нет - удаляем самые старые (dict хранит порядок вставки)
+        if len(self._data) >= self.maxsize:
+            for key in list(islice(self._data, max(1, len(self._data) // 10))):
+                del self._data[key]
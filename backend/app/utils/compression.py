@@ -0,0 +1,171 @@
+"""
+Сжатие ответов API: gzip, а при установленных библиотеках - brotli и zstd
+"""
+import os
+import zlib
+from typing import AsyncIterator, Callable, Dict, Optional
+
+from fastapi import Request, Response
+from fastapi.routing import APIRoute
+from starlette.responses import StreamingResponse
+
+try:
+    import brotli
+except ImportError:  # brotli - необязательная зависимость
+    brotli = None
+
+try:
+    import zstandard
+except ImportError:  # zstandard - необязательная зависимость
+    zstandard = None
+
+# Маленькие ответы не сжимаем: выигрыш меньше накладных расходов
+COMPRESSION_MIN_SIZE = int(os.getenv("COMPRESSION_MIN_SIZE", "1024"))
+
+GZIP_LEVEL = 6
+# Высокие уровни brotli слишком дороги для динамических ответов
+BROTLI_QUALITY = 4
+ZSTD_LEVEL = 3
+
+COMPRESSIBLE_TYPES = ("application/json", "application/x-ndjson", "text/")
+# SSE нельзя буферизовать в компрессоре - события должны уходить сразу
+SKIP_TYPES = ("text/event-stream",)
+
+
+class GzipEncoder:
+    def __init__(self):
+        self._compressor = zlib.compressobj(GZIP_LEVEL, zlib.DEFLATED, 16 + zlib.MAX_WBITS)
+
+    def compress(self, data: bytes) -> bytes:
+        return self._compressor.compress(data)
+
+    def flush(self) -> bytes:
+        return self._compressor.flush(zlib.Z_SYNC_FLUSH)
+
+    def finish(self) -> bytes:
+        return self._compressor.flush()
+
+
+class BrotliEncoder:
+    def __init__(self):
+        self._compressor = brotli.Compressor(quality=BROTLI_QUALITY)
+
+    def compress(self, data: bytes) -> bytes:
+        return self._compressor.process(data)
+
+    def flush(self) -> bytes:
+        return self._compressor.flush()
+
+    def finish(self) -> bytes:
+        return self._compressor.finish()
+
+
+class ZstdEncoder:
+    def __init__(self):
+        self._compressor = zstandard.ZstdCompressor(level=ZSTD_LEVEL).compressobj()
+
+    def compress(self, data: bytes) -> bytes:
+        return self._compressor.compress(data)
+
+    def flush(self) -> bytes:
+        return self._compressor.flush(zstandard.COMPRESSOBJ_FLUSH_BLOCK)
+
+    def finish(self) -> bytes:
+        return self._compressor.flush()
+
+
+# Доступные кодировки в порядке предпочтения при равном q
+ENCODERS: Dict[str, Callable] = {}
+if zstandard is not None:
+    ENCODERS["zstd"] = ZstdEncoder
+if brotli is not None:
+    ENCODERS["br"] = BrotliEncoder
+ENCODERS["gzip"] = GzipEncoder
+
+
+def choose_encoding(accept_encoding: str) -> Optional[str]:
+    """Выбрать кодировку по заголовку Accept-Encoding (с учетом q-значений)"""
+    accepted: Dict[str, float] = {}
+    for item in accept_encoding.split(","):
+        name, _, params = item.partition(";")
+        name = name.strip().lower()
+        if not name:
+            continue
+        quality = 1.0
+        params = params.strip()
+        if params.startswith("q="):
+            try:
+                quality = float(params[2:])
+            except ValueError:
+                quality = 0.0
+        accepted[name] = quality
+
+    wildcard = accepted.get("*", 0.0)
+    best, best_quality = None, 0.0
+    for name in ENCODERS:
+        quality = accepted.get(name, wildcard)
+        if quality > best_quality:
+            best, best_quality = name, quality
+    return best
+
+
+async def _compress_stream(body: AsyncIterator, encoder) -> AsyncIterator[bytes]:
+    async for chunk in body:
+        if isinstance(chunk, str):
+            chunk = chunk.encode("utf-8")
+        # Сбрасываем компрессор на каждом куске, чтобы прогресс доходил до клиента сразу
+        data = encoder.compress(chunk) + encoder.flush()
+        if data:
+            yield data
+    yield encoder.finish()
+
+
+def _add_vary(response: Response) -> None:
+    vary = response.headers.get("vary")
+    if not vary:
+        response.headers["vary"] = "Accept-Encoding"
+    elif "accept-encoding" not in vary.lower():
+        response.headers["vary"] = f"{vary}, Accept-Encoding"
+
+
+def compress_response(request: Request, response: Response) -> Response:
+    """Сжать ответ, если клиент это поддерживает и тип содержимого сжимаемый"""
+    if response.status_code in (204, 304) or "content-encoding" in response.headers:
+        return response
+
+    content_type = response.headers.get("content-type", "")
+    if content_type.startswith(SKIP_TYPES) or not content_type.startswith(COMPRESSIBLE_TYPES):
+        return response
+
+    # Представление зависит от Accept-Encoding - это должны знать прокси и браузер
+    _add_vary(response)
+    encoding = choose_encoding(request.headers.get("accept-encoding", ""))
+    if encoding is None:
+        return response
+
+    if isinstance(response, StreamingResponse):
+        response.body_iterator = _compress_stream(response.body_iterator, ENCODERS[encoding]())
+        del response.headers["content-length"]
+    else:
+        body = getattr(response, "body", None)
+        # FileResponse не держит тело в памяти; такие ответы не трогаем
+        if not isinstance(body, bytes) or len(body) < COMPRESSION_MIN_SIZE:
+            return response
+        encoder = ENCODERS[encoding]()
+        response.body = encoder.compress(body) + encoder.finish()
+        response.headers["content-length"] = str(len(response.body))
+
+    response.headers["content-encoding"] = encoding
+    return response
+
+
+class CompressedRoute(APIRoute):
+    """Маршрут, сжимающий ответ в зависимости от Accept-Encoding клиента"""
+
+    def get_route_handler(self) -> Callable:
+        handler = super().get_route_handler()
+
+        async def compressed_handler(request: Request) -> Response:
+            return compress_response(request, await handler(request))
+
+        return compressed_handler
@@ -0,0 +1,281 @@
+import asyncio
+import json
+import logging
+import os
+from collections import defaultdict
+from typing import Callable, Dict, Optional, Set, Tuple
+
+from sqlalchemy import event, text
+from sqlalchemy.orm import Session
+
+from ..database import engine
+
+logger = logging.getLogger(__name__)
+
+# local - доставка внутри процесса, postgres - между воркерами через LISTEN/NOTIFY
+EVENTS_BACKEND = os.getenv("EVENTS_BACKEND", "local")
+CHANNEL = "application_events"
+
+# Максимум неотправленных событий на одно подключение
+QUEUE_SIZE = 100
+
+# Событие, которое получает клиент, не успевающий читать поток
+RESYNC_EVENT = "resync"
+
+# Пауза перед переподключением LISTEN после обрыва (растет вдвое до максимума)
+RECONNECT_MIN_SECONDS = 1
+RECONNECT_MAX_SECONDS = 30
+
+Message = Tuple[str, str]
+
+
+class LocalEventBackend:
+    """Доставка событий внутри одного процесса (локальная разработка и тесты)"""
+
+    def __init__(self):
+        self.broker: Optional["EventBroker"] = None
+
+    async def start(self, broker: "EventBroker") -> None:
+        self.broker = broker
+
+    async def stop(self) -> None:
+        self.broker = None
+
+    def publish(self, db: Session, payload: str) -> None:
+        # Отправляем только после успешного коммита транзакции (см. _flush_pending_events)
+        db.info.setdefault("pending_events", []).append(payload)
+
+    def flush(self, pending) -> None:
+        if self.broker is not None:
+            for payload in pending:
+                self.broker.dispatch_threadsafe(payload)
+
+
+class PostgresNotifyBackend:
+    """Доставка событий между воркерами через PostgreSQL LISTEN/NOTIFY
+
+    NOTIFY выполняется в той же транзакции, что и изменение статуса, поэтому
+    событие уходит только после коммита. Каждый воркер держит одно соединение
+    с LISTEN и читает уведомления прямо в event loop (без отдельного потока).
+    При обрыве соединение пересоздается, а подписчики получают resync:
+    уведомления, отправленные без LISTEN, потеряны.
+    """
+
+    def __init__(self, channel: str = CHANNEL):
+        self.channel = channel
+        self.broker: Optional["EventBroker"] = None
+        self._raw = None
+        self._connection = None
+        self._fileno: Optional[int] = None
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._reconnect_task: Optional[asyncio.Task] = None
+
+    async def start(self, broker: "EventBroker") -> None:
+        self.broker = broker
+        self._loop = asyncio.get_running_loop()
+        self._watch(*self._connect())
+
+    async def stop(self) -> None:
+        if self._reconnect_task is not None:
+            self._reconnect_task.cancel()
+            try:
+                await self._reconnect_task
+            except asyncio.CancelledError:
+                pass
+            self._reconnect_task = None
+        self._disconnect()
+
+    def _connect(self):
+        """Новое соединение с LISTEN (блокирующий вызов)"""
+        raw = engine.raw_connection()
+        try:
+            connection = raw.dbapi_connection
+            connection.autocommit = True
+            with connection.cursor() as cursor:
+                cursor.execute(f"LISTEN {self.channel}")
+        except Exception:
+            raw.invalidate()
+            raise
+        return raw, connection
+
+    def _watch(self, raw, connection) -> None:
+        self._raw, self._connection = raw, connection
+        self._fileno = connection.fileno()
+        self._loop.add_reader(self._fileno, self._on_readable)
+
+    def _disconnect(self) -> None:
+        if self._connection is None:
+            return
+        self._loop.remove_reader(self._fileno)
+        # Соединение с LISTEN не возвращаем в пул: оно могло оборваться, а подписка живет до закрытия
+        try:
+            self._raw.invalidate()
+        except Exception:
+            logger.exception("Не удалось закрыть соединение LISTEN")
+        self._raw = self._connection = self._fileno = None
+
+    async def _reconnect(self) -> None:
+        delay = RECONNECT_MIN_SECONDS
+        while True:
+            await asyncio.sleep(delay)
+            try:
+                raw, connection = await asyncio.to_thread(self._connect)
+            except Exception:
+                logger.warning("Не удалось переподключить LISTEN %s, повтор через %s с", self.channel, delay)
+                delay = min(delay * 2, RECONNECT_MAX_SECONDS)
+                continue
+            break
+
+        self._watch(raw, connection)
+        self._reconnect_task = None
+        logger.info("LISTEN %s восстановлен", self.channel)
+        self.broker.resync_all()
+
+    def publish(self, db: Session, payload: str) -> None:
+        db.execute(
+            text("SELECT pg_notify(:channel, :payload)"),
+            {"channel": self.channel, "payload": payload},
+        )
+
+    def _on_readable(self) -> None:
+        try:
+            self._connection.poll()
+        except Exception:
+            logger.exception("Ошибка чтения уведомлений PostgreSQL, переподключаемся")
+            self._disconnect()
+            if self._reconnect_task is None:
+                self._reconnect_task = self._loop.create_task(self._reconnect())
+            return
+
+        while self._connection.notifies:
+            notify = self._connection.notifies.pop(0)
+            self.broker.dispatch(notify.payload)
+
+
+class EventBroker:
+    """Брокер событий об изменении заявок для push-подписчиков
+
+    Каждое подключение получает свою ограниченную очередь. Если клиент не
+    успевает читать, старые события отбрасываются, и ему отправляется
+    resync - сигнал перезапросить данные целиком.
+
+    Через тот же канал рассылаются служебные события для всех воркеров
+    (broadcast), например смена статусов стажировок фоновыми задачами.
+    """
+
+    def __init__(self, backend, queue_size: int = QUEUE_SIZE):
+        self.backend = backend
+        self.queue_size = queue_size
+        self._subscribers: Dict[int, Set[asyncio.Queue]] = defaultdict(set)
+        self._handlers: Dict[str, Callable[[dict], None]] = {}
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+
+    @property
+    def connections(self) -> int:
+        return sum(len(queues) for queues in self._subscribers.values())
+
+    async def start(self) -> None:
+        self._loop = asyncio.get_running_loop()
+        await self.backend.start(self)
+
+    async def stop(self) -> None:
+        await self.backend.stop()
+
+    def subscribe(self, user_id: int) -> asyncio.Queue:
+        queue: asyncio.Queue = asyncio.Queue(maxsize=self.queue_size)
+        self._subscribers[user_id].add(queue)
+        return queue
+
+    def unsubscribe(self, user_id: int, queue: asyncio.Queue) -> None:
+        queues = self._subscribers.get(user_id)
+        if queues is None:
+            return
+        queues.discard(queue)
+        if not queues:
+            del self._subscribers[user_id]
+
+    def publish(self, db: Session, user_id: int, name: str, data: dict) -> None:
+        """Опубликовать событие для пользователя (вызывать до коммита)"""
+        payload = json.dumps({"user_id": user_id, "event": name, "data": data}, default=str)
+        self.backend.publish(db, payload)
+
+    def on_broadcast(self, name: str, handler: Callable[[dict], None]) -> None:
+        """Обработчик служебного события; вызывается в event loop каждого воркера"""
+        self._handlers[name] = handler
+
+    def broadcast(self, db: Session, name: str, data: dict) -> None:
+        """Разослать служебное событие всем воркерам (вызывать до коммита)
+
+        NOTIFY ограничивает размер сообщения 8000 байт - передавайте пачки id, а не объекты.
+        """
+        payload = json.dumps({"broadcast": name, "data": data}, default=str)
+        self.backend.publish(db, payload)
+
+    def dispatch_threadsafe(self, payload: str) -> None:
+        loop = self._loop
+        if loop is None:
+            return
+        try:
+            running = asyncio.get_running_loop()
+        except RuntimeError:
+            running = None
+        if running is loop:
+            self.dispatch(payload)
+        else:
+            loop.call_soon_threadsafe(self.dispatch, payload)
+
+    def dispatch(self, payload: str) -> None:
+        message = json.loads(payload)
+        if "broadcast" in message:
+            handler = self._handlers.get(message["broadcast"])
+            if handler is not None:
+                try:
+                    handler(message["data"])
+                except Exception:
+                    logger.exception("Ошибка обработки события %s", message["broadcast"])
+            return
+
+        queues = self._subscribers.get(message["user_id"])
+        if not queues:
+            return
+
+        # Сериализуем данные один раз для всех подключений пользователя
+        item: Message = (message["event"], json.dumps(message["data"]))
+        for queue in queues:
+            try:
+                queue.put_nowait(item)
+            except asyncio.QueueFull:
+                self._overflow(queue)
+
+    def resync_all(self) -> None:
+        """Попросить всех подписчиков перезапросить состояние (события могли потеряться)"""
+        for queues in self._subscribers.values():
+            for queue in queues:
+                self._overflow(queue)
+
+    def _overflow(self, queue: asyncio.Queue) -> None:
+        # Медленный клиент: очищаем очередь и просим перезапросить состояние
+        while not queue.empty():
+            queue.get_nowait()
+        queue.put_nowait((RESYNC_EVENT, "{}"))
+
+
+@event.listens_for(Session, "after_commit")
+def _flush_pending_events(db: Session) -> None:
+    pending = db.info.pop("pending_events", None)
+    if pending and isinstance(application_events.backend, LocalEventBackend):
+        application_events.backend.flush(pending)
+
+
+@event.listens_for(Session, "after_rollback")
+def _discard_pending_events(db: Session) -> None:
+    db.info.pop("pending_events", None)
+
+
+def _create_backend():
+    if EVENTS_BACKEND == "postgres":
+        return PostgresNotifyBackend()
+    return LocalEventBackend()
+
+
+application_events = EventBroker(_create_backend())
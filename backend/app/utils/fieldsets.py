@@ -0,0 +1,87 @@
+"""
+Разреженные наборы полей (?fields=id,title,...) для списков и детальных ответов
+"""
+from typing import Callable, Dict, FrozenSet, Iterable, List, Optional, Tuple, Type
+
+from fastapi import HTTPException, Query, status
+from pydantic import BaseModel, ConfigDict, create_model
+from sqlalchemy import inspect
+from sqlalchemy.orm import load_only, noload
+
+Fields = Optional[FrozenSet[str]]
+
+# Поле id отдается всегда - без него клиент не свяжет строки
+ALWAYS_INCLUDED = frozenset({"id"})
+
+_projections: Dict[Tuple[Type[BaseModel], FrozenSet[str]], Type[BaseModel]] = {}
+
+
+def fieldset(schema: Type[BaseModel], allowed: Optional[Iterable[str]] = None) -> Callable:
+    """Зависимость: разобрать параметр fields по белому списку полей схемы"""
+    allowed_fields = frozenset(allowed if allowed is not None else schema.model_fields)
+
+    def parse_fields(
+        fields: Optional[str] = Query(None, description="Поля ответа через запятую: " + ",".join(sorted(allowed_fields)))
+    ) -> Fields:
+        if not fields:
+            return None
+
+        requested = frozenset(name.strip() for name in fields.split(",") if name.strip())
+        unknown = requested - allowed_fields
+        if unknown:
+            raise HTTPException(
+                status_code=status.HTTP_400_BAD_REQUEST,
+                detail=f"Недопустимые поля: {', '.join(sorted(unknown))}"
+            )
+        return requested | (ALWAYS_INCLUDED & frozenset(schema.model_fields))
+
+    return parse_fields
+
+
+def project_schema(schema: Type[BaseModel], fields: Fields) -> Type[BaseModel]:
+    """Схема-проекция только с запрошенными полями (кэшируется)"""
+    if fields is None:
+        return schema
+
+    key = (schema, fields)
+    projection = _projections.get(key)
+    if projection is None:
+        projection = create_model(
+            f"{schema.__name__}Fields",
+            __config__=ConfigDict(from_attributes=True),
+            **{
+                name: (field.annotation, field)
+                for name, field in schema.model_fields.items()
+                if name in fields
+            }
+        )
+        _projections[key] = projection
+    return projection
+
+
+def load_options(model, fields: Fields, loaders: Dict[str, object], required: Iterable[str] = ()) -> List:
+    """Опции загрузки под набор полей: load_only для колонок, noload для лишних связей
+
+    loaders - стратегии загрузки связей по умолчанию (имя связи -> joinedload(...)),
+    required - колонки, нужные самому обработчику (например, для проверки прав).
+    """
+    if fields is None:
+        return list(loaders.values())
+
+    mapper = inspect(model)
+    columns = {attr.key for attr in mapper.column_attrs}
+    relationships = {attr.key for attr in mapper.relationships}
+
+    # Вычисляемые поля схемы могут зависеть от любых колонок и связей - тогда ничего не урезаем
+    if not fields <= columns | relationships:
+        return list(loaders.values())
+
+    options = [loader for name, loader in loaders.items() if name in fields]
+    options.extend(
+        noload(getattr(model, name)) for name in relationships if name not in fields
+    )
+    selected = (fields & columns) | set(required)
+    if selected:
+        options.append(load_only(*(getattr(model, name) for name in selected)))
+
+    return options
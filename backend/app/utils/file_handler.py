@@ -1,47 +1,96 @@
+import logging
 import os
 import uuid
-from typing import Optional
+from typing import List, Optional
 from fastapi import UploadFile
-import aiofiles
+from fastapi.responses import StreamingResponse
+from sqlalchemy.orm import Session
 
-from ..config import settings
+from ..models.application import Application
+from ..models.file import FileModel
+from ..models.user import User
+from .storage import storage
+from .zip_stream import ZipEntry, stream_zip, unique_arcname
+
+logger = logging.getLogger(__name__)
 
 async def save_uploaded_file(file: UploadFile, subfolder: str = "") -> str:
-    """Сохранить загруженный файл и вернуть путь"""
+    """Сохранить загруженный файл и вернуть путь (ключ в хранилище)"""
     
     # Создаем уникальное имя файла
     file_extension = os.path.splitext(file.filename)[1]
     unique_filename = f"{uuid.uuid4()}{file_extension}"
+    key = f"{subfolder}/{unique_filename}" if subfolder else unique_filename
     
-    # Создаем путь для сохранения
-    save_dir = os.path.join(settings.UPLOAD_DIR, subfolder)
-    os.makedirs(save_dir, exist_ok=True)
-    
-    file_path = os.path.join(save_dir, unique_filename)
-    relative_path = os.path.join(subfolder, unique_filename)
-    
-    # Сохраняем файл
-    async with aiofiles.open(file_path, 'wb') as f:
-        content = await file.read()
-        await f.write(content)
+    # Файл пишется в хранилище частями, целиком в памяти не держится
+    await storage.save(file, key)
     
-    return relative_path
+    return key
 
 def delete_file(file_path: str) -> bool:
-    """Удалить файл с диска"""
-    full_path = os.path.join(settings.UPLOAD_DIR, file_path)
+    """Удалить файл из хранилища"""
     try:
-        if os.path.exists(full_path):
-            os.remove(full_path)
-            return True
+        return storage.delete(file_path)
     except Exception:
-        pass
+        logger.warning("Не удалось удалить файл %s", file_path, exc_info=True)
     return False
 
 def get_file_size(file_path: str) -> Optional[int]:
     """Получить размер файла"""
-    full_path = os.path.join(settings.UPLOAD_DIR, file_path)
     try:
-        return os.path.getsize(full_path)
+        return storage.size(file_path)
     except Exception:
         return None
+
+def _safe_name(value: str) -> str:
+    """Убрать из имени разделители путей, чтобы архив не распаковывался за пределы папки"""
+    return "".join("_" if char in '/\\:' else char for char in (value or "")).strip(". ") or "file"
+
+def query_bundle_files(db: Session, *criteria, file_type: Optional[str] = None, status: Optional[str] = None):
+    """Файлы заявок для архива: только колонки, нужные для сборки (без ORM-объектов)"""
+    
+    query = db.query(
+        FileModel.file_path,
+        FileModel.filename,
+        FileModel.file_type,
+        FileModel.file_size,
+        FileModel.uploaded_at,
+        Application.id.label("application_id"),
+        User.last_name,
+        User.first_name
+    ).join(
+        Application, FileModel.application_id == Application.id
+    ).join(
+        User, Application.user_id == User.id
+    ).filter(*criteria)
+    
+    if file_type:
+        query = query.filter(FileModel.file_type == file_type)
+    if status:
+        query = query.filter(Application.status == status)
+    
+    return query.order_by(Application.id, FileModel.id).all()
+
+def bundle_entries(rows) -> List[ZipEntry]:
+    """Записи архива: папка на каждую заявку, внутри файлы с типом в имени"""
+    
+    used = set()
+    entries = []
+    for row in rows:
+        folder = _safe_name(f"{row.application_id}_{row.last_name}_{row.first_name}")
+        arcname = unique_arcname(f"{folder}/{row.file_type}_{_safe_name(row.filename)}", used)
+        entries.append(ZipEntry(
+            arcname=arcname,
+            open=lambda key=row.file_path: storage.open(key),
+            size=row.file_size,
+            modified=row.uploaded_at
+        ))
+    return entries
+
+def zip_response(rows, filename: str) -> StreamingResponse:
+    """Архив с файлами заявок, который собирается на лету во время отдачи"""
+    return StreamingResponse(
+        stream_zip(bundle_entries(rows)),
+        media_type="application/zip",
+        headers={"Content-Disposition": f'attachment; filename="{filename}"'}
+    )
@@ -0,0 +1,87 @@
+"""
+Условные запросы: слабые ETag и Last-Modified для списков, If-Match для изменений
+"""
+import hashlib
+from datetime import datetime, timezone
+from email.utils import format_datetime, parsedate_to_datetime
+from typing import Any, Dict, Optional, Tuple
+
+from fastapi import Request, Response
+from sqlalchemy import func
+
+# Увеличивается при изменении формата ответов, чтобы старые ETag перестали совпадать
+ETAG_VERSION = 1
+
+
+def weak_etag(*parts: Any) -> str:
+    digest = hashlib.sha1(repr((ETAG_VERSION,) + parts).encode()).hexdigest()[:20]
+    return f'W/"{digest}"'
+
+
+def _as_utc(value: Optional[datetime]) -> Optional[datetime]:
+    if value is None:
+        return None
+    # Время в БД хранится в UTC без часового пояса
+    if value.tzinfo is None:
+        return value.replace(tzinfo=timezone.utc)
+    return value.astimezone(timezone.utc)
+
+
+def collection_validators(query, modified_at, *aggregates, scope: Tuple = ()) -> Tuple[str, Optional[datetime]]:
+    """ETag и Last-Modified выборки одним агрегатным запросом, без загрузки строк
+
+    ETag строится из max(modified_at), числа строк и дополнительных агрегатов
+    (например, по вложенным файлам), scope отделяет выборки разных пользователей.
+    """
+    row = query.order_by(None).with_entities(
+        func.max(modified_at), func.count(), *aggregates
+    ).one()
+    last_modified = _as_utc(row[0])
+    return weak_etag(*scope, *row), last_modified
+
+
+def cache_headers(etag: str, last_modified: Optional[datetime], private: bool = True) -> Dict[str, str]:
+    headers = {
+        "ETag": etag,
+        # Клиент может хранить ответ, но обязан перепроверять его при каждом запросе
+        "Cache-Control": "private, no-cache" if private else "no-cache",
+    }
+    if last_modified is not None:
+        headers["Last-Modified"] = format_datetime(last_modified, usegmt=True)
+    return headers
+
+
+def _opaque_tag(tag: str) -> str:
+    tag = tag.strip()
+    return tag[2:] if tag.startswith("W/") else tag
+
+
+def is_not_modified(request: Request, etag: str, last_modified: Optional[datetime]) -> bool:
+    if_none_match = request.headers.get("if-none-match")
+    if if_none_match is not None:
+        # Слабое сравнение: для GET достаточно совпадения без учета W/
+        if if_none_match.strip() == "*":
+            return True
+        return _opaque_tag(etag) in {_opaque_tag(tag) for tag in if_none_match.split(",")}
+
+    # If-Modified-Since учитывается только без If-None-Match
+    if_modified_since = request.headers.get("if-modified-since")
+    if if_modified_since and last_modified is not None:
+        try:
+            since = parsedate_to_datetime(if_modified_since)
+        except (TypeError, ValueError):
+            return False
+        return last_modified.replace(microsecond=0) <= _as_utc(since)
+
+    return False
+
+
+def if_match_satisfied(if_match: Optional[str], etag: str) -> bool:
+    """Условие If-Match для изменяющих запросов (версии - слабые ETag, сравниваем без W/)"""
+    if if_match is None or if_match.strip() == "*":
+        return True
+    return _opaque_tag(etag) in {_opaque_tag(tag) for tag in if_match.split(",")}
+
+
+def not_modified_response(headers: Dict[str, str]) -> Response:
+    return Response(status_code=304, headers=headers)
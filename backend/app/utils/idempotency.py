@@ -0,0 +1,70 @@
+"""
+Ключи идемпотентности подачи заявок
+"""
+import hashlib
+import logging
+from datetime import datetime, timedelta
+from typing import Optional
+
+import orjson
+from sqlalchemy import delete
+from sqlalchemy.dialects.postgresql import insert as pg_insert
+from sqlalchemy.dialects.sqlite import insert as sqlite_insert
+from sqlalchemy.orm import Session
+
+from ..models.idempotency import ApplicationIdempotencyKey
+
+logger = logging.getLogger(__name__)
+
+# Сколько клиент может повторять запрос с тем же ключом
+IDEMPOTENCY_TTL_SECONDS = 24 * 3600
+IDEMPOTENCY_PURGE_INTERVAL_SECONDS = 3600
+
+
+def request_fingerprint(data: dict) -> str:
+    return hashlib.sha256(orjson.dumps(data, option=orjson.OPT_SORT_KEYS)).hexdigest()
+
+
+def find_key(db: Session, user_id: int, key: str) -> Optional[ApplicationIdempotencyKey]:
+    """Действующий ключ пользователя (истекшие не учитываются, даже если еще не удалены)"""
+    record = db.get(ApplicationIdempotencyKey, (user_id, key))
+    if record is None or record.created_at <= datetime.now() - timedelta(seconds=IDEMPOTENCY_TTL_SECONDS):
+        return None
+    return record
+
+
+def store_key(
+    db: Session, user_id: int, key: str, internship_id: int, request_hash: str, application_id: int
+) -> bool:
+    """Записать ключ в текущей транзакции; False - ключ уже занят другим запросом"""
+    # Истекший ключ можно использовать снова
+    db.execute(delete(ApplicationIdempotencyKey).where(
+        ApplicationIdempotencyKey.user_id == user_id,
+        ApplicationIdempotencyKey.key == key,
+        ApplicationIdempotencyKey.created_at <= datetime.now() - timedelta(seconds=IDEMPOTENCY_TTL_SECONDS),
+    ))
+    dialect_insert = pg_insert if db.get_bind().dialect.name == "postgresql" else sqlite_insert
+    inserted = db.execute(dialect_insert(ApplicationIdempotencyKey).values(
+        user_id=user_id,
+        key=key,
+        internship_id=internship_id,
+        request_hash=request_hash,
+        application_id=application_id,
+    ).on_conflict_do_nothing()).rowcount
+    return inserted == 1
+
+
+def matches(record: ApplicationIdempotencyKey, internship_id: int, request_hash: str) -> bool:
+    return record.internship_id == internship_id and record.request_hash == request_hash
+
+
+def purge_expired_idempotency_keys(db: Session) -> None:
+    """Фоновая задача: удалить истекшие ключи"""
+    deleted = db.execute(
+        delete(ApplicationIdempotencyKey)
+        .where(ApplicationIdempotencyKey.created_at <= datetime.now() - timedelta(seconds=IDEMPOTENCY_TTL_SECONDS))
+        .execution_options(synchronize_session=False)
+    ).rowcount
+    db.commit()
+    if deleted:
+        logger.info("Удалено истекших ключей идемпотентности: %d", deleted)
@@ -0,0 +1,249 @@
+import threading
+import time
+from collections import defaultdict
+from datetime import datetime
+from typing import Dict, FrozenSet, Iterable, Iterator, List, Optional, Set, Tuple
+
+from sqlalchemy import func
+from sqlalchemy.orm import Session
+
+from ..models.internship import Internship
+from ..models.tag import Tag
+
+# Как часто перестраивать индекс целиком, чтобы подхватить изменения,
+# сделанные другими воркерами
+REBUILD_INTERVAL_SECONDS = 300
+
+# Измерения, по которым строятся битовые карты
+FACETS = ("campus", "department", "tag", "status")
+
+
+def iter_bits(bitmap: int) -> Iterator[int]:
+    """Перебрать номера установленных битов (id стажировок)"""
+    while bitmap:
+        lowest = bitmap & -bitmap
+        yield lowest.bit_length() - 1
+        bitmap ^= lowest
+
+
+class IndexedInternship:
+    """Компактное представление стажировки в индексе"""
+
+    __slots__ = ("id", "status", "campus_id", "department_id", "created_at", "tag_ids")
+
+    def __init__(
+        self,
+        id: int,
+        status: str,
+        campus_id: Optional[int],
+        department_id: Optional[int],
+        created_at: Optional[datetime],
+        tag_ids: FrozenSet[int],
+    ):
+        self.id = id
+        self.status = status
+        self.campus_id = campus_id
+        self.department_id = department_id
+        self.created_at = created_at
+        self.tag_ids = tag_ids
+
+
+class InternshipIndex:
+    """In-memory матрица стажировка × тег
+
+    Хранится как разреженная матрица: для каждого тега - множество стажировок
+    (posting list), для каждой стажировки - множество ее тегов. Обновляется
+    инкрементально из эндпоинтов создания/изменения/удаления стажировок.
+
+    Дополнительно для каждого корпуса, кафедры, тега и статуса хранится битовая
+    карта (int, где номер бита - id стажировки) для фильтрации и подсчета фасетов.
+    """
+
+    def __init__(self, rebuild_interval: float = REBUILD_INTERVAL_SECONDS):
+        self.rebuild_interval = rebuild_interval
+        self.version = 0
+        self._items: Dict[int, IndexedInternship] = {}
+        self._tag_postings: Dict[int, Set[int]] = defaultdict(set)
+        self._bitmaps: Dict[str, Dict[object, int]] = {facet: {} for facet in FACETS}
+        self._built_at: Optional[float] = None
+        self._signature: Optional[Tuple] = None
+        self._lock = threading.RLock()
+
+    def ensure_loaded(self, db: Session) -> None:
+        """Построить индекс при первом обращении и периодически перестраивать"""
+        built_at = self._built_at
+        if built_at is None or time.monotonic() - built_at > self.rebuild_interval:
+            self.rebuild(db)
+
+    def ensure_current(self, db: Session) -> None:
+        """Перестроить индекс, если таблица стажировок изменилась с момента сборки
+
+        Правки в других воркерах видны только через БД, поэтому там, где индекс
+        должен совпадать с SQL-выборкой (счетчики фасетов), сверяем сигнатуру
+        таблицы - одним агрегатным запросом.
+        """
+        signature = self._table_signature(db)
+        if signature != self._signature:
+            self.rebuild(db, signature)
+
+    def _table_signature(self, db: Session) -> Tuple:
+        # Смена тегов и статуса обновляет updated_at, удаление меняет число строк
+        return tuple(db.query(
+            func.count(Internship.id),
+            func.max(func.coalesce(Internship.updated_at, Internship.created_at)),
+        ).one())
+
+    def rebuild(self, db: Session, signature: Optional[Tuple] = None) -> None:
+        """Полностью перестроить индекс двумя запросами без загрузки ORM-объектов"""
+        # Сигнатура снимается до чтения строк: правка между запросами вызовет еще одну пересборку
+        signature = signature or self._table_signature(db)
+        rows = db.query(
+            Internship.id,
+            Internship.status,
+            Internship.campus_id,
+            Internship.department_id,
+            Internship.created_at,
+        ).all()
+        pairs = db.query(Internship.id, Tag.id).join(Internship.tags).all()
+
+        tags_by_internship: Dict[int, Set[int]] = defaultdict(set)
+        for internship_id, tag_id in pairs:
+            tags_by_internship[internship_id].add(tag_id)
+
+        items: Dict[int, IndexedInternship] = {}
+        postings: Dict[int, Set[int]] = defaultdict(set)
+        bitmaps: Dict[str, Dict[object, int]] = {facet: {} for facet in FACETS}
+        for internship_id, status, campus_id, department_id, created_at in rows:
+            tag_ids = frozenset(tags_by_internship.get(internship_id, ()))
+            item = IndexedInternship(
+                internship_id, status, campus_id, department_id, created_at, tag_ids
+            )
+            items[internship_id] = item
+            for tag_id in tag_ids:
+                postings[tag_id].add(internship_id)
+            self._set_bits(bitmaps, item)
+
+        with self._lock:
+            self._items = items
+            self._tag_postings = postings
+            self._bitmaps = bitmaps
+            self._built_at = time.monotonic()
+            self._signature = signature
+            self.version += 1
+
+    def upsert(self, internship: Internship) -> None:
+        """Добавить или обновить стажировку (теги берутся из загруженной связи)"""
+        tag_ids = frozenset(tag.id for tag in internship.tags)
+        item = IndexedInternship(
+            internship.id,
+            internship.status,
+            internship.campus_id,
+            internship.department_id,
+            internship.created_at,
+            tag_ids,
+        )
+
+        with self._lock:
+            self._discard(internship.id)
+            self._items[internship.id] = item
+            for tag_id in tag_ids:
+                self._tag_postings[tag_id].add(internship.id)
+            self._set_bits(self._bitmaps, item)
+            self.version += 1
+
+    def remove(self, internship_id: int) -> None:
+        with self._lock:
+            self._discard(internship_id)
+            self.version += 1
+
+    def set_status(self, internship_ids: Iterable[int], status: str) -> None:
+        """Массово сменить статус (используется фоновыми задачами)"""
+        with self._lock:
+            for internship_id in internship_ids:
+                item = self._items.get(internship_id)
+                if item is not None:
+                    self._toggle_bit("status", item.status, item.id, False)
+                    item.status = status
+                    self._toggle_bit("status", status, item.id, True)
+            self.version += 1
+
+    def get(self, internship_id: int) -> Optional[IndexedInternship]:
+        return self._items.get(internship_id)
+
+    def items(self) -> Iterable[IndexedInternship]:
+        return list(self._items.values())
+
+    def postings(self, tag_id: int) -> Set[int]:
+        return self._tag_postings.get(tag_id, set())
+
+    def bitmap(self, facet: str, value: object) -> int:
+        return self._bitmaps[facet].get(value, 0)
+
+    def all_bitmap(self) -> int:
+        """Битовая карта всех проиндексированных стажировок"""
+        result = 0
+        for bitmap in self._bitmaps["status"].values():
+            result |= bitmap
+        return result
+
+    def match_tags(self, tag_ids: List[int], match_all: bool = True) -> int:
+        """Стажировки, у которых есть все (AND) или хотя бы один (OR) из тегов"""
+        tag_bitmaps = self._bitmaps["tag"]
+        if match_all:
+            result = -1
+            for tag_id in tag_ids:
+                result &= tag_bitmaps.get(tag_id, 0)
+            return result if tag_ids else 0
+
+        result = 0
+        for tag_id in tag_ids:
+            result |= tag_bitmaps.get(tag_id, 0)
+        return result
+
+    def facet_counts(self, facet: str, result: int) -> Dict[object, int]:
+        """Посчитать количество стажировок из result для каждого значения измерения"""
+        counts = {}
+        for value, bitmap in self._bitmaps[facet].items():
+            count = (bitmap & result).bit_count()
+            if count:
+                counts[value] = count
+        return counts
+
+    def _set_bits(self, bitmaps: Dict[str, Dict[object, int]], item: IndexedInternship) -> None:
+        bit = 1 << item.id
+        for facet, value in (
+            ("campus", item.campus_id),
+            ("department", item.department_id),
+            ("status", item.status),
+        ):
+            bitmaps[facet][value] = bitmaps[facet].get(value, 0) | bit
+        for tag_id in item.tag_ids:
+            bitmaps["tag"][tag_id] = bitmaps["tag"].get(tag_id, 0) | bit
+
+    def _toggle_bit(self, facet: str, value: object, internship_id: int, enabled: bool) -> None:
+        values = self._bitmaps[facet]
+        bitmap = values.get(value, 0)
+        bitmap = bitmap | (1 << internship_id) if enabled else bitmap & ~(1 << internship_id)
+        if bitmap:
+            values[value] = bitmap
+        else:
+            values.pop(value, None)
+
+    def _discard(self, internship_id: int) -> None:
+        item = self._items.pop(internship_id, None)
+        if item is None:
+            return
+        self._toggle_bit("campus", item.campus_id, internship_id, False)
+        self._toggle_bit("department", item.department_id, internship_id, False)
+        self._toggle_bit("status", item.status, internship_id, False)
+        for tag_id in item.tag_ids:
+            self._toggle_bit("tag", tag_id, internship_id, False)
+        for tag_id in item.tag_ids:
+            posting = self._tag_postings.get(tag_id)
+            if posting is not None:
+                posting.discard(internship_id)
+                if not posting:
+                    del self._tag_postings[tag_id]
+
+
+internship_index = InternshipIndex()
@@ -0,0 +1,113 @@
+import logging
+from datetime import datetime
+from typing import List, Optional
+
+from sqlalchemy import delete, func, select, update
+from sqlalchemy.orm import Session
+
+from ..models.internship import Internship
+from ..models.internship_schedule import InternshipPublication
+from .events import application_events
+from .internship_index import internship_index
+from .saved_searches import match_published_ids
+
+logger = logging.getLogger(__name__)
+
+# Сколько стажировок обновляем одним UPDATE
+BATCH_SIZE = 500
+LIFECYCLE_INTERVAL_SECONDS = 60
+# Служебное событие: стажировки сменили статус, индекс обновляется в каждом воркере
+STATUS_CHANGED_EVENT = "internship_status"
+
+
+def _apply_status_change(data: dict) -> None:
+    internship_index.set_status(data["ids"], data["status"])
+
+
+application_events.on_broadcast(STATUS_CHANGED_EVENT, _apply_status_change)
+
+
+def expire_internships(db: Session, now: Optional[datetime] = None) -> List[int]:
+    """Перевести активные стажировки с истекшим дедлайном в статус expired"""
+    now = now or datetime.now()
+    expired_ids: List[int] = []
+
+    while True:
+        batch = (
+            select(Internship.id)
+            .where(
+                Internship.status == "active",
+                Internship.deadline.isnot(None),
+                Internship.deadline < now,
+            )
+            .limit(BATCH_SIZE)
+            .scalar_subquery()
+        )
+        ids = db.execute(
+            update(Internship)
+            .where(Internship.id.in_(batch))
+            .values(status="expired", updated_at=func.now())
+            .returning(Internship.id)
+            .execution_options(synchronize_session=False)
+        ).scalars().all()
+        if ids:
+            application_events.broadcast(db, STATUS_CHANGED_EVENT, {"ids": ids, "status": "expired"})
+        db.commit()
+
+        expired_ids.extend(ids)
+        if len(ids) < BATCH_SIZE:
+            break
+
+    if expired_ids:
+        logger.info("Истек срок у %d стажировок", len(expired_ids))
+
+    return expired_ids
+
+
+def publish_scheduled_internships(db: Session, now: Optional[datetime] = None) -> List[int]:
+    """Опубликовать черновики, у которых наступило время публикации"""
+    now = now or datetime.now()
+    published_ids: List[int] = []
+
+    while True:
+        due_ids = db.execute(
+            select(InternshipPublication.internship_id)
+            .where(InternshipPublication.publish_at <= now)
+            .limit(BATCH_SIZE)
+        ).scalars().all()
+        if not due_ids:
+            break
+
+        ids = db.execute(
+            update(Internship)
+            .where(Internship.id.in_(due_ids), Internship.status == "draft")
+            .values(status="active", updated_at=func.now())
+            .returning(Internship.id)
+            .execution_options(synchronize_session=False)
+        ).scalars().all()
+        db.execute(
+            delete(InternshipPublication)
+            .where(InternshipPublication.internship_id.in_(due_ids))
+            .execution_options(synchronize_session=False)
+        )
+        if ids:
+            application_events.broadcast(db, STATUS_CHANGED_EVENT, {"ids": ids, "status": "active"})
+        db.commit()
+
+        published_ids.extend(ids)
+        if len(due_ids) < BATCH_SIZE:
+            break
+
+    if published_ids:
+        logger.info("Опубликовано %d стажировок по расписанию", len(published_ids))
+
+    return published_ids
+
+
+def run_internship_lifecycle(db: Session) -> None:
+    """Фоновая задача жизненного цикла стажировок"""
+    now = datetime.now()
+    published_ids = publish_scheduled_internships(db, now)
+    if published_ids:
+        match_published_ids(db, published_ids)
+    expire_internships(db, now)
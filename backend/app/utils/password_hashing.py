@@ -0,0 +1,39 @@
+"""
+Хэширование паролей в пуле процессов для массовых операций (bcrypt занимает ядро целиком)
+"""
+import multiprocessing
+import os
+from concurrent.futures import ProcessPoolExecutor
+from typing import Iterator, List
+
+from ..auth.jwt import get_password_hash
+
+PASSWORD_HASH_WORKERS = int(os.getenv("PASSWORD_HASH_WORKERS", "0")) or os.cpu_count() or 2
+# Паролей в одной задаче пула: меньше накладных расходов на передачу между процессами
+HASH_BATCH_SIZE = 50
+
+
+def hash_passwords(passwords: List[str]) -> List[str]:
+    return [get_password_hash(password) for password in passwords]
+
+
+def hash_in_parallel(passwords: List[str]) -> Iterator[List[str]]:
+    """Хэши пачками по HASH_BATCH_SIZE в исходном порядке, по мере готовности
+
+    Все пачки ставятся в пул сразу, поэтому ядра заняты, пока вызывающий
+    код пишет готовые пачки в БД. Если итерацию прервать, оставшиеся задачи отменяются.
+    """
+    # spawn: процессы хэширования не наследуют соединения с БД и потоки воркера
+    pool = ProcessPoolExecutor(
+        max_workers=PASSWORD_HASH_WORKERS,
+        mp_context=multiprocessing.get_context("spawn"),
+    )
+    try:
+        futures = [
+            pool.submit(hash_passwords, passwords[start:start + HASH_BATCH_SIZE])
+            for start in range(0, len(passwords), HASH_BATCH_SIZE)
+        ]
+        for future in futures:
+            yield future.result()
+    finally:
+        pool.shutdown(wait=False, cancel_futures=True)
@@ -0,0 +1,91 @@
+"""
+Права на файлы и заявки: одна проверка - один запрос по первичным ключам
+"""
+from typing import Optional
+
+from fastapi import HTTPException, status
+from sqlalchemy.orm import Session
+
+from ..auth.tokens import Principal
+from ..models.application import Application
+from ..models.file import FileModel
+from .archive import archived_application_owner, archived_file
+
+
+def application_owner(db: Session, application_id: int) -> Optional[int]:
+    """id владельца заявки или None, если заявки нет
+
+    Не кэшируется: заявку могут отозвать или перенести в архив в другом воркере,
+    а проверка - один запрос по первичному ключу.
+    """
+    return db.query(Application.user_id).filter(Application.id == application_id).scalar()
+
+
+def authorize_application(
+    db: Session,
+    principal: Principal,
+    application_id: int,
+    detail: str,
+    allow_admin: bool = True,
+    include_archive: bool = False,
+) -> int:
+    """Проверить доступ к заявке (владелец или админ); возвращает id владельца
+
+    include_archive - искать заявку и в архиве прошлых сезонов (только для чтения).
+    """
+    owner_id = application_owner(db, application_id)
+    if owner_id is None and include_archive:
+        owner_id = archived_application_owner(db, application_id)
+    if owner_id is None:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="Заявка не найдена"
+        )
+    if owner_id != principal.id and not (allow_admin and principal.role == "admin"):
+        raise HTTPException(
+            status_code=status.HTTP_403_FORBIDDEN,
+            detail=detail
+        )
+    return owner_id
+
+
+def authorize_file(
+    db: Session,
+    principal: Principal,
+    file_id: int,
+    detail: str,
+    allow_application_owner: bool = True,
+    include_archive: bool = False,
+):
+    """Загрузить файл вместе с владельцем его заявки и проверить доступ
+
+    Доступ есть у админа, у загрузившего файл и (если allow_application_owner)
+    у владельца заявки. Возвращает строку с полями файла и owner_id.
+    include_archive - искать файл и в архиве (только для чтения: удалять такой файл нельзя).
+    """
+    row = db.query(
+        FileModel.id, FileModel.file_path, FileModel.filename, FileModel.content_type,
+        FileModel.uploaded_by_id, FileModel.application_id,
+        Application.user_id.label("owner_id")
+    ).outerjoin(
+        Application, Application.id == FileModel.application_id
+    ).filter(FileModel.id == file_id).first()
+    if row is None and include_archive:
+        row = archived_file(db, file_id)
+    if row is None:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="Файл не найден"
+        )
+
+    allowed = (
+        principal.role == "admin"
+        or row.uploaded_by_id == principal.id
+        or (allow_application_owner and row.owner_id == principal.id)
+    )
+    if not allowed:
+        raise HTTPException(
+            status_code=status.HTTP_403_FORBIDDEN,
+            detail=detail
+        )
+    return row
@@ -0,0 +1,303 @@
+"""
+Профилирование отдельных запросов: сэмплирующий профайлер и SQL-запросы запроса
+"""
+import logging
+import os
+import random
+import secrets
+import sys
+import threading
+import time
+from collections import deque
+from contextvars import ContextVar
+from datetime import datetime
+from typing import Callable, Deque, Dict, List, Optional, Tuple
+
+import orjson
+from fastapi import HTTPException, Request, Response
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+
+from ..auth.tokens import decode_token
+from .compression import CompressedRoute
+from .revocation import revocations
+
+try:
+    from pyinstrument import Profiler as PyinstrumentProfiler
+    from pyinstrument.renderers import SpeedscopeRenderer
+except ImportError:  # pyinstrument - необязательная зависимость
+    PyinstrumentProfiler = None
+
+logger = logging.getLogger(__name__)
+
+# Заголовок, которым админ включает профилирование своего запроса
+PROFILE_HEADER = "x-profile"
+# Доля запросов любых пользователей, которые профилируются без заголовка (0 - выключено)
+PROFILE_SAMPLE_RATE = float(os.getenv("PROFILE_SAMPLE_RATE", "0"))
+PROFILE_INTERVAL_SECONDS = float(os.getenv("PROFILE_INTERVAL_MS", "1")) / 1000
+PROFILE_MAX_CAPTURES = int(os.getenv("PROFILE_MAX_CAPTURES", "50"))
+MAX_STATEMENTS = 500
+MAX_STATEMENT_LENGTH = 2000
+# Отрезков стека в профиле встроенного сэмплера (одинаковые подряд склеиваются)
+MAX_SAMPLES = 20000
+
+SPEEDSCOPE_SCHEMA = "https://www.speedscope.app/file-format-schema.json"
+
+
+class SqlCapture:
+    """SQL-запросы одного профилируемого запроса (без параметров - в них бывают персональные данные)"""
+
+    def __init__(self):
+        self.statements: List[dict] = []
+        self.count = 0
+        self.total_ms = 0.0
+
+    def add(self, statement: str, executemany: bool, rows: int, elapsed: float) -> None:
+        elapsed_ms = elapsed * 1000
+        self.count += 1
+        self.total_ms += elapsed_ms
+        if len(self.statements) < MAX_STATEMENTS:
+            self.statements.append({
+                "statement": statement[:MAX_STATEMENT_LENGTH],
+                "duration_ms": round(elapsed_ms, 3),
+                "executemany": executemany,
+                "rowcount": rows,
+            })
+
+
+# Пока профилирования нет, обработчики событий движка только читают эту переменную
+_sql_capture: ContextVar[Optional[SqlCapture]] = ContextVar("profile_sql_capture", default=None)
+
+
+@event.listens_for(Engine, "before_cursor_execute")
+def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany) -> None:
+    if _sql_capture.get() is not None and context is not None:
+        context._profile_started = time.perf_counter()
+
+
+@event.listens_for(Engine, "after_cursor_execute")
+def _after_cursor_execute(conn, cursor, statement, parameters, context, executemany) -> None:
+    capture = _sql_capture.get()
+    started = getattr(context, "_profile_started", None)
+    if capture is not None and started is not None:
+        capture.add(statement, executemany, cursor.rowcount, time.perf_counter() - started)
+
+
+class StackSampler:
+    """Встроенный сэмплирующий профайлер: стек потока запроса раз в interval секунд
+
+    Запросы выполняются в потоке цикла событий, поэтому в профиль попадают и
+    кадры конкурентных запросов этого воркера. С pyinstrument профиль точнее.
+    """
+
+    name = "sampler"
+
+    def __init__(self, interval: float = PROFILE_INTERVAL_SECONDS):
+        self.interval = interval
+        self._frames: Dict[Tuple[str, str, int], int] = {}
+        self._frame_list: List[dict] = []
+        self._samples: List[List[int]] = []
+        self._weights: List[float] = []
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+    def start(self) -> None:
+        self._target = threading.get_ident()
+        self._started = time.perf_counter()
+        self._thread = threading.Thread(target=self._run, name="request-profiler", daemon=True)
+        self._thread.start()
+
+    def _run(self) -> None:
+        last = time.perf_counter()
+        while not self._stop.wait(self.interval):
+            frame = sys._current_frames().get(self._target)
+            now = time.perf_counter()
+            if frame is not None:
+                self._record(frame, (now - last) * 1000)
+            last = now
+
+    def _record(self, frame, weight_ms: float) -> None:
+        stack = []
+        while frame is not None:
+            code = frame.f_code
+            key = (getattr(code, "co_qualname", code.co_name), code.co_filename, code.co_firstlineno)
+            index = self._frames.get(key)
+            if index is None:
+                index = self._frames[key] = len(self._frame_list)
+                self._frame_list.append({"name": key[0], "file": key[1], "line": key[2]})
+            stack.append(index)
+            frame = frame.f_back
+        stack.reverse()
+
+        if self._samples and self._samples[-1] == stack:
+            self._weights[-1] += weight_ms
+        elif len(self._samples) < MAX_SAMPLES:
+            self._samples.append(stack)
+            self._weights.append(weight_ms)
+
+    def stop(self, title: str) -> bytes:
+        """Остановить сэмплер и вернуть профиль в формате speedscope"""
+        self._stop.set()
+        self._thread.join()
+        return orjson.dumps({
+            "$schema": SPEEDSCOPE_SCHEMA,
+            "name": title,
+            "exporter": "uniinternships-backend",
+            "shared": {"frames": self._frame_list},
+            "profiles": [{
+                "type": "sampled",
+                "name": title,
+                "unit": "milliseconds",
+                "startValue": 0,
+                "endValue": round((time.perf_counter() - self._started) * 1000, 3),
+                "samples": self._samples,
+                "weights": [round(weight, 3) for weight in self._weights],
+            }],
+        })
+
+
+class PyinstrumentSampler:
+    """pyinstrument в асинхронном режиме: в профиль попадает только свой запрос"""
+
+    name = "pyinstrument"
+
+    def __init__(self, interval: float = PROFILE_INTERVAL_SECONDS):
+        self._profiler = PyinstrumentProfiler(interval=interval, async_mode="enabled")
+
+    def start(self) -> None:
+        self._profiler.start()
+
+    def stop(self, title: str) -> bytes:
+        self._profiler.stop()
+        return self._profiler.output(renderer=SpeedscopeRenderer()).encode()
+
+
+class ProfileCapture:
+    """Результат профилирования одного запроса"""
+
+    def __init__(self, capture_id: str, request: Request, trigger: str, profiler: str):
+        self.id = capture_id
+        self.method = request.method
+        self.path = request.url.path
+        self.query = request.url.query[:500]
+        self.trigger = trigger
+        self.profiler = profiler
+        self.captured_at = datetime.now()
+        self.status_code = 500
+        self.duration_ms = 0.0
+        self.sql = SqlCapture()
+        self.speedscope = b""
+
+    def summary(self) -> dict:
+        return {
+            "id": self.id,
+            "method": self.method,
+            "path": self.path,
+            "query": self.query,
+            "status_code": self.status_code,
+            "trigger": self.trigger,
+            "profiler": self.profiler,
+            "captured_at": self.captured_at,
+            "duration_ms": round(self.duration_ms, 3),
+            "sql_count": self.sql.count,
+            "sql_ms": round(self.sql.total_ms, 3),
+        }
+
+    def details(self) -> dict:
+        return {**self.summary(), "sql": self.sql.statements}
+
+
+class ProfileStore:
+    """Последние PROFILE_MAX_CAPTURES результатов в памяти воркера"""
+
+    def __init__(self, maxsize: int = PROFILE_MAX_CAPTURES):
+        self._captures: Deque[ProfileCapture] = deque(maxlen=maxsize)
+        self._lock = threading.Lock()
+
+    def add(self, capture: ProfileCapture) -> None:
+        with self._lock:
+            self._captures.append(capture)
+
+    def list(self) -> List[ProfileCapture]:
+        with self._lock:
+            return list(reversed(self._captures))
+
+    def get(self, capture_id: str) -> Optional[ProfileCapture]:
+        with self._lock:
+            return next((capture for capture in self._captures if capture.id == capture_id), None)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._captures.clear()
+
+
+profile_store = ProfileStore()
+
+# Одновременно профилируется один запрос на воркер: профиль не смешивается
+# с другим, а стоимость профилирования ограничена
+_profiling = threading.Lock()
+
+
+async def _is_admin_request(request: Request) -> bool:
+    scheme, _, token = request.headers.get("authorization", "").partition(" ")
+    if scheme.lower() != "bearer" or not token:
+        return False
+    try:
+        claims = decode_token(token, "access")
+    except HTTPException:
+        return False
+    return claims.get("role") == "admin" and not await revocations.is_revoked_async(claims)
+
+
+async def profile_trigger(request: Request) -> Optional[str]:
+    """Причина профилировать запрос: заголовок админа или случайная выборка"""
+    if PROFILE_SAMPLE_RATE and random.random() < PROFILE_SAMPLE_RATE:
+        return "sample"
+    if PROFILE_HEADER in request.headers and await _is_admin_request(request):
+        return "header"
+    return None
+
+
+async def profile_request(request: Request, handler: Callable, trigger: str) -> Response:
+    """Выполнить запрос под профайлером и сохранить результат"""
+    if not _profiling.acquire(blocking=False):
+        return await handler(request)
+
+    sampler = PyinstrumentSampler() if PyinstrumentProfiler is not None else StackSampler()
+    capture = ProfileCapture(secrets.token_hex(8), request, trigger, sampler.name)
+    sql_token = _sql_capture.set(capture.sql)
+    started = time.perf_counter()
+    sampler.start()
+    try:
+        response = await handler(request)
+        capture.status_code = response.status_code
+    except Exception as error:
+        capture.status_code = getattr(error, "status_code", 500)
+        raise
+    finally:
+        capture.duration_ms = (time.perf_counter() - started) * 1000
+        try:
+            capture.speedscope = sampler.stop(f"{capture.method} {capture.path}")
+        except Exception:
+            logger.exception("Не удалось построить профиль запроса %s", capture.path)
+        _sql_capture.reset(sql_token)
+        _profiling.release()
+        profile_store.add(capture)
+
+    response.headers["X-Profile-Id"] = capture.id
+    return response
+
+
+class ProfiledRoute(CompressedRoute):
+    """Маршрут со сжатием ответа и профилированием по запросу"""
+
+    def get_route_handler(self) -> Callable:
+        handler = super().get_route_handler()
+
+        async def profiled_handler(request: Request) -> Response:
+            trigger = await profile_trigger(request)
+            if trigger is None:
+                return await handler(request)
+            return await profile_request(request, handler, trigger)
+
+        return profiled_handler
@@ -0,0 +1,227 @@
+"""
+Ограничение частоты запросов: token bucket по IP, аккаунту и классу маршрута
+"""
+import logging
+import math
+import os
+import threading
+import time
+from collections import OrderedDict
+from typing import Callable, Dict, List, NamedTuple, Optional, Tuple
+
+from fastapi import Depends, HTTPException, Request, status
+
+try:
+    import redis.asyncio as redis_asyncio
+except ImportError:  # redis нужен только для общего хранилища между воркерами
+    redis_asyncio = None
+
+logger = logging.getLogger(__name__)
+
+RATE_LIMIT_ENABLED = os.getenv("RATE_LIMIT_ENABLED", "true").lower() == "true"
+# Общее хранилище корзин для нескольких воркеров; без него у каждого воркера свои корзины
+RATE_LIMIT_REDIS_URL = os.getenv("RATE_LIMIT_REDIS_URL")
+# За обратным прокси адрес клиента берется из X-Forwarded-For
+RATE_LIMIT_TRUST_PROXY = os.getenv("RATE_LIMIT_TRUST_PROXY", "false").lower() == "true"
+MAX_LOCAL_BUCKETS = 100000
+
+
+class Limit(NamedTuple):
+    scope: str  # "ip" или "account"
+    per_minute: float
+    burst: int
+    # Общий лимит на каждый запрос проверяется только локально, без сетевого хопа
+    shared: bool = True
+
+    @property
+    def rate(self) -> float:
+        return self.per_minute / 60
+
+
+# Лимиты по классам маршрутов. Лимиты по IP щадящие: студенты часто выходят
+# в сеть через один NAT университета
+LIMITS: Dict[str, List[Limit]] = {
+    "api": [Limit("ip", per_minute=1200, burst=200, shared=False)],
+    "login": [Limit("ip", per_minute=30, burst=30), Limit("account", per_minute=5, burst=10)],
+    "register": [Limit("ip", per_minute=10, burst=20)],
+    "upload": [Limit("ip", per_minute=60, burst=60), Limit("account", per_minute=20, burst=10)],
+}
+
+
+# Корзина для списания: ключ, токенов в секунду, емкость
+Bucket = Tuple[str, float, int]
+
+
+class MemoryBucketStore:
+    """Корзины в памяти процесса (один воркер, тесты, локальная разработка)"""
+
+    def __init__(self, maxsize: int = MAX_LOCAL_BUCKETS):
+        self.maxsize = maxsize
+        self._buckets: "OrderedDict[str, Tuple[float, float]]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def take_now(self, key: str, rate: float, burst: int, cost: float = 1.0) -> Tuple[bool, float]:
+        return self.take_all_now([(key, rate, burst)], cost)
+
+    def take_all_now(self, buckets: List[Bucket], cost: float = 1.0) -> Tuple[bool, float]:
+        """Списать из всех корзин сразу или ни из одной, если хоть в одной не хватает токенов"""
+        now = time.monotonic()
+        with self._lock:
+            levels = []
+            retry_after = 0.0
+            for key, rate, burst in buckets:
+                tokens, updated = self._buckets.pop(key, (burst, now))
+                tokens = min(burst, tokens + (now - updated) * rate)
+                levels.append(tokens)
+                if tokens < cost:
+                    retry_after = max(retry_after, (cost - tokens) / rate)
+
+            for (key, _, _), tokens in zip(buckets, levels):
+                self._buckets[key] = (tokens - cost if retry_after == 0.0 else tokens, now)
+            # Вытесняем давно не использованные корзины - они все равно уже полные
+            while len(self._buckets) > self.maxsize:
+                self._buckets.popitem(last=False)
+        return retry_after == 0.0, retry_after
+
+    def refund(self, buckets: List[Bucket], cost: float = 1.0) -> None:
+        """Вернуть списанные токены (запрос отклонила корзина в другом хранилище)"""
+        with self._lock:
+            for key, _, burst in buckets:
+                state = self._buckets.get(key)
+                if state is not None:
+                    self._buckets[key] = (min(burst, state[0] + cost), state[1])
+
+    async def take(self, key: str, rate: float, burst: int, cost: float = 1.0) -> Tuple[bool, float]:
+        return self.take_now(key, rate, burst, cost)
+
+    async def take_all(self, buckets: List[Bucket], cost: float = 1.0) -> Tuple[bool, float]:
+        return self.take_all_now(buckets, cost)
+
+
+# Атомарное списание из нескольких корзин в Redis: сначала проверяются все, токены
+# списываются, только если хватает в каждой. Время берется из Redis, чтобы часы
+# воркеров не влияли
+_REDIS_TAKE = """
+local cost = tonumber(ARGV[1])
+local clock = redis.call('TIME')
+local now = tonumber(clock[1]) + tonumber(clock[2]) / 1000000
+local levels = {}
+local retry_after = 0
+for i, key in ipairs(KEYS) do
+    local rate = tonumber(ARGV[2 * i])
+    local burst = tonumber(ARGV[2 * i + 1])
+    local state = redis.call('HMGET', key, 'tokens', 'ts')
+    local tokens = tonumber(state[1]) or burst
+    local updated = tonumber(state[2]) or now
+    tokens = math.min(burst, tokens + (now - updated) * rate)
+    levels[i] = tokens
+    if tokens < cost then
+        retry_after = math.max(retry_after, (cost - tokens) / rate)
+    end
+end
+for i, key in ipairs(KEYS) do
+    local rate = tonumber(ARGV[2 * i])
+    local burst = tonumber(ARGV[2 * i + 1])
+    local tokens = levels[i]
+    if retry_after == 0 then
+        tokens = tokens - cost
+    end
+    redis.call('HSET', key, 'tokens', tokens, 'ts', now)
+    redis.call('EXPIRE', key, math.ceil(burst / rate) + 1)
+end
+return tostring(retry_after)
+"""
+
+
+class RedisBucketStore:
+    """Корзины в Redis, общие для всех воркеров; при недоступности Redis - локальные"""
+
+    def __init__(self, url: str, fallback: MemoryBucketStore):
+        self.client = redis_asyncio.from_url(url)
+        self.script = self.client.register_script(_REDIS_TAKE)
+        self.fallback = fallback
+
+    async def take(self, key: str, rate: float, burst: int, cost: float = 1.0) -> Tuple[bool, float]:
+        return await self.take_all([(key, rate, burst)], cost)
+
+    async def take_all(self, buckets: List[Bucket], cost: float = 1.0) -> Tuple[bool, float]:
+        args: List[float] = [cost]
+        for _, rate, burst in buckets:
+            args.extend((rate, burst))
+        try:
+            retry_after = float(await self.script(keys=[f"ratelimit:{key}" for key, _, _ in buckets], args=args))
+        except Exception:
+            logger.warning("Redis недоступен, лимиты считаются локально", exc_info=True)
+            return await self.fallback.take_all(buckets, cost)
+        return retry_after == 0.0, retry_after
+
+
+local_store = MemoryBucketStore()
+shared_store = (
+    RedisBucketStore(RATE_LIMIT_REDIS_URL, local_store)
+    if RATE_LIMIT_REDIS_URL and redis_asyncio is not None
+    else local_store
+)
+
+
+def client_ip(request: Request) -> str:
+    if RATE_LIMIT_TRUST_PROXY:
+        forwarded = request.headers.get("x-forwarded-for")
+        if forwarded:
+            return forwarded.split(",")[0].strip()
+    return request.client.host if request.client else "unknown"
+
+
+async def enforce_rate_limit(request: Request, route_class: str, account: Optional[str] = None) -> None:
+    """Списать по токену из каждой корзины класса маршрута, при нехватке - 429
+
+    Токены списываются, только если запрос пропускают все корзины: клиент,
+    упершийся в лимит аккаунта, не расходует лимит своего IP (и наоборот),
+    поэтому не мешает другим пользователям за тем же NAT.
+    """
+    if not RATE_LIMIT_ENABLED:
+        return
+
+    local_buckets: List[Bucket] = []
+    shared_buckets: List[Bucket] = []
+    for limit in LIMITS[route_class]:
+        if limit.scope == "account":
+            if account is None:
+                continue
+            key = f"{route_class}:account:{account}"
+        else:
+            key = f"{route_class}:ip:{client_ip(request)}"
+
+        shared = limit.shared and shared_store is not local_store
+        (shared_buckets if shared else local_buckets).append((key, limit.rate, limit.burst))
+
+    allowed, retry_after = await local_store.take_all(local_buckets) if local_buckets else (True, 0.0)
+    if allowed and shared_buckets:
+        allowed, retry_after = await shared_store.take_all(shared_buckets)
+        if not allowed and local_buckets:
+            local_store.refund(local_buckets)
+
+    if not allowed:
+        raise HTTPException(
+            status_code=status.HTTP_429_TOO_MANY_REQUESTS,
+            detail="Слишком много запросов, повторите позже",
+            headers={"Retry-After": str(math.ceil(retry_after))},
+        )
+
+
+def rate_limit(route_class: str, account: Optional[Callable] = None):
+    """Зависимость: лимит класса маршрута; account - зависимость, возвращающая аккаунт
+
+    account может вернуть пользователя (берется его id) или строку (например, email при входе).
+    """
+    if account is None:
+        async def limit(request: Request):
+            await enforce_rate_limit(request, route_class)
+
+        return limit
+
+    async def limit_with_account(request: Request, account_value=Depends(account)):
+        key = getattr(account_value, "id", account_value)
+        await enforce_rate_limit(request, route_class, None if key is None else str(key).lower())
+
+    return limit_with_account
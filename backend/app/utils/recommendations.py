@@ -0,0 +1,144 @@
+import heapq
+import math
+from collections import Counter
+from datetime import datetime, timezone
+from typing import Dict, Iterable, List, Set, Tuple
+
+from sqlalchemy.orm import Session
+
+from ..models import UserTag
+from ..models.application import Application
+from ..models.internship import Internship
+from .cache import TTLCache
+from .internship_index import InternshipIndex, internship_index
+from .reference import InternshipView, reference_loaders, with_references
+
+# Веса компонентов итоговой оценки
+CAMPUS_BOOST = 0.15
+DEPARTMENT_BOOST = 0.25
+RECENCY_BOOST = 0.2
+RECENCY_HALF_LIFE_DAYS = 14
+
+# Сколько позиций храним в кэше ленты одного пользователя
+FEED_SIZE = 50
+FEED_CACHE_TTL_SECONDS = 600
+
+_feed_cache = TTLCache(ttl=FEED_CACHE_TTL_SECONDS, maxsize=50000)
+
+
+def score_internships(
+    index: InternshipIndex,
+    user_tag_ids: Set[int],
+    campus_weights: Dict[int, float],
+    department_weights: Dict[int, float],
+    exclude_ids: Set[int],
+    limit: int,
+    now: datetime,
+) -> List[Tuple[int, float]]:
+    """Оценить все активные стажировки за один проход
+
+    Сходство по навыкам - косинусная мера между бинарным вектором тегов
+    пользователя и вектором тегов стажировки. Произведение матрицы на вектор
+    считается по posting list'ам только тех тегов, которые есть у пользователя.
+    """
+    overlaps: Counter = Counter()
+    for tag_id in user_tag_ids:
+        overlaps.update(index.postings(tag_id))
+
+    user_norm = math.sqrt(len(user_tag_ids)) if user_tag_ids else 0.0
+    decay = math.log(2) / RECENCY_HALF_LIFE_DAYS
+    now_aware = now.astimezone(timezone.utc) if now.tzinfo is None else now
+
+    scored = []
+    for item in index.items():
+        if item.status != "active" or item.id in exclude_ids:
+            continue
+
+        overlap = overlaps.get(item.id, 0)
+        similarity = overlap / (user_norm * math.sqrt(len(item.tag_ids))) if overlap else 0.0
+
+        score = similarity
+        score += CAMPUS_BOOST * campus_weights.get(item.campus_id, 0.0)
+        score += DEPARTMENT_BOOST * department_weights.get(item.department_id, 0.0)
+        if item.created_at is not None:
+            reference = now if item.created_at.tzinfo is None else now_aware
+            age_days = max((reference - item.created_at).total_seconds() / 86400, 0.0)
+            score += RECENCY_BOOST * math.exp(-decay * age_days)
+
+        scored.append((item.id, score))
+
+    return heapq.nlargest(limit, scored, key=lambda pair: pair[1])
+
+
+def _history_weights(index: InternshipIndex, internship_ids: Iterable[int]) -> Tuple[Dict[int, float], Dict[int, float]]:
+    """Доли корпусов и кафедр среди прошлых заявок пользователя"""
+    campuses: Counter = Counter()
+    departments: Counter = Counter()
+    total = 0
+    for internship_id in internship_ids:
+        item = index.get(internship_id)
+        if item is None:
+            continue
+        campuses[item.campus_id] += 1
+        departments[item.department_id] += 1
+        total += 1
+
+    if not total:
+        return {}, {}
+
+    return (
+        {key: count / total for key, count in campuses.items()},
+        {key: count / total for key, count in departments.items()},
+    )
+
+
+def get_recommended_ids(db: Session, user_id: int, limit: int) -> List[int]:
+    """Получить id рекомендованных стажировок с кэшированием ленты"""
+    internship_index.ensure_loaded(db)
+
+    cached = _feed_cache.get(user_id)
+    if cached is not None and cached[0] == internship_index.version:
+        return cached[1][:limit]
+
+    user_tag_ids = {
+        tag_id for (tag_id,) in db.query(UserTag.tag_id).filter(UserTag.user_id == user_id)
+    }
+    applied_ids = {
+        internship_id
+        for (internship_id,) in db.query(Application.internship_id).filter(Application.user_id == user_id)
+    }
+    campus_weights, department_weights = _history_weights(internship_index, applied_ids)
+
+    ranked = score_internships(
+        internship_index,
+        user_tag_ids,
+        campus_weights,
+        department_weights,
+        exclude_ids=applied_ids,
+        limit=FEED_SIZE,
+        now=datetime.now(),
+    )
+    internship_ids = [internship_id for internship_id, _ in ranked]
+
+    _feed_cache.set(user_id, (internship_index.version, internship_ids))
+    return internship_ids[:limit]
+
+
+def load_recommended_internships(db: Session, user_id: int, limit: int) -> List[InternshipView]:
+    """Рекомендованные стажировки одним запросом, в порядке ранжирования"""
+    internship_ids = get_recommended_ids(db, user_id, limit)
+    if not internship_ids:
+        return []
+
+    # Корпус, кафедра и теги подставляются из реестра справочников
+    internships = db.query(Internship).options(
+        *reference_loaders().values()
+    ).filter(Internship.id.in_(internship_ids)).all()
+
+    by_id = {internship.id: internship for internship in with_references(db, internships)}
+    return [by_id[internship_id] for internship_id in internship_ids if internship_id in by_id]
+
+
+def invalidate_user_recommendations(user_id: int) -> None:
+    """Сбросить ленту пользователя (например, после подачи заявки)"""
+    _feed_cache.delete(user_id)
@@ -0,0 +1,227 @@
+"""
+Реестр справочников (корпуса, кафедры, теги) в памяти воркера
+"""
+import asyncio
+import logging
+import os
+import threading
+import time
+from collections import defaultdict
+from types import SimpleNamespace
+from typing import Dict, FrozenSet, Iterable, List, Optional, Tuple
+
+from sqlalchemy import inspect
+from sqlalchemy.orm import Session, make_transient_to_detached, noload
+from sqlalchemy.orm.util import identity_key
+
+from ..database import SessionLocal
+from ..models.campus import Campus
+from ..models.department import Department
+from ..models.internship import Internship
+from ..models.tag import Tag
+from .http_cache import weak_etag
+
+logger = logging.getLogger(__name__)
+
+# Справочники меняются редко - воркер перечитывает их раз в минуту и при промахе по id
+REFERENCE_REFRESH_SECONDS = float(os.getenv("REFERENCE_REFRESH_SECONDS", "60"))
+# Перечитывать справочники из-за неизвестного id не чаще этого интервала -
+# иначе запросы с несуществующими id превращаются в полные чтения справочников
+REFERENCE_MISS_REFRESH_SECONDS = 5
+
+# Связи стажировки, которые отдаются из реестра, а не из БД
+REFERENCE_RELATIONS = frozenset({"campus", "department", "tags"})
+
+
+def _snapshot(model, db: Session) -> Dict[int, SimpleNamespace]:
+    """Строки справочника как неизменяемые снимки колонок (без ORM-сессии)"""
+    columns = [attr.key for attr in inspect(model).column_attrs]
+    rows = db.query(*(getattr(model, name) for name in columns)).order_by(model.id).all()
+    return {row.id: SimpleNamespace(**dict(zip(columns, row))) for row in rows}
+
+
+class ReferenceRegistry:
+    """Корпуса, кафедры и теги по id
+
+    Версия - хэш содержимого, поэтому у всех воркеров с одинаковыми данными
+    одинаковый ETag. Снимки заменяются целиком, читатели не блокируются.
+    """
+
+    def __init__(self, refresh_interval: float = REFERENCE_REFRESH_SECONDS):
+        self.refresh_interval = refresh_interval
+        self.campuses: Dict[int, SimpleNamespace] = {}
+        self.departments: Dict[int, SimpleNamespace] = {}
+        self.tags: Dict[int, SimpleNamespace] = {}
+        self.etag = weak_etag("reference")
+        # (ETag, тело ответа GET /reference) заменяются вместе
+        self._published: Tuple[str, dict] = (self.etag, {})
+        self._loaded_at: Optional[float] = None
+        self._lock = threading.Lock()
+        self._task: Optional[asyncio.Task] = None
+
+    @property
+    def version(self) -> str:
+        return self.etag[3:-1]
+
+    def ensure_loaded(self, db: Session) -> None:
+        loaded_at = self._loaded_at
+        if loaded_at is None or time.monotonic() - loaded_at > self.refresh_interval:
+            self.refresh(db)
+
+    def refresh_on_miss(self, db: Session) -> None:
+        """Перечитать справочники из-за неизвестного id, если они давно не обновлялись"""
+        loaded_at = self._loaded_at
+        if loaded_at is None or time.monotonic() - loaded_at >= REFERENCE_MISS_REFRESH_SECONDS:
+            self.refresh(db)
+
+    def refresh(self, db: Session) -> None:
+        """Перечитать справочники тремя запросами"""
+        campuses = _snapshot(Campus, db)
+        departments = _snapshot(Department, db)
+        tags = _snapshot(Tag, db)
+        payload = {
+            "campuses": [vars(item) for item in campuses.values()],
+            "departments": [vars(item) for item in departments.values()],
+            "tags": [vars(item) for item in tags.values()],
+        }
+        etag = weak_etag("reference", repr(payload))
+
+        with self._lock:
+            if etag != self.etag:
+                self.campuses, self.departments, self.tags = campuses, departments, tags
+                self.etag = etag
+                self._published = (etag, {"version": etag[3:-1], **payload})
+            self._loaded_at = time.monotonic()
+
+    def published(self) -> Tuple[str, dict]:
+        """ETag и содержимое справочников для GET /reference"""
+        return self._published
+
+    def _lookup(self, db: Session, table: str, item_id: Optional[int]) -> Optional[SimpleNamespace]:
+        if item_id is None:
+            return None
+        self.ensure_loaded(db)
+        item = getattr(self, table).get(item_id)
+        # Запись могла появиться после загрузки реестра
+        if item is None:
+            self.refresh_on_miss(db)
+            item = getattr(self, table).get(item_id)
+        return item
+
+    def campus(self, db: Session, campus_id: Optional[int]) -> Optional[SimpleNamespace]:
+        return self._lookup(db, "campuses", campus_id)
+
+    def department(self, db: Session, department_id: Optional[int]) -> Optional[SimpleNamespace]:
+        return self._lookup(db, "departments", department_id)
+
+    def attach_tags(self, db: Session, tag_ids: Iterable[int]) -> List[Tag]:
+        """ORM-объекты тегов для связи стажировки без SELECT (несуществующие id пропускаются)"""
+        self.ensure_loaded(db)
+        tag_ids = list(dict.fromkeys(tag_ids))
+        if any(tag_id not in self.tags for tag_id in tag_ids):
+            self.refresh_on_miss(db)
+
+        tags = []
+        for tag_id in tag_ids:
+            snapshot = self.tags.get(tag_id)
+            if snapshot is None:
+                continue
+            tag = db.identity_map.get(identity_key(Tag, tag_id))
+            if tag is None:
+                # Объект с известным первичным ключом считается уже сохраненным
+                tag = Tag(**vars(snapshot))
+                make_transient_to_detached(tag)
+                db.add(tag)
+            tags.append(tag)
+        return tags
+
+    def _refresh_once(self) -> None:
+        db = SessionLocal()
+        try:
+            self.refresh(db)
+        finally:
+            db.close()
+
+    async def _loop(self) -> None:
+        while True:
+            try:
+                await asyncio.to_thread(self._refresh_once)
+            except Exception:
+                logger.exception("Не удалось обновить справочники")
+            await asyncio.sleep(self.refresh_interval)
+
+    async def start(self) -> None:
+        if self._task is None:
+            self._task = asyncio.create_task(self._loop())
+
+    async def stop(self) -> None:
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+
+
+reference_registry = ReferenceRegistry()
+
+
+class InternshipView:
+    """Стажировка, у которой корпус, кафедра и теги взяты из реестра"""
+
+    __slots__ = ("_internship", "campus", "department", "tags")
+
+    def __init__(self, internship: Internship, campus, department, tags):
+        self._internship = internship
+        self.campus = campus
+        self.department = department
+        self.tags = tags
+
+    def __getattr__(self, name: str):
+        return getattr(self._internship, name)
+
+
+def reference_loaders() -> dict:
+    """Опции загрузки для load_options: справочные связи из БД не читаются"""
+    return {name: noload(getattr(Internship, name)) for name in REFERENCE_RELATIONS}
+
+
+def reference_columns(fields: Optional[FrozenSet[str]]) -> List[str]:
+    """Колонки, которые нужны для сборки запрошенных справочных связей"""
+    needed = REFERENCE_RELATIONS if fields is None else REFERENCE_RELATIONS & fields
+    return [f"{name}_id" for name in ("campus", "department") if name in needed]
+
+
+def with_references(db: Session, internships: List[Internship]) -> List[InternshipView]:
+    """Подставить справочные связи по id из реестра
+
+    Теги стажировок читаются одним запросом на страницу: индекс воркера узнает
+    о правках в других воркерах с задержкой, а ответы кэшируются по updated_at.
+    """
+    if not internships:
+        return []
+    reference_registry.ensure_loaded(db)
+
+    loaded_tags = defaultdict(set)
+    for internship_id, tag_id in db.query(Internship.id, Tag.id).join(Internship.tags).filter(
+        Internship.id.in_([internship.id for internship in internships])
+    ):
+        loaded_tags[internship_id].add(tag_id)
+    if any(tag_id not in reference_registry.tags for tag_ids in loaded_tags.values() for tag_id in tag_ids):
+        reference_registry.refresh_on_miss(db)
+
+    campuses, departments, tags = reference_registry.campuses, reference_registry.departments, reference_registry.tags
+    views = []
+    for internship in internships:
+        state = inspect(internship)
+        # Колонки, не выбранные через ?fields=, не читаем - иначе ORM догрузит их по одной
+        campus_id = None if "campus_id" in state.unloaded else internship.campus_id
+        department_id = None if "department_id" in state.unloaded else internship.department_id
+        views.append(InternshipView(
+            internship,
+            campuses.get(campus_id),
+            departments.get(department_id),
+            [tags[tag_id] for tag_id in sorted(loaded_tags.get(internship.id, ())) if tag_id in tags],
+        ))
+    return views
@@ -0,0 +1,231 @@
+"""
+Фоновое извлечение текста из файлов заявок и поиск заявок по тексту резюме
+"""
+import hashlib
+import logging
+import multiprocessing
+import os
+from concurrent.futures import ProcessPoolExecutor, TimeoutError as FutureTimeout
+from typing import Dict, Optional, Tuple
+
+from sqlalchemy import exists, func, select
+from sqlalchemy.orm import Session
+
+from ..models.application import Application
+from ..models.file import FileModel
+from ..models.file_text import FileExtraction, FileText
+from .storage import storage
+from .text_extraction import UnsupportedDocument, extract_text
+
+logger = logging.getLogger(__name__)
+
+EXTRACTION_WORKERS = int(os.getenv("EXTRACTION_WORKERS", "2"))
+# Файлы до 5 МБ читаются в память целиком - пачка ограничивает расход памяти
+EXTRACTION_BATCH_SIZE = int(os.getenv("EXTRACTION_BATCH_SIZE", "20"))
+EXTRACTION_TIMEOUT_SECONDS = 30
+EXTRACTION_INTERVAL_SECONDS = 30
+# Пачек за один запуск задачи, чтобы не занимать планировщик надолго
+MAX_BATCHES_PER_RUN = 10
+# Конфигурация полнотекстового поиска PostgreSQL: русские слова и латиница со стеммингом
+TS_CONFIG = "russian"
+
+# (content_hash, status, error)
+ExtractionResult = Tuple[Optional[str], str, Optional[str]]
+
+_pool: Optional[ProcessPoolExecutor] = None
+
+
+def _get_pool() -> ProcessPoolExecutor:
+    global _pool
+    if _pool is None:
+        # spawn: процессы разбора не наследуют соединения с БД и потоки воркера
+        _pool = ProcessPoolExecutor(
+            max_workers=EXTRACTION_WORKERS,
+            mp_context=multiprocessing.get_context("spawn"),
+        )
+    return _pool
+
+
+def _terminate_pool() -> None:
+    """Остановить пул вместе с зависшими процессами разбора"""
+    global _pool
+    if _pool is None:
+        return
+    # У ProcessPoolExecutor нет отмены уже выполняющейся задачи - завершаем процессы
+    for process in list((_pool._processes or {}).values()):
+        process.terminate()
+    _pool.shutdown(wait=False, cancel_futures=True)
+    _pool = None
+
+
+def shutdown_extraction_pool() -> None:
+    global _pool
+    if _pool is not None:
+        _pool.shutdown(wait=False, cancel_futures=True)
+        _pool = None
+
+
+def _read(file_path: str) -> bytes:
+    source = storage.open(file_path)
+    try:
+        return source.read()
+    finally:
+        source.close()
+
+
+def _pending_files(db: Session, limit: int):
+    return db.query(
+        FileModel.id, FileModel.file_path, FileModel.filename, FileModel.content_type
+    ).outerjoin(
+        FileExtraction, FileExtraction.file_id == FileModel.id
+    ).filter(
+        FileExtraction.file_id.is_(None)
+    ).order_by(FileModel.id).limit(limit).all()
+
+
+def _extract(contents: Dict[str, tuple]) -> Tuple[Dict[str, str], Dict[str, ExtractionResult]]:
+    """Разобрать документы в пуле процессов; зависшие по таймауту помечаются ошибкой"""
+    pool = _get_pool()
+    futures = {digest: pool.submit(extract_text, *document) for digest, document in contents.items()}
+    texts: Dict[str, str] = {}
+    failures: Dict[str, ExtractionResult] = {}
+
+    for digest, future in futures.items():
+        try:
+            texts[digest] = future.result(timeout=EXTRACTION_TIMEOUT_SECONDS)
+        except FutureTimeout:
+            failures[digest] = (digest, "failed", "Превышено время разбора")
+            # Остальные задачи пачки не доделаны - вернутся в следующий запуск
+            _terminate_pool()
+            break
+        except UnsupportedDocument as error:
+            failures[digest] = (digest, "unsupported", str(error)[:200])
+        except Exception as error:
+            failures[digest] = (digest, "failed", f"{type(error).__name__}: {error}"[:200])
+    return texts, failures
+
+
+def process_extraction_batch(db: Session, batch_size: int = EXTRACTION_BATCH_SIZE) -> int:
+    """Обработать очередную пачку новых файлов; возвращает число обработанных"""
+    rows = _pending_files(db, batch_size)
+    if not rows:
+        return 0
+
+    hashes: Dict[int, str] = {}
+    results: Dict[int, ExtractionResult] = {}
+    contents: Dict[str, tuple] = {}
+    for row in rows:
+        try:
+            content = _read(row.file_path)
+        except Exception:
+            logger.warning("Файл %s недоступен для извлечения текста", row.file_path, exc_info=True)
+            results[row.id] = (None, "failed", "Файл недоступен в хранилище")
+            continue
+        digest = hashlib.sha256(content).hexdigest()
+        hashes[row.id] = digest
+        # Одинаковые файлы разбираются один раз
+        contents.setdefault(digest, (content, row.content_type, row.filename))
+
+    known = {
+        digest for (digest,) in
+        db.query(FileText.content_hash).filter(FileText.content_hash.in_(list(contents)))
+    }
+    texts, failures = _extract({digest: document for digest, document in contents.items() if digest not in known})
+
+    postgresql = db.get_bind().dialect.name == "postgresql"
+    for digest, text in texts.items():
+        db.add(FileText(
+            content_hash=digest,
+            text=text,
+            search_vector=func.to_tsvector(TS_CONFIG, text) if postgresql else None,
+        ))
+
+    for file_id, digest in hashes.items():
+        if digest in known or digest in texts:
+            results[file_id] = (digest, "done", None)
+        elif digest in failures:
+            results[file_id] = failures[digest]
+        # Иначе разбор прерван - файл останется в очереди
+
+    db.add_all(
+        FileExtraction(file_id=file_id, content_hash=digest, status=status, error=error)
+        for file_id, (digest, status, error) in results.items()
+    )
+    db.commit()
+    return len(results)
+
+
+def purge_unreferenced_texts(db: Session) -> int:
+    """Удалить тексты, на которые не ссылается ни один файл (файлы удалены)"""
+    deleted = db.query(FileText).filter(
+        ~exists().where(FileExtraction.content_hash == FileText.content_hash)
+    ).delete(synchronize_session=False)
+    db.commit()
+    return deleted
+
+
+def run_resume_extraction(db: Session) -> None:
+    """Фоновая задача планировщика"""
+    processed = 0
+    for _ in range(MAX_BATCHES_PER_RUN):
+        count = process_extraction_batch(db)
+        if not count:
+            break
+        processed += count
+
+    if processed:
+        logger.info("Извлечен текст из файлов: %d", processed)
+    elif purge_unreferenced_texts(db):
+        logger.info("Удалены тексты удаленных файлов")
+
+
+def retry_failed_extractions(db: Session) -> int:
+    """Вернуть в очередь файлы, которые не удалось разобрать"""
+    count = db.query(FileExtraction).filter(
+        FileExtraction.status.in_(("failed", "unsupported"))
+    ).delete(synchronize_session=False)
+    db.commit()
+    return count
+
+
+def extraction_progress(db: Session) -> dict:
+    """Состояние конвейера: сколько файлов в очереди, обработано и с ошибками"""
+    counts = dict.fromkeys(("pending", "done", "unsupported", "failed"), 0)
+    rows = db.query(FileExtraction.status, func.count(FileModel.id)).select_from(FileModel).outerjoin(
+        FileExtraction, FileExtraction.file_id == FileModel.id
+    ).group_by(FileExtraction.status)
+    for status, count in rows:
+        counts[status or "pending"] = count
+
+    oldest_pending = db.query(func.min(FileModel.uploaded_at)).outerjoin(
+        FileExtraction, FileExtraction.file_id == FileModel.id
+    ).filter(FileExtraction.file_id.is_(None)).scalar()
+
+    return {
+        "total_files": sum(counts.values()),
+        **counts,
+        "unique_texts": db.query(func.count(FileText.content_hash)).scalar(),
+        "last_processed_at": db.query(func.max(FileExtraction.processed_at)).scalar(),
+        "oldest_pending_uploaded_at": oldest_pending,
+        "full_text_search": db.get_bind().dialect.name == "postgresql",
+    }
+
+
+def resume_search_filter(db: Session, query_text: str):
+    """Условие на заявки, в текстах файлов которых встречается запрос
+
+    В PostgreSQL - полнотекстовый поиск (синтаксис websearch: "фраза", OR, -слово)
+    по GIN-индексу, в остальных БД - поиск подстроки.
+    """
+    matches = select(FileModel.application_id).join(
+        FileExtraction, FileExtraction.file_id == FileModel.id
+    ).join(
+        FileText, FileText.content_hash == FileExtraction.content_hash
+    )
+    if db.get_bind().dialect.name == "postgresql":
+        matches = matches.where(
+            FileText.search_vector.op("@@")(func.websearch_to_tsquery(TS_CONFIG, query_text))
+        )
+    else:
+        matches = matches.where(FileText.text.ilike(f"%{query_text}%"))
+    return Application.id.in_(matches)
@@ -0,0 +1,152 @@
+"""
+Очередь рассмотрения заявок: аренда заявок рецензентами через SELECT ... FOR UPDATE SKIP LOCKED
+"""
+import logging
+import os
+from datetime import datetime, timedelta
+from typing import List, Optional, Tuple
+
+from sqlalchemy import delete, exists, update
+from sqlalchemy.dialects.postgresql import insert as pg_insert
+from sqlalchemy.dialects.sqlite import insert as sqlite_insert
+from sqlalchemy.orm import Session
+
+from ..models.application import Application
+from ..models.internship import Internship
+from ..models.review_lease import ReviewLease
+from .http_cache import weak_etag
+
+logger = logging.getLogger(__name__)
+
+REVIEW_LEASE_SECONDS = int(os.getenv("REVIEW_LEASE_SECONDS", "900"))
+LEASE_PURGE_INTERVAL_SECONDS = 3600
+
+
+# Поля, из которых складывается версия заявки (нужны и при выборке с fields=)
+VERSION_FIELDS = ("status", "feedback", "interview_date", "next_steps", "reviewed_by_id", "updated_at")
+
+
+def application_version(application: Application) -> str:
+    """Версия заявки для If-Match: меняется при любом изменении полей рассмотрения"""
+    return weak_etag("application", application.id, *(getattr(application, name) for name in VERSION_FIELDS))
+
+
+def _live_lease(now: datetime):
+    return exists().where(
+        ReviewLease.application_id == Application.id,
+        ReviewLease.expires_at > now,
+    )
+
+
+def claim_applications(
+    db: Session,
+    reviewer_id: int,
+    limit: int,
+    internship_id: Optional[int] = None,
+    campus_id: Optional[int] = None,
+    department_id: Optional[int] = None,
+) -> Tuple[List[int], datetime]:
+    """Взять в работу до limit самых старых заявок на рассмотрении
+
+    Строки, которые в этот момент берет другой рецензент, пропускаются
+    (SKIP LOCKED), поэтому рецензенты не ждут друг друга и не получают
+    одни и те же заявки. Аренда записывается upsert'ом, который не перезаписывает
+    чужую действующую аренду, - это страхует и БД без SKIP LOCKED (SQLite).
+    """
+    now = datetime.now()
+    expires_at = now + timedelta(seconds=REVIEW_LEASE_SECONDS)
+
+    query = db.query(Application.id).filter(
+        Application.status == "pending",
+        ~_live_lease(now)
+    )
+    if internship_id:
+        query = query.filter(Application.internship_id == internship_id)
+    if campus_id or department_id:
+        query = query.join(Internship, Application.internship_id == Internship.id)
+        if campus_id:
+            query = query.filter(Internship.campus_id == campus_id)
+        if department_id:
+            query = query.filter(Internship.department_id == department_id)
+
+    candidate_ids = [
+        application_id for (application_id,) in
+        query.order_by(Application.created_at, Application.id).limit(limit).with_for_update(
+            skip_locked=True, of=Application
+        )
+    ]
+    if not candidate_ids:
+        db.rollback()
+        return [], expires_at
+
+    dialect_insert = pg_insert if db.get_bind().dialect.name == "postgresql" else sqlite_insert
+    statement = dialect_insert(ReviewLease).values([
+        {"application_id": application_id, "reviewer_id": reviewer_id, "claimed_at": now, "expires_at": expires_at}
+        for application_id in candidate_ids
+    ])
+    statement = statement.on_conflict_do_update(
+        index_elements=["application_id"],
+        set_={
+            "reviewer_id": statement.excluded.reviewer_id,
+            "claimed_at": statement.excluded.claimed_at,
+            "expires_at": statement.excluded.expires_at,
+        },
+        where=ReviewLease.expires_at <= now,
+    ).returning(ReviewLease.application_id)
+
+    claimed_ids = set(db.execute(statement).scalars().all())
+    db.commit()
+    return [application_id for application_id in candidate_ids if application_id in claimed_ids], expires_at
+
+
+def renew_leases(db: Session, reviewer_id: int, application_ids: List[int]) -> Tuple[List[int], datetime]:
+    """Продлить собственные действующие аренды"""
+    now = datetime.now()
+    expires_at = now + timedelta(seconds=REVIEW_LEASE_SECONDS)
+    renewed = db.execute(
+        update(ReviewLease)
+        .where(
+            ReviewLease.application_id.in_(application_ids),
+            ReviewLease.reviewer_id == reviewer_id,
+            ReviewLease.expires_at > now,
+        )
+        .values(expires_at=expires_at)
+        .returning(ReviewLease.application_id)
+        .execution_options(synchronize_session=False)
+    ).scalars().all()
+    db.commit()
+    return renewed, expires_at
+
+
+def release_leases(db: Session, reviewer_id: int, application_ids: List[int]) -> int:
+    """Вернуть заявки в очередь"""
+    result = db.execute(
+        delete(ReviewLease)
+        .where(
+            ReviewLease.application_id.in_(application_ids),
+            ReviewLease.reviewer_id == reviewer_id,
+        )
+        .execution_options(synchronize_session=False)
+    )
+    db.commit()
+    return result.rowcount
+
+
+def lease_holder(db: Session, application_id: int) -> Optional[int]:
+    """Рецензент с действующей арендой заявки"""
+    return db.query(ReviewLease.reviewer_id).filter(
+        ReviewLease.application_id == application_id,
+        ReviewLease.expires_at > datetime.now()
+    ).scalar()
+
+
+def purge_expired_leases(db: Session) -> None:
+    """Фоновая задача: удалить истекшие аренды"""
+    deleted = db.execute(
+        delete(ReviewLease)
+        .where(ReviewLease.expires_at <= datetime.now())
+        .execution_options(synchronize_session=False)
+    ).rowcount
+    db.commit()
+    if deleted:
+        logger.info("Удалено истекших аренд заявок: %d", deleted)
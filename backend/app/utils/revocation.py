@@ -0,0 +1,232 @@
+"""
+Список отозванных токенов в памяти воркера: Bloom-фильтр с синхронизацией из БД
+"""
+import asyncio
+import hashlib
+import logging
+import math
+import os
+import threading
+import time
+from datetime import datetime, timezone
+from typing import Dict, Optional, Set
+
+from fastapi.concurrency import run_in_threadpool
+from sqlalchemy import and_, func, or_
+from sqlalchemy.orm import Session
+
+from ..database import SessionLocal
+from ..models.revoked_token import RevokedToken
+
+logger = logging.getLogger(__name__)
+
+# Как часто воркер подтягивает новые записи об отзыве (верхняя граница задержки отзыва)
+REVOCATION_SYNC_SECONDS = float(os.getenv("REVOCATION_SYNC_SECONDS", "5"))
+# Полная пересборка фильтра: выбрасывает истекшие записи и подгоняет размер
+REVOCATION_REBUILD_SECONDS = 3600
+REVOCATION_FILTER_CAPACITY = int(os.getenv("REVOCATION_FILTER_CAPACITY", "100000"))
+REVOCATION_FILTER_ERROR_RATE = 0.001
+# Записи с меньшими id могут закоммититься позже соседних - перечитываем с запасом
+SYNC_ID_OVERLAP = 100
+
+
+def utc_naive(timestamp: float) -> datetime:
+    """Время в БД хранится в UTC без часового пояса"""
+    return datetime.fromtimestamp(timestamp, timezone.utc).replace(tzinfo=None)
+
+
+def _timestamp(value: datetime) -> float:
+    return value.replace(tzinfo=timezone.utc).timestamp()
+
+
+class BloomFilter:
+    """Bloom-фильтр: ложноположительные ответы возможны, ложноотрицательные - нет"""
+
+    def __init__(self, capacity: int, error_rate: float = REVOCATION_FILTER_ERROR_RATE):
+        self.capacity = capacity
+        self.size = max(64, int(-capacity * math.log(error_rate) / math.log(2) ** 2))
+        self.hashes = max(1, round(self.size / capacity * math.log(2)))
+        self.count = 0
+        self._bits = bytearray((self.size + 7) // 8)
+
+    def _positions(self, item: str):
+        # Двойное хеширование: k позиций из одного 128-битного дайджеста
+        digest = hashlib.blake2b(item.encode(), digest_size=16).digest()
+        first = int.from_bytes(digest[:8], "little")
+        second = int.from_bytes(digest[8:], "little") | 1
+        return ((first + i * second) % self.size for i in range(self.hashes))
+
+    def add(self, item: str) -> None:
+        for position in self._positions(item):
+            self._bits[position >> 3] |= 1 << (position & 7)
+        self.count += 1
+
+    def __contains__(self, item: str) -> bool:
+        return all(self._bits[position >> 3] & (1 << (position & 7)) for position in self._positions(item))
+
+
+def _filter_key(kind: str, value: str) -> str:
+    return f"{kind}:{value}"
+
+
+def check_revoked_in_db(db: Session, claims: dict) -> bool:
+    """Точная проверка отзыва по таблице"""
+    revoked = db.query(RevokedToken.id).filter(or_(
+        and_(RevokedToken.kind == "token", RevokedToken.value == claims["jti"]),
+        and_(RevokedToken.kind == "family", RevokedToken.value == claims["fam"]),
+        and_(
+            RevokedToken.kind == "user",
+            RevokedToken.user_id == claims["uid"],
+            RevokedToken.not_before >= utc_naive(claims["iat"])
+        ),
+    )).first()
+    return revoked is not None
+
+
+class RevocationList:
+    """Отозванные токены и семейства - в Bloom-фильтре, отзывы по пользователю - точным словарем
+
+    Проверка токена - только CPU. Положительный ответ фильтра подтверждается
+    запросом к БД, поэтому ложные срабатывания не разлогинивают пользователей.
+    Пока фильтр не загружен, каждая проверка идет в БД.
+    """
+
+    def __init__(self, capacity: int = REVOCATION_FILTER_CAPACITY):
+        self.capacity = capacity
+        self._filter = BloomFilter(capacity)
+        self._users: Dict[int, float] = {}
+        self._last_id = 0
+        # id уже учтенных записей в зоне перекрытия, чтобы не добавлять их повторно
+        self._seen_tail: Set[int] = set()
+        self._loaded = False
+        self._rebuilt_at = 0.0
+        self._lock = threading.Lock()
+        self._task: Optional[asyncio.Task] = None
+
+    def check_cached(self, claims: dict) -> Optional[bool]:
+        """Проверка по памяти; None - нужно подтверждение по БД (фильтр не загружен или сработал)"""
+        if not self._loaded:
+            return None
+
+        not_before = self._users.get(claims["uid"])
+        if not_before is not None and claims["iat"] <= not_before:
+            return True
+
+        if _filter_key("token", claims["jti"]) in self._filter or _filter_key("family", claims["fam"]) in self._filter:
+            return None
+        return False
+
+    def is_revoked(self, claims: dict) -> bool:
+        """Синхронная проверка: может обратиться к БД, из event loop не вызывать"""
+        revoked = self.check_cached(claims)
+        return self._check_db(claims) if revoked is None else revoked
+
+    async def is_revoked_async(self, claims: dict) -> bool:
+        """Проверка для асинхронного кода: запрос к БД уходит в пул потоков"""
+        revoked = self.check_cached(claims)
+        if revoked is None:
+            revoked = await run_in_threadpool(self._check_db, claims)
+        return revoked
+
+    def _check_db(self, claims: dict) -> bool:
+        db = SessionLocal()
+        try:
+            return check_revoked_in_db(db, claims)
+        finally:
+            db.close()
+
+    def add(self, kind: str, value: str, user_id: Optional[int] = None, not_before: Optional[float] = None) -> None:
+        """Учесть отзыв сразу в этом воркере (остальные узнают при синхронизации)"""
+        with self._lock:
+            if kind == "user":
+                self._users[user_id] = max(self._users.get(user_id, 0.0), not_before)
+            else:
+                self._filter.add(_filter_key(kind, value))
+
+    def _apply(self, bloom: BloomFilter, users: Dict[int, float], row) -> None:
+        if row.kind == "user":
+            users[row.user_id] = max(users.get(row.user_id, 0.0), _timestamp(row.not_before))
+        else:
+            bloom.add(_filter_key(row.kind, row.value))
+
+    def _rows(self, db: Session):
+        return db.query(
+            RevokedToken.id, RevokedToken.kind, RevokedToken.value,
+            RevokedToken.user_id, RevokedToken.not_before
+        )
+
+    def rebuild(self, db: Session) -> None:
+        rows = self._rows(db).filter(RevokedToken.expires_at > utc_naive(time.time())).all()
+
+        bloom = BloomFilter(max(self.capacity, 2 * len(rows)))
+        users: Dict[int, float] = {}
+        for row in rows:
+            self._apply(bloom, users, row)
+
+        last_id = db.query(func.max(RevokedToken.id)).scalar() or 0
+        with self._lock:
+            self._filter, self._users, self._last_id = bloom, users, last_id
+            self._seen_tail = {row.id for row in rows if row.id > last_id - SYNC_ID_OVERLAP}
+            self._loaded = True
+            self._rebuilt_at = time.monotonic()
+
+    def sync(self, db: Session) -> None:
+        if not self._loaded or time.monotonic() - self._rebuilt_at > REVOCATION_REBUILD_SECONDS:
+            self.rebuild(db)
+            return
+
+        rows = self._rows(db).filter(
+            RevokedToken.id > self._last_id - SYNC_ID_OVERLAP
+        ).order_by(RevokedToken.id).all()
+        with self._lock:
+            for row in rows:
+                if row.id not in self._seen_tail:
+                    self._apply(self._filter, self._users, row)
+                    self._seen_tail.add(row.id)
+            if rows:
+                self._last_id = max(self._last_id, rows[-1].id)
+            self._seen_tail = {row_id for row_id in self._seen_tail if row_id > self._last_id - SYNC_ID_OVERLAP}
+            # Заполненный сверх расчета фильтр чаще ошибается - пересоберем досрочно
+            if self._filter.count > self._filter.capacity:
+                self._rebuilt_at = 0.0
+
+    def _sync_once(self) -> None:
+        db = SessionLocal()
+        try:
+            self.sync(db)
+        finally:
+            db.close()
+
+    async def _loop(self) -> None:
+        while True:
+            try:
+                await asyncio.to_thread(self._sync_once)
+            except Exception:
+                logger.exception("Не удалось синхронизировать список отозванных токенов")
+            await asyncio.sleep(REVOCATION_SYNC_SECONDS)
+
+    async def start(self) -> None:
+        if self._task is None:
+            self._task = asyncio.create_task(self._loop())
+
+    async def stop(self) -> None:
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+
+
+revocations = RevocationList()
+
+
+def purge_expired_revocations(db: Session) -> None:
+    """Фоновая задача: удалить записи, все затронутые токены которых уже истекли"""
+    deleted = db.query(RevokedToken).filter(
+        RevokedToken.expires_at <= utc_naive(time.time())
+    ).delete(synchronize_session=False)
+    db.commit()
+    if deleted:
+        logger.info("Удалено устаревших записей об отзыве токенов: %d", deleted)
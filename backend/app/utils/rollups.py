@@ -0,0 +1,278 @@
+import logging
+from collections import defaultdict
+from datetime import date, datetime, time, timedelta
+from typing import Dict, List, Optional, Tuple
+
+from sqlalchemy import func, insert, literal
+from sqlalchemy.orm import Session
+
+from ..models.analytics import ApplicationRollup, ApplicationStatusChange, RollupWatermark
+from ..models.application import Application
+from ..models.internship import Internship
+from ..models.tag import Tag
+
+logger = logging.getLogger(__name__)
+
+WATERMARK_NAME = "application_rollups"
+ROLLUP_INTERVAL_SECONDS = 300
+
+# Пересчитываем с запасом: транзакции, начатые до отметки, могли закоммититься позже
+WATERMARK_OVERLAP = timedelta(minutes=10)
+# Хвост, который пересчитывается всегда (отозванные заявки удаляются из таблицы)
+TRAILING_DAYS = 2
+# Размер шага пересчета при бэкфилле
+CHUNK_DAYS = 31
+
+DECISION_STATUSES = ("reviewed", "accepted", "rejected")
+METRICS = ("submitted", "reviewed", "accepted", "rejected", "review_count", "review_seconds_total")
+
+DIMENSIONS = {
+    "all": None,
+    "campus": Internship.campus_id,
+    "department": Internship.department_id,
+    "tag": Tag.id,
+}
+
+BucketKey = Tuple[date, int]
+
+
+def week_start(day: date) -> date:
+    return day - timedelta(days=day.weekday())
+
+
+def _to_date(value) -> date:
+    if isinstance(value, datetime):
+        return value.date()
+    if isinstance(value, date):
+        return value
+    # SQLite возвращает date() строкой
+    return date.fromisoformat(str(value)[:10])
+
+
+def _seconds_between(db: Session, start, end):
+    if db.get_bind().dialect.name == "postgresql":
+        return func.extract("epoch", end - start)
+    return (func.julianday(end) - func.julianday(start)) * 86400
+
+
+def _with_dimension(query, dimension: str):
+    query = query.join(Internship, Application.internship_id == Internship.id)
+    if dimension == "tag":
+        query = query.join(Internship.tags)
+    return query
+
+
+def _aggregate_days(db: Session, start: datetime, end: datetime, dimension: str) -> Dict[BucketKey, Dict[str, float]]:
+    """Посчитать дневные показатели среза тремя GROUP BY по диапазону"""
+    dimension_column = DIMENSIONS[dimension]
+    group = [dimension_column] if dimension_column is not None else []
+    totals: Dict[BucketKey, Dict[str, float]] = defaultdict(lambda: dict.fromkeys(METRICS, 0))
+
+    def key(row) -> BucketKey:
+        return _to_date(row[0]), (row[1] if group else 0)
+
+    # Подачи - по дате создания заявки
+    day = func.date(Application.created_at)
+    submissions = _with_dimension(
+        db.query(day, *group, func.count(Application.id)), dimension
+    ).filter(
+        Application.created_at >= start,
+        Application.created_at < end
+    ).group_by(day, *group)
+    for row in submissions:
+        totals[key(row)]["submitted"] += row[-1]
+
+    # Решения - по дате смены статуса
+    changed_day = func.date(ApplicationStatusChange.changed_at)
+    decisions = _with_dimension(
+        db.query(changed_day, *group, ApplicationStatusChange.to_status, func.count(ApplicationStatusChange.id))
+        .join(Application, ApplicationStatusChange.application_id == Application.id),
+        dimension
+    ).filter(
+        ApplicationStatusChange.changed_at >= start,
+        ApplicationStatusChange.changed_at < end,
+        ApplicationStatusChange.to_status.in_(DECISION_STATUSES)
+    ).group_by(changed_day, *group, ApplicationStatusChange.to_status)
+    for row in decisions:
+        totals[key(row)][row[-2]] += row[-1]
+
+    # Время до рассмотрения - первый выход заявки из статуса pending
+    review_seconds = _seconds_between(db, Application.created_at, ApplicationStatusChange.changed_at)
+    reviews = _with_dimension(
+        db.query(changed_day, *group, func.count(ApplicationStatusChange.id), func.sum(review_seconds))
+        .join(Application, ApplicationStatusChange.application_id == Application.id),
+        dimension
+    ).filter(
+        ApplicationStatusChange.changed_at >= start,
+        ApplicationStatusChange.changed_at < end,
+        ApplicationStatusChange.from_status == "pending"
+    ).group_by(changed_day, *group)
+    for row in reviews:
+        metrics = totals[key(row)]
+        metrics["review_count"] += row[-2]
+        metrics["review_seconds_total"] += float(row[-1] or 0)
+
+    return totals
+
+
+def recompute_rollups(db: Session, first_day: date, last_day: date) -> int:
+    """Пересчитать дневные и недельные агрегаты за диапазон дней (включительно)
+
+    Пересчет идемпотентен: строки диапазона удаляются и вставляются заново.
+    """
+    start = datetime.combine(first_day, time.min)
+    end = datetime.combine(last_day + timedelta(days=1), time.min)
+
+    db.query(ApplicationRollup).filter(
+        ApplicationRollup.granularity == "day",
+        ApplicationRollup.bucket_start >= first_day,
+        ApplicationRollup.bucket_start <= last_day
+    ).delete(synchronize_session=False)
+
+    daily_rows = []
+    for dimension in DIMENSIONS:
+        for (day, dimension_id), metrics in _aggregate_days(db, start, end, dimension).items():
+            daily_rows.append({
+                "granularity": "day",
+                "bucket_start": day,
+                "dimension": dimension,
+                "dimension_id": dimension_id,
+                **metrics,
+            })
+    if daily_rows:
+        db.execute(insert(ApplicationRollup), daily_rows)
+
+    # Недели собираем из уже сохраненных дневных строк
+    first_week = week_start(first_day)
+    last_week = week_start(last_day)
+    db.query(ApplicationRollup).filter(
+        ApplicationRollup.granularity == "week",
+        ApplicationRollup.bucket_start >= first_week,
+        ApplicationRollup.bucket_start <= last_week
+    ).delete(synchronize_session=False)
+
+    weekly: Dict[Tuple[date, str, int], Dict[str, float]] = defaultdict(lambda: dict.fromkeys(METRICS, 0))
+    days = db.query(ApplicationRollup).filter(
+        ApplicationRollup.granularity == "day",
+        ApplicationRollup.bucket_start >= first_week,
+        ApplicationRollup.bucket_start < last_week + timedelta(days=7)
+    )
+    for row in days:
+        metrics = weekly[(week_start(row.bucket_start), row.dimension, row.dimension_id)]
+        for metric in METRICS:
+            metrics[metric] += getattr(row, metric)
+
+    weekly_rows = [
+        {
+            "granularity": "week",
+            "bucket_start": bucket,
+            "dimension": dimension,
+            "dimension_id": dimension_id,
+            **metrics,
+        }
+        for (bucket, dimension, dimension_id), metrics in weekly.items()
+    ]
+    if weekly_rows:
+        db.execute(insert(ApplicationRollup), weekly_rows)
+
+    db.commit()
+    return len(daily_rows) + len(weekly_rows)
+
+
+def recompute_range(db: Session, first_day: date, last_day: date) -> None:
+    """Пересчитать большой диапазон по частям (для бэкфилла)"""
+    chunk_start = first_day
+    while chunk_start <= last_day:
+        chunk_end = min(chunk_start + timedelta(days=CHUNK_DAYS - 1), last_day)
+        rows = recompute_rollups(db, chunk_start, chunk_end)
+        logger.info("Агрегаты за %s - %s пересчитаны (%d строк)", chunk_start, chunk_end, rows)
+        chunk_start = chunk_end + timedelta(days=1)
+
+
+def refresh_rollups(db: Session, now: Optional[datetime] = None) -> None:
+    """Фоновая задача: инкрементально обновить агрегаты с момента прошлого запуска"""
+    now = now or datetime.now()
+    watermark = db.get(RollupWatermark, WATERMARK_NAME)
+
+    if watermark is None:
+        # Первый запуск - полный бэкфилл
+        earliest = db.query(func.min(Application.created_at)).scalar()
+        first_day = _to_date(earliest) if earliest else now.date()
+    else:
+        first_day = min(
+            (watermark.processed_until - WATERMARK_OVERLAP).date(),
+            now.date() - timedelta(days=TRAILING_DAYS)
+        )
+
+    recompute_range(db, first_day, now.date())
+
+    # Отметку сохраняем последней: при сбое следующий запуск повторит пересчет
+    if watermark is None:
+        db.add(RollupWatermark(name=WATERMARK_NAME, processed_until=now))
+    else:
+        watermark.processed_until = now
+    db.commit()
+
+
+def seed_status_changes(db: Session) -> int:
+    """Создать записи истории для заявок, рассмотренных до появления истории
+
+    Время решения берется из updated_at заявки.
+    """
+    has_history = db.query(ApplicationStatusChange.id).filter(
+        ApplicationStatusChange.application_id == Application.id
+    ).exists()
+    source = db.query(
+        Application.id,
+        literal("pending"),
+        Application.status,
+        Application.reviewed_by_id,
+        func.coalesce(Application.updated_at, Application.created_at)
+    ).filter(
+        Application.status.in_(DECISION_STATUSES),
+        ~has_history
+    )
+
+    result = db.execute(
+        insert(ApplicationStatusChange).from_select(
+            ["application_id", "from_status", "to_status", "changed_by_id", "changed_at"],
+            source.statement
+        )
+    )
+    db.commit()
+    return result.rowcount
+
+
+def get_trends(
+    db: Session,
+    granularity: str,
+    dimension: str,
+    date_from: date,
+    date_to: date,
+    dimension_id: Optional[int] = None,
+) -> List[dict]:
+    """Прочитать агрегаты за период - только строки rollup-таблицы"""
+    query = db.query(ApplicationRollup).filter(
+        ApplicationRollup.granularity == granularity,
+        ApplicationRollup.dimension == dimension,
+        ApplicationRollup.bucket_start >= date_from,
+        ApplicationRollup.bucket_start <= date_to
+    )
+    if dimension_id is not None:
+        query = query.filter(ApplicationRollup.dimension_id == dimension_id)
+
+    return [
+        {
+            "bucket": row.bucket_start,
+            "dimension_id": row.dimension_id,
+            "submitted": row.submitted,
+            "reviewed": row.reviewed,
+            "accepted": row.accepted,
+            "rejected": row.rejected,
+            "avg_review_hours": (
+                round(row.review_seconds_total / row.review_count / 3600, 2)
+                if row.review_count else None
+            ),
+        }
+        for row in query.order_by(ApplicationRollup.bucket_start, ApplicationRollup.dimension_id)
+    ]
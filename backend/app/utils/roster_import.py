@@ -0,0 +1,252 @@
+"""
+Импорт списка студентов из CSV: проверка существующих одним запросом на пачку,
+параллельное хэширование паролей и пакетная вставка
+"""
+import csv
+import io
+import logging
+import secrets
+import time
+from typing import Dict, Iterator, List, NamedTuple, Optional, Set, Tuple
+
+import orjson
+from sqlalchemy import insert, or_
+from sqlalchemy.dialects.postgresql import insert as pg_insert
+from sqlalchemy.dialects.sqlite import insert as sqlite_insert
+from sqlalchemy.orm import Session
+
+from ..database import SessionLocal
+from ..models import UserTag
+from ..models.user import User
+from .password_hashing import hash_in_parallel
+from .reference import reference_registry
+
+logger = logging.getLogger(__name__)
+
+REQUIRED_COLUMNS = ("email", "first_name", "last_name", "student_id")
+USER_COLUMNS = REQUIRED_COLUMNS + ("course", "gpa", "phone")
+MAX_ROSTER_BYTES = 20 * 1024 * 1024
+MAX_ROSTER_ROWS = 50000
+# Строк в одном запросе проверки и в одной вставке (держит число параметров SQL в пределах)
+IMPORT_CHUNK_SIZE = 1000
+UNIVERSITY_EMAIL_DOMAIN = "@university.edu"
+MIN_PASSWORD_LENGTH = 8
+# Навыки в колонке skills: названия или id тегов через точку с запятой
+SKILLS_SEPARATOR = ";"
+
+
+class RosterError(ValueError):
+    """Файл нельзя импортировать целиком (кодировка, заголовок, размер)"""
+
+
+class RosterRow(NamedTuple):
+    line: int
+    values: Dict[str, object]
+    password: Optional[str]
+    skills: List[str]
+
+
+def _event(event: str, **data) -> bytes:
+    return orjson.dumps({"event": event, **data}) + b"\n"
+
+
+def _parse_gpa(value: str) -> Optional[float]:
+    if not value:
+        return None
+    gpa = float(value.replace(",", "."))
+    if not 0 <= gpa <= 5:
+        raise ValueError
+    return gpa
+
+
+def parse_roster(content: bytes) -> Tuple[List[RosterRow], List[dict]]:
+    """Разобрать CSV; возвращает корректные строки и ошибки по строкам"""
+    try:
+        text = content.decode("utf-8-sig")
+    except UnicodeDecodeError:
+        raise RosterError("Файл должен быть в кодировке UTF-8")
+
+    reader = csv.DictReader(io.StringIO(text))
+    header = {name.strip() for name in reader.fieldnames or ()}
+    missing = [name for name in REQUIRED_COLUMNS if name not in header]
+    if missing:
+        raise RosterError(f"Нет обязательных колонок: {', '.join(missing)}")
+
+    rows: List[RosterRow] = []
+    errors: List[dict] = []
+    seen_emails: Dict[str, int] = {}
+    seen_student_ids: Dict[str, int] = {}
+
+    for record in reader:
+        # Номер строки в файле, как его видит админ (заголовок - строка 1)
+        line = reader.line_num
+        if len(rows) + len(errors) >= MAX_ROSTER_ROWS:
+            raise RosterError(f"В файле больше {MAX_ROSTER_ROWS} строк")
+        record = {(key or "").strip(): (value or "").strip() for key, value in record.items() if key}
+        email = record.get("email", "")
+
+        def reject(detail: str) -> None:
+            errors.append({"row": line, "email": email, "error": detail})
+
+        empty = [name for name in REQUIRED_COLUMNS if not record.get(name)]
+        if empty:
+            reject(f"Не заполнено: {', '.join(empty)}")
+            continue
+        if not email.endswith(UNIVERSITY_EMAIL_DOMAIN):
+            reject(f"Используйте университетский email ({UNIVERSITY_EMAIL_DOMAIN})")
+            continue
+        try:
+            gpa = _parse_gpa(record.get("gpa", ""))
+        except ValueError:
+            reject("Средний балл должен быть числом от 0 до 5")
+            continue
+        try:
+            course = int(record["course"]) if record.get("course") else None
+        except ValueError:
+            reject("Курс должен быть целым числом")
+            continue
+        password = record.get("password") or None
+        if password is not None and len(password) < MIN_PASSWORD_LENGTH:
+            reject(f"Пароль короче {MIN_PASSWORD_LENGTH} символов")
+            continue
+
+        student_id = record["student_id"]
+        if email in seen_emails:
+            reject(f"Email повторяется в файле (строка {seen_emails[email]})")
+            continue
+        if student_id in seen_student_ids:
+            reject(f"Студенческий билет повторяется в файле (строка {seen_student_ids[student_id]})")
+            continue
+        seen_emails[email] = line
+        seen_student_ids[student_id] = line
+
+        values = {name: record.get(name) or None for name in USER_COLUMNS}
+        values.update(gpa=gpa, course=course)
+        skills = [skill.strip() for skill in record.get("skills", "").split(SKILLS_SEPARATOR) if skill.strip()]
+        rows.append(RosterRow(line, values, password, skills))
+
+    return rows, errors
+
+
+def _existing_users(db: Session, chunk: List[RosterRow]) -> Tuple[Set[str], Set[str]]:
+    """Занятые email и студенческие билеты пачки - одним запросом"""
+    emails = [row.values["email"] for row in chunk]
+    student_ids = [row.values["student_id"] for row in chunk]
+    found = db.query(User.email, User.student_id).filter(
+        or_(User.email.in_(emails), User.student_id.in_(student_ids))
+    ).all()
+    return {email for email, _ in found}, {student_id for _, student_id in found}
+
+
+def _tag_lookup() -> Dict[str, int]:
+    lookup = {str(tag_id): tag_id for tag_id in reference_registry.tags}
+    for tag_id, tag in reference_registry.tags.items():
+        name = getattr(tag, "name", None)
+        if name:
+            lookup.setdefault(name.casefold(), tag_id)
+    return lookup
+
+
+def _insert_chunk(db: Session, chunk: List[Tuple[RosterRow, str, str]], tags: Dict[str, int]) -> List[bytes]:
+    """Вставить пачку пользователей и их навыки; возвращает события по строкам"""
+    dialect_insert = pg_insert if db.get_bind().dialect.name == "postgresql" else sqlite_insert
+    # Пользователь, зарегистрировавшийся после проверки, не роняет всю пачку
+    statement = dialect_insert(User).values([
+        {**row.values, "hashed_password": hashed, "role": "student", "is_active": True}
+        for row, _, hashed in chunk
+    ]).on_conflict_do_nothing().returning(User.id, User.email)
+    created = {email: user_id for user_id, email in db.execute(statement)}
+
+    user_tags = []
+    events = []
+    for row, password, _ in chunk:
+        user_id = created.get(row.values["email"])
+        if user_id is None:
+            events.append(_event(
+                "row_error", row=row.line, email=row.values["email"],
+                error="Пользователь с таким email или студенческим билетом уже существует"
+            ))
+            continue
+
+        tag_ids = {tags[skill.casefold()] for skill in row.skills if skill.casefold() in tags}
+        user_tags.extend({"user_id": user_id, "tag_id": tag_id} for tag_id in tag_ids)
+        event = {"row": row.line, "email": row.values["email"], "id": user_id}
+        # Сгенерированный пароль показывается один раз - для передачи студенту
+        if row.password is None:
+            event["password"] = password
+        unknown = [skill for skill in row.skills if skill.casefold() not in tags]
+        if unknown:
+            event["unknown_skills"] = unknown
+        events.append(_event("created", **event))
+
+    if user_tags:
+        db.execute(insert(UserTag), user_tags)
+    db.commit()
+    return events
+
+
+def import_roster(rows: List[RosterRow], errors: List[dict]) -> Iterator[bytes]:
+    """Импорт с потоком событий NDJSON: started, row_error, created, progress, done
+
+    Каждая пачка коммитится отдельно: прерванный импорт можно запустить
+    повторно, уже созданные студенты придут как ошибки "уже существует".
+    """
+    started = time.perf_counter()
+    total = len(rows) + len(errors)
+    created = 0
+    failed = len(errors)
+    yield _event("started", total=total)
+    for error in errors:
+        yield _event("row_error", **error)
+
+    db = SessionLocal()
+    try:
+        reference_registry.ensure_loaded(db)
+        tags = _tag_lookup()
+
+        pending: List[RosterRow] = []
+        for start in range(0, len(rows), IMPORT_CHUNK_SIZE):
+            chunk = rows[start:start + IMPORT_CHUNK_SIZE]
+            emails, student_ids = _existing_users(db, chunk)
+            for row in chunk:
+                if row.values["email"] in emails:
+                    detail = "Пользователь с таким email уже существует"
+                elif row.values["student_id"] in student_ids:
+                    detail = "Пользователь с таким студенческим билетом уже существует"
+                else:
+                    pending.append(row)
+                    continue
+                failed += 1
+                yield _event("row_error", row=row.line, email=row.values["email"], error=detail)
+        db.rollback()
+        yield _event("progress", processed=failed, created=created, failed=failed, total=total)
+
+        passwords = [row.password or secrets.token_urlsafe(9) for row in pending]
+        buffer: List[Tuple[RosterRow, str, str]] = []
+        position = 0
+        for hashes in hash_in_parallel(passwords):
+            for hashed in hashes:
+                buffer.append((pending[position], passwords[position], hashed))
+                position += 1
+            if len(buffer) < IMPORT_CHUNK_SIZE and position < len(pending):
+                continue
+
+            events = _insert_chunk(db, buffer, tags)
+            buffer = []
+            for event in events:
+                yield event
+            inserted = sum(1 for event in events if event.startswith(b'{"event":"created"'))
+            created += inserted
+            failed += len(events) - inserted
+            yield _event("progress", processed=created + failed, created=created, failed=failed, total=total)
+
+        yield _event(
+            "done", total=total, created=created, failed=failed,
+            duration_seconds=round(time.perf_counter() - started, 1)
+        )
+    except Exception:
+        db.rollback()
+        logger.exception("Импорт студентов прерван")
+        yield _event("error", detail="Импорт прерван из-за ошибки сервера", created=created, failed=failed)
+    finally:
+        db.close()
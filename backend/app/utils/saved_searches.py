@@ -0,0 +1,302 @@
+"""
+Сохраненные поиски: обратный индекс запросов и уведомления о новых стажировках
+"""
+import logging
+import threading
+import time
+from collections import defaultdict
+from datetime import datetime
+from typing import Dict, FrozenSet, Iterable, List, NamedTuple, Optional, Set, Tuple
+
+from sqlalchemy import literal, select, update
+from sqlalchemy.dialects.postgresql import insert as pg_insert
+from sqlalchemy.dialects.sqlite import insert as sqlite_insert
+from sqlalchemy.orm import Session
+
+from ..models.internship import Internship
+from ..models.saved_search import SavedSearch, SavedSearchMatch
+from ..models.tag import Tag
+from .events import application_events
+
+logger = logging.getLogger(__name__)
+
+# Полная пересборка подхватывает поиски, удаленные в других воркерах
+REBUILD_INTERVAL_SECONDS = 300
+# Поиски с меньшими id могут закоммититься позже соседних - перечитываем с запасом
+SYNC_ID_OVERLAP = 100
+MAX_SAVED_SEARCHES_PER_USER = 20
+DIGEST_INTERVAL_SECONDS = 900
+# Совпадений за один проход рассылки дайджестов
+DIGEST_BATCH_SIZE = 5000
+
+# Ключ обратного индекса: ("t", триграмма), ("g", тег), ("d", кафедра), ("c", корпус), ("*", None)
+Key = Tuple[str, object]
+MATCH_ALL: Key = ("*", None)
+
+
+def trigrams(text: str) -> Set[str]:
+    return {text[i:i + 3] for i in range(len(text) - 2)}
+
+
+class CompiledSearch(NamedTuple):
+    id: int
+    phrase: Optional[str]
+    campus_id: Optional[int]
+    department_id: Optional[int]
+    tag_ids: FrozenSet[int]
+    match_all_tags: bool
+
+    @classmethod
+    def from_row(cls, row) -> "CompiledSearch":
+        phrase = (row.search or "").strip().lower() or None
+        return cls(row.id, phrase, row.campus_id, row.department_id, frozenset(row.tag_ids or ()), row.tag_mode != "or")
+
+    def matches(self, posting: "Posting") -> bool:
+        """Та же логика, что у фильтров GET /internships (текст - как ILIKE по подстроке)"""
+        if self.campus_id is not None and self.campus_id != posting.campus_id:
+            return False
+        if self.department_id is not None and self.department_id != posting.department_id:
+            return False
+        if self.tag_ids:
+            if self.match_all_tags and not self.tag_ids <= posting.tag_ids:
+                return False
+            if not self.match_all_tags and self.tag_ids.isdisjoint(posting.tag_ids):
+                return False
+        if self.phrase is not None and not any(self.phrase in field for field in posting.fields):
+            return False
+        return True
+
+
+class Posting(NamedTuple):
+    """Опубликованная стажировка в виде, удобном для сопоставления"""
+    id: int
+    campus_id: Optional[int]
+    department_id: Optional[int]
+    tag_ids: FrozenSet[int]
+    # Название, описание и требования в нижнем регистре
+    fields: Tuple[str, ...]
+
+    @classmethod
+    def create(cls, id, campus_id, department_id, tag_ids: Iterable[int], *texts: Optional[str]) -> "Posting":
+        return cls(id, campus_id, department_id, frozenset(tag_ids), tuple((text or "").lower() for text in texts))
+
+    @classmethod
+    def from_internship(cls, internship: Internship) -> "Posting":
+        return cls.create(
+            internship.id, internship.campus_id, internship.department_id,
+            (tag.id for tag in internship.tags),
+            internship.title, internship.description, internship.requirements,
+        )
+
+    def keys(self) -> Set[Key]:
+        keys: Set[Key] = {MATCH_ALL, ("c", self.campus_id), ("d", self.department_id)}
+        keys.update(("g", tag_id) for tag_id in self.tag_ids)
+        for field in self.fields:
+            keys.update(("t", gram) for gram in trigrams(field))
+        return keys
+
+
+class SavedSearchIndex:
+    """Обратный индекс сохраненных поисков
+
+    Каждый поиск хранится в одной корзине - по самому избирательному из своих
+    обязательных условий (триграмма фразы, тег в режиме and, кафедра, корпус).
+    Новая стажировка перебирает только корзины своих ключей, а найденные
+    кандидаты проверяются целиком. Поиск с тегами в режиме or без других условий
+    лежит в корзине каждого своего тега, поиск без условий - в общей корзине.
+    """
+
+    def __init__(self, rebuild_interval: float = REBUILD_INTERVAL_SECONDS):
+        self.rebuild_interval = rebuild_interval
+        self._searches: Dict[int, CompiledSearch] = {}
+        self._buckets: Dict[Key, Set[int]] = defaultdict(set)
+        self._anchors: Dict[int, List[Key]] = {}
+        self._last_id = 0
+        self._built_at: Optional[float] = None
+        self._lock = threading.RLock()
+
+    def __len__(self) -> int:
+        return len(self._searches)
+
+    def _rows(self, db: Session):
+        return db.query(
+            SavedSearch.id, SavedSearch.search, SavedSearch.campus_id,
+            SavedSearch.department_id, SavedSearch.tag_ids, SavedSearch.tag_mode
+        )
+
+    def ensure_fresh(self, db: Session) -> None:
+        """Перед сопоставлением: пересобрать устаревший индекс или дочитать новые поиски"""
+        if self._built_at is None or time.monotonic() - self._built_at > self.rebuild_interval:
+            self.rebuild(db)
+            return
+        rows = self._rows(db).filter(SavedSearch.id > self._last_id - SYNC_ID_OVERLAP).all()
+        with self._lock:
+            for row in rows:
+                if row.id not in self._searches:
+                    self._insert(CompiledSearch.from_row(row))
+                self._last_id = max(self._last_id, row.id)
+
+    def rebuild(self, db: Session) -> None:
+        rows = self._rows(db).order_by(SavedSearch.id).all()
+        with self._lock:
+            self._searches = {}
+            self._buckets = defaultdict(set)
+            self._anchors = {}
+            for row in rows:
+                self._insert(CompiledSearch.from_row(row))
+            self._last_id = rows[-1].id if rows else 0
+            self._built_at = time.monotonic()
+
+    def add(self, row) -> None:
+        with self._lock:
+            self.remove(row.id)
+            self._insert(CompiledSearch.from_row(row))
+
+    def remove(self, search_id: int) -> None:
+        with self._lock:
+            self._searches.pop(search_id, None)
+            for key in self._anchors.pop(search_id, ()):
+                bucket = self._buckets.get(key)
+                if bucket is not None:
+                    bucket.discard(search_id)
+                    if not bucket:
+                        del self._buckets[key]
+
+    def _anchor_keys(self, search: CompiledSearch) -> List[Key]:
+        # Триграммы и теги избирательнее кафедры, кафедра - корпуса; среди равных
+        # берем самую маленькую корзину, чтобы корзины росли равномерно
+        candidates: List[Tuple[int, Key]] = []
+        if search.phrase is not None and len(search.phrase) >= 3:
+            candidates.extend((0, ("t", gram)) for gram in trigrams(search.phrase))
+        if search.match_all_tags:
+            candidates.extend((0, ("g", tag_id)) for tag_id in search.tag_ids)
+        if search.department_id is not None:
+            candidates.append((1, ("d", search.department_id)))
+        if search.campus_id is not None:
+            candidates.append((2, ("c", search.campus_id)))
+
+        if candidates:
+            rank, key = min(candidates, key=lambda item: (item[0], len(self._buckets.get(item[1], ()))))
+            return [key]
+        if search.tag_ids:
+            return [("g", tag_id) for tag_id in search.tag_ids]
+        return [MATCH_ALL]
+
+    def _insert(self, search: CompiledSearch) -> None:
+        keys = self._anchor_keys(search)
+        self._searches[search.id] = search
+        self._anchors[search.id] = keys
+        for key in keys:
+            self._buckets[key].add(search.id)
+
+    def match(self, posting: Posting) -> List[int]:
+        """id сохраненных поисков, которым удовлетворяет стажировка"""
+        with self._lock:
+            candidates: Set[int] = set()
+            buckets = self._buckets
+            for key in posting.keys():
+                bucket = buckets.get(key)
+                if bucket:
+                    candidates |= bucket
+            searches = self._searches
+            return [search_id for search_id in candidates if searches[search_id].matches(posting)]
+
+
+saved_search_index = SavedSearchIndex()
+
+
+def _record_matches(db: Session, internship_id: int, search_ids: List[int]) -> None:
+    """Записать совпадения; поиски, удаленные после сборки индекса, отсеиваются в SELECT"""
+    source = select(
+        SavedSearch.id, SavedSearch.user_id, literal(internship_id)
+    ).where(SavedSearch.id.in_(search_ids))
+
+    dialect_insert = pg_insert if db.get_bind().dialect.name == "postgresql" else sqlite_insert
+    db.execute(
+        dialect_insert(SavedSearchMatch).from_select(
+            ["saved_search_id", "user_id", "internship_id"], source
+        ).on_conflict_do_nothing(index_elements=["saved_search_id", "internship_id"])
+    )
+
+
+def match_postings(db: Session, postings: Iterable[Posting]) -> int:
+    """Сопоставить опубликованные стажировки с сохраненными поисками"""
+    saved_search_index.ensure_fresh(db)
+    total = 0
+    for posting in postings:
+        search_ids = saved_search_index.match(posting)
+        if search_ids:
+            _record_matches(db, posting.id, search_ids)
+            total += len(search_ids)
+    db.commit()
+    return total
+
+
+def notify_published_internship(db: Session, internship: Internship) -> None:
+    """Вызывается после публикации стажировки; ошибка не отменяет публикацию"""
+    try:
+        match_postings(db, [Posting.from_internship(internship)])
+    except Exception:
+        db.rollback()
+        logger.exception("Не удалось сопоставить стажировку %s с сохраненными поисками", internship.id)
+
+
+def match_published_ids(db: Session, internship_ids: List[int]) -> int:
+    """Сопоставить стажировки, опубликованные фоновой задачей (без загрузки ORM-объектов)"""
+    rows = db.query(
+        Internship.id, Internship.campus_id, Internship.department_id,
+        Internship.title, Internship.description, Internship.requirements
+    ).filter(Internship.id.in_(internship_ids)).all()
+    tags: Dict[int, Set[int]] = defaultdict(set)
+    for internship_id, tag_id in db.query(Internship.id, Tag.id).join(Internship.tags).filter(
+        Internship.id.in_(internship_ids)
+    ):
+        tags[internship_id].add(tag_id)
+
+    return match_postings(db, (
+        Posting.create(row.id, row.campus_id, row.department_id, tags.get(row.id, ()),
+                       row.title, row.description, row.requirements)
+        for row in rows
+    ))
+
+
+def send_saved_search_digests(db: Session) -> None:
+    """Фоновая задача: одно push-событие на пользователя со всеми новыми совпадениями"""
+    while True:
+        rows = db.query(
+            SavedSearchMatch.id, SavedSearchMatch.user_id, SavedSearchMatch.saved_search_id,
+            SavedSearchMatch.internship_id, SavedSearch.name
+        ).join(
+            SavedSearch, SavedSearchMatch.saved_search_id == SavedSearch.id
+        ).filter(
+            SavedSearchMatch.notified_at.is_(None)
+        ).order_by(SavedSearchMatch.id).limit(DIGEST_BATCH_SIZE).all()
+        if not rows:
+            break
+
+        digests: Dict[int, Dict[int, dict]] = defaultdict(dict)
+        for row in rows:
+            search = digests[row.user_id].setdefault(row.saved_search_id, {
+                "saved_search_id": row.saved_search_id,
+                "name": row.name,
+                "internship_ids": [],
+            })
+            search["internship_ids"].append(row.internship_id)
+
+        # События уходят после коммита вместе с отметкой notified_at
+        for user_id, searches in digests.items():
+            application_events.publish(db, user_id, "saved_search_digest", {
+                "searches": list(searches.values()),
+                "count": sum(len(search["internship_ids"]) for search in searches.values()),
+            })
+        db.execute(
+            update(SavedSearchMatch)
+            .where(SavedSearchMatch.id.in_([row.id for row in rows]))
+            .values(notified_at=datetime.now())
+            .execution_options(synchronize_session=False)
+        )
+        db.commit()
+        logger.info("Отправлено дайджестов сохраненных поисков: %d", len(digests))
+
+        if len(rows) < DIGEST_BATCH_SIZE:
+            break
@@ -0,0 +1,205 @@
+import asyncio
+import fcntl
+import logging
+import os
+import tempfile
+import time
+import zlib
+from concurrent.futures import ThreadPoolExecutor
+from typing import Callable, List, Optional
+
+from sqlalchemy import text
+from sqlalchemy.orm import Session
+
+from ..database import SessionLocal, engine
+
+logger = logging.getLogger(__name__)
+
+# Фоновые задачи можно отключить (например, в тестах или на отдельных репликах)
+SCHEDULER_ENABLED = os.getenv("SCHEDULER_ENABLED", "true").lower() == "true"
+TICK_SECONDS = 15
+LEADER_LOCK_NAME = "uni_internships_scheduler"
+
+
+class LeaderLock:
+    """Блокировка лидера: фоновые задачи выполняет только один воркер
+
+    В PostgreSQL используется session-level advisory lock на отдельном
+    соединении, в остальных случаях (SQLite, локальная разработка) - flock
+    на файл во временной директории.
+    """
+
+    def __init__(self, name: str):
+        self.name = name
+        self._connection = None
+        self._file = None
+
+    @property
+    def held(self) -> bool:
+        return self._connection is not None or self._file is not None
+
+    def try_acquire(self) -> bool:
+        if self._connection is not None:
+            # Проверяем, что соединение (а значит и блокировка) еще живо
+            try:
+                self._connection.execute(text("SELECT 1"))
+                self._connection.commit()
+                return True
+            except Exception:
+                logger.warning("Соединение с блокировкой лидера потеряно")
+                self._drop_connection()
+
+        if self._file is not None:
+            return True
+
+        if engine.dialect.name == "postgresql":
+            return self._acquire_advisory()
+        return self._acquire_file()
+
+    def release(self) -> None:
+        if self._connection is not None:
+            try:
+                self._connection.execute(
+                    text("SELECT pg_advisory_unlock(:key)"), {"key": self._key()}
+                )
+                self._connection.commit()
+            except Exception:
+                pass
+            self._drop_connection()
+
+        if self._file is not None:
+            fcntl.flock(self._file, fcntl.LOCK_UN)
+            self._file.close()
+            self._file = None
+
+    def _key(self) -> int:
+        return zlib.crc32(self.name.encode())
+
+    def _acquire_advisory(self) -> bool:
+        connection = engine.connect()
+        try:
+            acquired = connection.execute(
+                text("SELECT pg_try_advisory_lock(:key)"), {"key": self._key()}
+            ).scalar()
+            # Закрываем транзакцию, чтобы соединение не висело в "idle in transaction"
+            connection.commit()
+        except Exception:
+            connection.close()
+            raise
+
+        if acquired:
+            self._connection = connection
+            return True
+
+        connection.close()
+        return False
+
+    def _acquire_file(self) -> bool:
+        path = os.path.join(tempfile.gettempdir(), f"{self.name}.lock")
+        lock_file = open(path, "w")
+        try:
+            fcntl.flock(lock_file, fcntl.LOCK_EX | fcntl.LOCK_NB)
+        except OSError:
+            lock_file.close()
+            return False
+
+        self._file = lock_file
+        return True
+
+    def _drop_connection(self) -> None:
+        try:
+            self._connection.close()
+        except Exception:
+            pass
+        self._connection = None
+
+
+class ScheduledJob:
+    def __init__(self, name: str, interval: float, func: Callable[[Session], None]):
+        self.name = name
+        self.interval = interval
+        self.func = func
+        self.last_run: Optional[float] = None
+        self.task: Optional[asyncio.Future] = None
+
+    @property
+    def running(self) -> bool:
+        return self.task is not None and not self.task.done()
+
+    def is_due(self, now: float) -> bool:
+        return self.last_run is None or now - self.last_run >= self.interval
+
+
+class BackgroundScheduler:
+    """Внутрипроцессный планировщик периодических задач
+
+    Задачи - синхронные функции, принимающие сессию БД. Они выполняются
+    в собственном пуле потоков (по потоку на задачу), чтобы не блокировать
+    event loop и общий пул, и только в воркере, который удерживает блокировку
+    лидера. Задачи независимы: долгая сверка хранилища не задерживает
+    публикацию стажировок, а следующий запуск задачи ждет окончания предыдущего.
+    """
+
+    def __init__(self, lock: LeaderLock, tick: float = TICK_SECONDS):
+        self.lock = lock
+        self.tick = tick
+        self.jobs: List[ScheduledJob] = []
+        self._task: Optional[asyncio.Task] = None
+        self._executor: Optional[ThreadPoolExecutor] = None
+
+    def register(self, name: str, interval: float, func: Callable[[Session], None]) -> None:
+        self.jobs.append(ScheduledJob(name, interval, func))
+
+    async def start(self) -> None:
+        if not SCHEDULER_ENABLED or self._task is not None:
+            return
+        self._executor = ThreadPoolExecutor(max_workers=max(len(self.jobs), 1), thread_name_prefix="scheduler")
+        self._task = asyncio.create_task(self._loop())
+
+    async def stop(self) -> None:
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+        # Блокировку отпускаем после выполняющихся задач, иначе новый лидер запустит их параллельно
+        running = [job.task for job in self.jobs if job.running]
+        if running:
+            await asyncio.gather(*running, return_exceptions=True)
+        if self._executor is not None:
+            self._executor.shutdown(wait=False)
+            self._executor = None
+        await asyncio.to_thread(self.lock.release)
+
+    async def _loop(self) -> None:
+        while True:
+            try:
+                if await asyncio.to_thread(self.lock.try_acquire):
+                    now = time.monotonic()
+                    for job in self.jobs:
+                        if job.is_due(now) and not job.running:
+                            job.last_run = now
+                            job.task = asyncio.get_running_loop().run_in_executor(
+                                self._executor, self.run_job, job
+                            )
+            except Exception:
+                logger.exception("Ошибка в цикле планировщика")
+
+            await asyncio.sleep(self.tick)
+
+    def run_job(self, job: ScheduledJob) -> None:
+        db = SessionLocal()
+        started = time.perf_counter()
+        try:
+            job.func(db)
+        except Exception:
+            db.rollback()
+            logger.exception("Фоновая задача %s завершилась с ошибкой", job.name)
+        finally:
+            db.close()
+            logger.debug("Задача %s выполнена за %.3f с", job.name, time.perf_counter() - started)
+
+
+scheduler = BackgroundScheduler(LeaderLock(LEADER_LOCK_NAME))
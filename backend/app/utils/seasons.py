@@ -0,0 +1,64 @@
+"""
+Учебные сезоны заявок: учебный год с 1 сентября по 31 августа
+"""
+from datetime import datetime
+from typing import Optional, Tuple
+
+from fastapi import HTTPException, Query, status
+from sqlalchemy import and_
+
+SEASON_START_MONTH = 9
+MIN_SEASON = 2000
+
+
+def season_of(moment: datetime) -> int:
+    """Сезон даты: 2024 - учебный год 2024/2025"""
+    return moment.year if moment.month >= SEASON_START_MONTH else moment.year - 1
+
+
+def current_season() -> int:
+    return season_of(datetime.now())
+
+
+def season_bounds(season: int) -> Tuple[datetime, datetime]:
+    """Полуинтервал [начало, конец) сезона"""
+    return datetime(season, SEASON_START_MONTH, 1), datetime(season + 1, SEASON_START_MONTH, 1)
+
+
+def season_label(season: int) -> str:
+    return f"{season}/{season + 1}"
+
+
+def season_filter(column, season: int):
+    """Условие "дата в сезоне" - диапазон, который использует индекс по дате"""
+    start, end = season_bounds(season)
+    return and_(column >= start, column < end)
+
+
+def _check_season(season: int) -> int:
+    if season > current_season():
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="Сезон еще не начался"
+        )
+    return season
+
+
+def selected_season(
+    season: Optional[int] = Query(
+        None, ge=MIN_SEASON,
+        description="Учебный год: 2024 - сезон 2024/2025. По умолчанию текущий"
+    )
+) -> int:
+    """Зависимость: сезон запроса, по умолчанию текущий"""
+    return _check_season(season) if season is not None else current_season()
+
+
+def optional_season(
+    season: Optional[int] = Query(
+        None, ge=MIN_SEASON,
+        description="Учебный год: 2024 - сезон 2024/2025. По умолчанию без ограничения"
+    )
+) -> Optional[int]:
+    """Зависимость для выборок, уже ограниченных другим условием (например, стажировкой)"""
+    return _check_season(season) if season is not None else None
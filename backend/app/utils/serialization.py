@@ -0,0 +1,148 @@
+import os
+import types
+from decimal import Decimal
+from operator import attrgetter
+from typing import Any, Callable, Dict, List, Optional, Tuple, Type, Union, get_args, get_origin
+
+import orjson
+from fastapi import Response
+from pydantic import BaseModel, TypeAdapter
+
+# В тестах ответы проверяются Pydantic-схемами целиком; в продакшене используется
+# быстрый путь без повторной валидации ORM-объектов
+STRICT_RESPONSE_VALIDATION = os.getenv("STRICT_RESPONSE_VALIDATION", "false").lower() in ("1", "true")
+
+# Время в UTC - с суффиксом Z, как в JSON-режиме Pydantic
+ORJSON_OPTIONS = orjson.OPT_UTC_Z
+
+Serializer = Callable[[Any], Dict[str, Any]]
+
+_serializers: Dict[Type[BaseModel], Serializer] = {}
+_adapters: Dict[Type[BaseModel], TypeAdapter] = {}
+
+
+def _default(value: Any) -> Any:
+    # Pydantic в JSON-режиме пишет Decimal строкой, чтобы не терять точность
+    if isinstance(value, Decimal):
+        return str(value)
+    raise TypeError(f"Тип {type(value).__name__} не сериализуется в JSON")
+
+
+def _nested_model(annotation: Any) -> Optional[Tuple[Type[BaseModel], bool]]:
+    """Вернуть (схема, это_список) для вложенных схем, иначе None"""
+    origin = get_origin(annotation)
+    if origin in (Union, types.UnionType):
+        args = [arg for arg in get_args(annotation) if arg is not type(None)]
+        return _nested_model(args[0]) if len(args) == 1 else None
+    if origin in (list, List, tuple, set):
+        args = get_args(annotation)
+        if args and isinstance(args[0], type) and issubclass(args[0], BaseModel):
+            return args[0], True
+        return None
+    if isinstance(annotation, type) and issubclass(annotation, BaseModel):
+        return annotation, False
+    return None
+
+
+def _has_custom_logic(schema: Type[BaseModel]) -> bool:
+    """Есть ли у схемы валидаторы, сериализаторы или вычисляемые поля"""
+    decorators = schema.__pydantic_decorators__
+    return any((
+        decorators.validators, decorators.field_validators, decorators.root_validators,
+        decorators.model_validators, decorators.field_serializers, decorators.model_serializers,
+        decorators.computed_fields,
+    ))
+
+
+def compile_serializer(schema: Type[BaseModel]) -> Serializer:
+    """Собрать функцию ORM-объект -> dict по полям схемы (один раз на схему)"""
+    serializer = _serializers.get(schema)
+    if serializer is not None:
+        return serializer
+
+    if _has_custom_logic(schema):
+        # Чтение атрибутов в обход Pydantic пропустило бы логику схемы - сериализуем через модель
+        def serializer(obj: Any) -> Dict[str, Any]:
+            return schema.model_validate(obj, from_attributes=True).model_dump(mode="json", by_alias=True)
+
+        _serializers[schema] = serializer
+        return serializer
+
+    getters: List[Tuple[str, Callable[[Any], Any]]] = []
+    for name, field in schema.model_fields.items():
+        key = field.serialization_alias or field.alias or name
+        get_value = attrgetter(name)
+        nested = _nested_model(field.annotation)
+
+        if nested is None:
+            getters.append((key, get_value))
+            continue
+
+        nested_schema, is_list = nested
+        nested_serializer = compile_serializer(nested_schema)
+        if is_list:
+            getters.append((key, lambda obj, get=get_value, inner=nested_serializer: [
+                inner(item) for item in (get(obj) or ())
+            ]))
+        else:
+            getters.append((key, lambda obj, get=get_value, inner=nested_serializer: (
+                None if (value := get(obj)) is None else inner(value)
+            )))
+
+    def serializer(obj: Any) -> Dict[str, Any]:
+        return {key: getter(obj) for key, getter in getters}
+
+    _serializers[schema] = serializer
+    return serializer
+
+
+def _list_adapter(schema: Type[BaseModel]) -> TypeAdapter:
+    adapter = _adapters.get(schema)
+    if adapter is None:
+        adapter = _adapters[schema] = TypeAdapter(List[schema])
+    return adapter
+
+
+def serialize_items(rows: List[Any], schema: Type[BaseModel]) -> List[Any]:
+    """Превратить список ORM-объектов в JSON-совместимые данные"""
+    if STRICT_RESPONSE_VALIDATION:
+        adapter = _list_adapter(schema)
+        return adapter.dump_python(adapter.validate_python(rows, from_attributes=True), mode="json", by_alias=True)
+
+    serializer = compile_serializer(schema)
+    return [serializer(row) for row in rows]
+
+
+def json_response(content: Any, status_code: int = 200, headers: Optional[Dict[str, str]] = None) -> Response:
+    return Response(
+        content=orjson.dumps(content, default=_default, option=ORJSON_OPTIONS),
+        status_code=status_code,
+        headers=headers,
+        media_type="application/json",
+    )
+
+
+def list_response(rows: List[Any], schema: Type[BaseModel], headers: Optional[Dict[str, str]] = None) -> Response:
+    """Быстрый ответ-список: один проход по полям и orjson вместо двойной валидации"""
+    if STRICT_RESPONSE_VALIDATION:
+        adapter = _list_adapter(schema)
+        content = adapter.dump_json(adapter.validate_python(rows, from_attributes=True), by_alias=True)
+        return Response(content=content, headers=headers, media_type="application/json")
+
+    return json_response(serialize_items(rows, schema), headers=headers)
+
+
+def serialize_item(obj: Any, schema: Type[BaseModel]) -> Dict[str, Any]:
+    if STRICT_RESPONSE_VALIDATION:
+        return schema.model_validate(obj, from_attributes=True).model_dump(mode="json", by_alias=True)
+
+    return compile_serializer(schema)(obj)
+
+
+def item_response(obj: Any, schema: Type[BaseModel], headers: Optional[Dict[str, str]] = None) -> Response:
+    """Ответ с одним объектом (детальная карточка) тем же быстрым путем"""
+    if STRICT_RESPONSE_VALIDATION:
+        content = schema.model_validate(obj, from_attributes=True).model_dump_json(by_alias=True)
+        return Response(content=content, headers=headers, media_type="application/json")
+
+    return json_response(compile_serializer(schema)(obj), headers=headers)
@@ -0,0 +1,258 @@
+"""
+Хранилище загруженных файлов: локальный диск или S3-совместимое хранилище (S3, MinIO)
+"""
+import asyncio
+import os
+import time
+from typing import BinaryIO, Iterator, List, Optional, Tuple
+from urllib.parse import quote
+
+import aiofiles
+from fastapi import UploadFile
+
+from ..config import settings
+
+try:
+    import boto3
+    from botocore.config import Config as BotoConfig
+    from botocore.exceptions import ClientError
+except ImportError:  # boto3 нужен только для STORAGE_BACKEND=s3
+    boto3 = None
+
+STORAGE_BACKEND = os.getenv("STORAGE_BACKEND", "local")
+S3_BUCKET = os.getenv("S3_BUCKET", "uni-internships")
+# Для MinIO или другого S3-совместимого сервиса, например http://localhost:9000
+S3_ENDPOINT_URL = os.getenv("S3_ENDPOINT_URL")
+# Адрес хранилища, доступный браузеру, если API обращается к нему по внутреннему
+# имени (например, http://minio:9000 в docker-compose); на него подписываются ссылки
+S3_PUBLIC_ENDPOINT_URL = os.getenv("S3_PUBLIC_ENDPOINT_URL") or S3_ENDPOINT_URL
+S3_REGION = os.getenv("S3_REGION", "us-east-1")
+S3_PREFIX = os.getenv("S3_PREFIX", "")
+# Время жизни подписанной ссылки на скачивание
+PRESIGNED_URL_TTL_SECONDS = int(os.getenv("PRESIGNED_URL_TTL_SECONDS", "300"))
+
+# Размер куска при потоковой записи на диск
+UPLOAD_CHUNK_SIZE = 1024 * 1024
+
+# Объект с датой изменения, как его видит сверка хранилища
+StoredObject = Tuple[str, float]
+
+
+class StorageError(Exception):
+    pass
+
+
+class LocalStorage:
+    """Файлы в каталоге UPLOAD_DIR; ключ - путь относительно каталога"""
+
+    def __init__(self, root: str):
+        self.root = root
+
+    def path(self, key: str) -> str:
+        return os.path.join(self.root, key)
+
+    async def save(self, file: UploadFile, key: str) -> int:
+        full_path = self.path(key)
+        os.makedirs(os.path.dirname(full_path), exist_ok=True)
+
+        size = 0
+        try:
+            async with aiofiles.open(full_path, "wb") as target:
+                while True:
+                    chunk = await file.read(UPLOAD_CHUNK_SIZE)
+                    if not chunk:
+                        break
+                    size += len(chunk)
+                    await target.write(chunk)
+        except Exception:
+            self.delete(key)
+            raise
+        return size
+
+    def open(self, key: str) -> BinaryIO:
+        return open(self.path(key), "rb")
+
+    def exists(self, key: str) -> bool:
+        return os.path.isfile(self.path(key))
+
+    def delete(self, key: str) -> bool:
+        try:
+            os.remove(self.path(key))
+            return True
+        except FileNotFoundError:
+            return False
+
+    def size(self, key: str) -> Optional[int]:
+        try:
+            return os.path.getsize(self.path(key))
+        except OSError:
+            return None
+
+    def download_url(self, key: str, filename: str, content_type: Optional[str]) -> Optional[str]:
+        # Локальные файлы отдает сам API
+        return None
+
+    def move(self, key: str, target_key: str) -> None:
+        """Перенести объект; время изменения перенесенного объекта - текущее"""
+        target = self.path(target_key)
+        os.makedirs(os.path.dirname(target), exist_ok=True)
+        os.replace(self.path(key), target)
+        os.utime(target)
+
+    def iter_batches(self, prefix: str = "", batch_size: int = 500, skip: Tuple[str, ...] = ()) -> Iterator[List[StoredObject]]:
+        """Обойти дерево через os.scandir и отдавать пачки (ключ, mtime)"""
+        stack = [prefix.rstrip("/")]
+        batch: List[StoredObject] = []
+
+        while stack:
+            relative_dir = stack.pop()
+            try:
+                with os.scandir(self.path(relative_dir)) as entries:
+                    for entry in entries:
+                        key = f"{relative_dir}/{entry.name}" if relative_dir else entry.name
+                        if entry.is_dir(follow_symlinks=False):
+                            if key not in skip:
+                                stack.append(key)
+                        elif entry.is_file(follow_symlinks=False):
+                            batch.append((key, entry.stat(follow_symlinks=False).st_mtime))
+                            if len(batch) >= batch_size:
+                                yield batch
+                                batch = []
+            except FileNotFoundError:
+                # Каталог удалили во время обхода
+                continue
+
+        if batch:
+            yield batch
+
+    def cleanup(self, older_than: float) -> None:
+        """Удалить пустые каталоги старше older_than (свежие может создавать загрузка)"""
+        now = time.time()
+        for directory, subdirs, files in os.walk(self.root, topdown=False):
+            if directory == self.root or subdirs or files:
+                continue
+            try:
+                if now - os.stat(directory).st_mtime > older_than:
+                    os.rmdir(directory)
+            except OSError:
+                pass
+
+
+class S3Storage:
+    """S3-совместимое хранилище: скачивание по подписанным ссылкам"""
+
+    def __init__(
+        self,
+        bucket: str,
+        prefix: str = "",
+        endpoint_url: Optional[str] = None,
+        region: Optional[str] = None,
+        public_endpoint_url: Optional[str] = None,
+    ):
+        if boto3 is None:
+            raise StorageError("Для STORAGE_BACKEND=s3 требуется пакет boto3")
+
+        self.bucket = bucket
+        self.prefix = prefix.strip("/") + "/" if prefix.strip("/") else ""
+        self.client = self._client(endpoint_url, region)
+        # Подпись включает хост, поэтому ссылки для браузера подписывает отдельный клиент
+        public_endpoint_url = public_endpoint_url or endpoint_url
+        self.presign_client = (
+            self.client if public_endpoint_url == endpoint_url
+            else self._client(public_endpoint_url, region)
+        )
+
+    @staticmethod
+    def _client(endpoint_url: Optional[str], region: Optional[str]):
+        # Ключи доступа берутся из стандартных переменных AWS_ACCESS_KEY_ID / AWS_SECRET_ACCESS_KEY
+        return boto3.client(
+            "s3",
+            endpoint_url=endpoint_url,
+            region_name=region,
+            config=BotoConfig(signature_version="s3v4", s3={"addressing_style": "path" if endpoint_url else "auto"}),
+        )
+
+    def _key(self, key: str) -> str:
+        return self.prefix + key
+
+    async def save(self, file: UploadFile, key: str) -> int:
+        # Размер загрузки ограничен 5 МБ до сохранения - файл уходит одним PUT
+        body = await file.read()
+        await asyncio.to_thread(
+            self.client.put_object,
+            Bucket=self.bucket, Key=self._key(key), Body=body, ContentType=file.content_type
+        )
+        return len(body)
+
+    def open(self, key: str) -> BinaryIO:
+        try:
+            return self.client.get_object(Bucket=self.bucket, Key=self._key(key))["Body"]
+        except ClientError as error:
+            # Для сборки архивов отсутствующий объект - то же, что отсутствующий файл
+            raise FileNotFoundError(key) from error
+
+    def exists(self, key: str) -> bool:
+        try:
+            self.client.head_object(Bucket=self.bucket, Key=self._key(key))
+            return True
+        except ClientError:
+            return False
+
+    def delete(self, key: str) -> bool:
+        self.client.delete_object(Bucket=self.bucket, Key=self._key(key))
+        return True
+
+    def size(self, key: str) -> Optional[int]:
+        try:
+            return self.client.head_object(Bucket=self.bucket, Key=self._key(key))["ContentLength"]
+        except ClientError:
+            return None
+
+    def download_url(self, key: str, filename: str, content_type: Optional[str]) -> Optional[str]:
+        params = {
+            "Bucket": self.bucket,
+            "Key": self._key(key),
+            "ResponseContentDisposition": f"attachment; filename*=UTF-8''{quote(filename)}",
+        }
+        if content_type:
+            params["ResponseContentType"] = content_type
+        return self.presign_client.generate_presigned_url("get_object", Params=params, ExpiresIn=PRESIGNED_URL_TTL_SECONDS)
+
+    def move(self, key: str, target_key: str) -> None:
+        # Копия получает новую дату изменения - от нее отсчитывается карантин
+        self.client.copy_object(
+            Bucket=self.bucket,
+            Key=self._key(target_key),
+            CopySource={"Bucket": self.bucket, "Key": self._key(key)},
+        )
+        self.client.delete_object(Bucket=self.bucket, Key=self._key(key))
+
+    def iter_batches(self, prefix: str = "", batch_size: int = 1000, skip: Tuple[str, ...] = ()) -> Iterator[List[StoredObject]]:
+        """Постраничный листинг бакета (до 1000 ключей за запрос)"""
+        paginator = self.client.get_paginator("list_objects_v2")
+        pages = paginator.paginate(
+            Bucket=self.bucket,
+            Prefix=self._key(prefix),
+            PaginationConfig={"PageSize": min(batch_size, 1000)},
+        )
+        for page in pages:
+            batch = []
+            for item in page.get("Contents", ()):
+                key = item["Key"][len(self.prefix):]
+                if not key.startswith(skip):
+                    batch.append((key, item["LastModified"].timestamp()))
+            if batch:
+                yield batch
+
+    def cleanup(self, older_than: float) -> None:
+        # Каталогов в S3 нет
+        pass
+
+
+def create_storage():
+    if STORAGE_BACKEND == "s3":
+        return S3Storage(S3_BUCKET, S3_PREFIX, S3_ENDPOINT_URL, S3_REGION, S3_PUBLIC_ENDPOINT_URL)
+    return LocalStorage(settings.UPLOAD_DIR)
+
+
+storage = create_storage()
@@ -0,0 +1,214 @@
+"""
+Сверка хранилища загрузок с таблицей файлов: файлы-сироты и записи без файлов
+"""
+import logging
+import os
+import time
+from typing import List, Set
+
+from sqlalchemy import select
+from sqlalchemy.orm import Session
+
+from ..models.application_archive import ArchivedSeason, archive_tables
+from ..models.file import FileModel
+from .storage import storage as default_storage
+
+logger = logging.getLogger(__name__)
+
+# Сироты сначала переносятся сюда и удаляются только после карантина
+QUARANTINE_DIR = ".quarantine"
+
+# Сколько файлов обрабатывается за один шаг обхода и один запрос IN (...)
+SCAN_BATCH_SIZE = 500
+# Свежие файлы не трогаем: запись в БД о них может еще не закоммититься
+GRACE_SECONDS = float(os.getenv("STORAGE_GC_GRACE_HOURS", "6")) * 3600
+QUARANTINE_SECONDS = float(os.getenv("STORAGE_GC_QUARANTINE_DAYS", "7")) * 86400
+# Ограничение числа операций с диском и БД в секунду, чтобы не мешать живому трафику
+MAX_OPS_PER_SECOND = float(os.getenv("STORAGE_GC_RATE", "50"))
+STORAGE_GC_DRY_RUN = os.getenv("STORAGE_GC_DRY_RUN", "false").lower() == "true"
+STORAGE_GC_INTERVAL_SECONDS = 6 * 3600
+# Сколько id записей без файлов попадает в отчет
+DANGLING_REPORT_LIMIT = 100
+
+
+class RateLimiter:
+    """Не больше per_second операций в секунду (0 - без ограничения)"""
+
+    def __init__(self, per_second: float):
+        self.interval = 1 / per_second if per_second > 0 else 0.0
+        self._next = 0.0
+
+    def wait(self) -> None:
+        if not self.interval:
+            return
+        now = time.monotonic()
+        if self._next > now:
+            time.sleep(self._next - now)
+        self._next = max(now, self._next) + self.interval
+
+
+class ReconcileReport:
+    def __init__(self, dry_run: bool):
+        self.dry_run = dry_run
+        self.scanned = 0
+        self.orphans = 0
+        self.quarantined = 0
+        self.deleted = 0
+        self.restored = 0
+        self.dangling = 0
+        self.dangling_ids: List[int] = []
+
+    def as_dict(self) -> dict:
+        return {
+            "dry_run": self.dry_run,
+            "scanned": self.scanned,
+            "orphans": self.orphans,
+            "quarantined": self.quarantined,
+            "deleted": self.deleted,
+            "restored": self.restored,
+            "dangling": self.dangling,
+            "dangling_ids": self.dangling_ids,
+        }
+
+
+def known_paths(db: Session, paths: List[str]) -> Set[str]:
+    """Какие из путей есть в таблице файлов или в ее архиве (запросами по SCAN_BATCH_SIZE путей)"""
+    # Файлы архивных сезонов остаются в хранилище и не должны считаться сиротами
+    archived_files = (
+        archive_tables()[FileModel.__table__.name]
+        if db.query(ArchivedSeason.season).first() is not None else None
+    )
+    found: Set[str] = set()
+    for start in range(0, len(paths), SCAN_BATCH_SIZE):
+        chunk = paths[start:start + SCAN_BATCH_SIZE]
+        found.update(
+            path for (path,) in db.query(FileModel.file_path).filter(FileModel.file_path.in_(chunk))
+        )
+        if archived_files is not None:
+            found.update(
+                path for (path,) in db.execute(
+                    select(archived_files.c.file_path).where(archived_files.c.file_path.in_(chunk))
+                )
+            )
+    return found
+
+
+def _quarantine_key(key: str) -> str:
+    return f"{QUARANTINE_DIR}/{key}"
+
+
+def _scan_orphans(db: Session, storage, report: ReconcileReport, limiter: RateLimiter, now: float, grace: float) -> None:
+    for batch in storage.iter_batches(batch_size=SCAN_BATCH_SIZE, skip=(QUARANTINE_DIR,)):
+        report.scanned += len(batch)
+        candidates = [path for path, modified in batch if now - modified > grace]
+        if not candidates:
+            continue
+
+        limiter.wait()
+        known = known_paths(db, candidates)
+        for path in candidates:
+            if path in known:
+                continue
+            report.orphans += 1
+            if report.dry_run:
+                logger.info("Файл без записи в БД: %s", path)
+                continue
+            limiter.wait()
+            try:
+                # Время карантина отсчитывается от переноса
+                storage.move(path, _quarantine_key(path))
+                report.quarantined += 1
+            except Exception:
+                logger.warning("Не удалось перенести в карантин %s", path, exc_info=True)
+
+
+def _purge_quarantine(db: Session, storage, report: ReconcileReport, limiter: RateLimiter, now: float, quarantine: float) -> None:
+    prefix = f"{QUARANTINE_DIR}/"
+    for batch in storage.iter_batches(prefix, batch_size=SCAN_BATCH_SIZE):
+        limiter.wait()
+        paths = [(key[len(prefix):], quarantined_at) for key, quarantined_at in batch]
+        # Запись могла появиться (например, после восстановления БД) - тогда файл возвращаем
+        known = known_paths(db, [path for path, _ in paths])
+        for path, quarantined_at in paths:
+            if report.dry_run:
+                continue
+            limiter.wait()
+            try:
+                if path in known:
+                    storage.move(_quarantine_key(path), path)
+                    report.restored += 1
+                elif now - quarantined_at > quarantine:
+                    storage.delete(_quarantine_key(path))
+                    report.deleted += 1
+            except Exception:
+                logger.warning("Не удалось обработать файл из карантина %s", path, exc_info=True)
+
+
+def _find_dangling(db: Session, storage, report: ReconcileReport, limiter: RateLimiter) -> None:
+    """Записи, файлов которых нет на диске (только отчет - записи не удаляются)"""
+    last_id = 0
+    while True:
+        limiter.wait()
+        rows = db.query(FileModel.id, FileModel.file_path).filter(
+            FileModel.id > last_id
+        ).order_by(FileModel.id).limit(SCAN_BATCH_SIZE).all()
+        if not rows:
+            break
+        last_id = rows[-1].id
+
+        for file_id, path in rows:
+            # Каждая проверка на S3 - отдельный HEAD-запрос
+            limiter.wait()
+            if storage.exists(path):
+                continue
+            if report.dry_run:
+                quarantined = False
+            else:
+                limiter.wait()
+                quarantined = storage.exists(_quarantine_key(path))
+            if quarantined:
+                # Запись появилась уже после переноса файла в карантин
+                limiter.wait()
+                try:
+                    storage.move(_quarantine_key(path), path)
+                    report.restored += 1
+                    continue
+                except Exception:
+                    logger.warning("Не удалось вернуть файл из карантина %s", path, exc_info=True)
+            report.dangling += 1
+            if len(report.dangling_ids) < DANGLING_REPORT_LIMIT:
+                report.dangling_ids.append(file_id)
+
+
+def reconcile_storage(
+    db: Session,
+    dry_run: bool = STORAGE_GC_DRY_RUN,
+    rate: float = MAX_OPS_PER_SECOND,
+    grace: float = GRACE_SECONDS,
+    quarantine: float = QUARANTINE_SECONDS,
+    storage=None,
+) -> ReconcileReport:
+    """Сверить хранилище файлов с БД
+
+    Сироты старше grace переносятся в карантин, из карантина удаляются через
+    quarantine секунд. Записи без файлов попадают в отчет. В режиме dry_run
+    ничего не переносится и не удаляется.
+    """
+    storage = storage or default_storage
+    report = ReconcileReport(dry_run)
+    limiter = RateLimiter(rate)
+    now = time.time()
+
+    _scan_orphans(db, storage, report, limiter, now, grace)
+    _purge_quarantine(db, storage, report, limiter, now, quarantine)
+    _find_dangling(db, storage, report, limiter)
+    if not dry_run:
+        storage.cleanup(grace)
+
+    logger.info("Сверка хранилища файлов: %s", report.as_dict())
+    return report
+
+
+def run_storage_reconciliation(db: Session) -> None:
+    """Фоновая задача планировщика"""
+    reconcile_storage(db)
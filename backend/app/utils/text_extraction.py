@@ -0,0 +1,92 @@
+"""
+Извлечение текста из резюме (PDF, DOCX, DOC)
+
+Модуль не зависит от приложения: функции выполняются в отдельных процессах пула.
+"""
+import io
+import re
+import zipfile
+from typing import Optional
+from xml.etree import ElementTree
+
+try:
+    from pypdf import PdfReader
+except ImportError:  # без pypdf PDF-файлы помечаются как неподдерживаемые
+    PdfReader = None
+
+# Ограничения, чтобы один документ не занимал процесс пула надолго
+MAX_PDF_PAGES = 30
+MAX_TEXT_CHARS = 100000
+MAX_DOCX_XML_BYTES = 20 * 1024 * 1024
+
+PDF_TYPES = {"application/pdf"}
+DOCX_TYPES = {"application/vnd.openxmlformats-officedocument.wordprocessingml.document"}
+DOC_TYPES = {"application/msword"}
+
+_WORD_NS = "{http://schemas.openxmlformats.org/wordprocessingml/2006/main}"
+# Текст в бинарном .doc: UTF-16LE (латиница и кириллица) или однобайтовые строки
+_DOC_UTF16_RUN = re.compile(rb"(?:[\x20-\x7e\t\r\n]\x00|[\x01-\x5f]\x04){4,}")
+_DOC_ASCII_RUN = re.compile(rb"[\x20-\x7e]{8,}")
+_WHITESPACE = re.compile(r"[ \t\r\f\v]+")
+
+
+class UnsupportedDocument(Exception):
+    pass
+
+
+def _normalize(text: str) -> str:
+    lines = (_WHITESPACE.sub(" ", line).strip() for line in text.splitlines())
+    return "\n".join(line for line in lines if line)[:MAX_TEXT_CHARS]
+
+
+def _pdf_text(content: bytes) -> str:
+    if PdfReader is None:
+        raise UnsupportedDocument("Для извлечения текста из PDF требуется пакет pypdf")
+    reader = PdfReader(io.BytesIO(content))
+    parts = []
+    for page in reader.pages[:MAX_PDF_PAGES]:
+        parts.append(page.extract_text() or "")
+    return "\n".join(parts)
+
+
+def _docx_text(content: bytes) -> str:
+    with zipfile.ZipFile(io.BytesIO(content)) as archive:
+        info = archive.getinfo("word/document.xml")
+        # Защита от zip-бомб: размер после распаковки проверяем до чтения
+        if info.file_size > MAX_DOCX_XML_BYTES:
+            raise UnsupportedDocument("Слишком большой документ")
+        with archive.open(info) as document:
+            paragraphs, current = [], []
+            for event, element in ElementTree.iterparse(document, events=("end",)):
+                if element.tag == f"{_WORD_NS}t" and element.text:
+                    current.append(element.text)
+                elif element.tag == f"{_WORD_NS}tab":
+                    current.append(" ")
+                elif element.tag == f"{_WORD_NS}p":
+                    paragraphs.append("".join(current))
+                    current = []
+                    element.clear()
+    return "\n".join(paragraphs)
+
+
+def _doc_text(content: bytes) -> str:
+    """Приблизительно: без разбора формата Word 97 собираем читаемые фрагменты"""
+    runs = [run.decode("utf-16-le", "ignore") for run in _DOC_UTF16_RUN.findall(content)]
+    if not runs:
+        runs = [run.decode("latin-1") for run in _DOC_ASCII_RUN.findall(content)]
+    return "\n".join(runs)
+
+
+def extract_text(content: bytes, content_type: Optional[str], filename: str = "") -> str:
+    """Текст документа; UnsupportedDocument - формат не поддерживается"""
+    extension = filename.rsplit(".", 1)[-1].lower() if "." in filename else ""
+
+    if content_type in PDF_TYPES or extension == "pdf":
+        text = _pdf_text(content)
+    elif content_type in DOCX_TYPES or extension == "docx":
+        text = _docx_text(content)
+    elif content_type in DOC_TYPES or extension == "doc":
+        text = _doc_text(content)
+    else:
+        raise UnsupportedDocument(f"Неподдерживаемый тип файла: {content_type}")
+    return _normalize(text)
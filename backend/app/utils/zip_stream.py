@@ -0,0 +1,104 @@
+"""
+Потоковая сборка ZIP-архива без временных файлов
+"""
+import io
+import zipfile
+from datetime import datetime
+from typing import Callable, Iterable, Iterator, List, NamedTuple, Optional
+
+# Размер куска при чтении исходных файлов
+CHUNK_SIZE = 64 * 1024
+
+
+class ZipEntry(NamedTuple):
+    arcname: str
+    open: Callable[[], io.RawIOBase]
+    size: Optional[int] = None
+    modified: Optional[datetime] = None
+
+
+class _ChunkBuffer(io.RawIOBase):
+    """Несеекабельный приемник: zipfile пишет в него, генератор сразу забирает байты"""
+
+    def __init__(self):
+        self._chunks: List[bytes] = []
+        self._offset = 0
+
+    def writable(self) -> bool:
+        return True
+
+    def write(self, data) -> int:
+        self._chunks.append(bytes(data))
+        self._offset += len(data)
+        return len(data)
+
+    def tell(self) -> int:
+        return self._offset
+
+    def drain(self) -> bytes:
+        data = b"".join(self._chunks)
+        self._chunks.clear()
+        return data
+
+
+def _zip_time(value: Optional[datetime]):
+    value = value or datetime.now()
+    # Формат ZIP не хранит даты раньше 1980 года
+    return max(value.timetuple()[:6], (1980, 1, 1, 0, 0, 0))
+
+
+def stream_zip(entries: Iterable[ZipEntry], missing_note: str = "_missing.txt") -> Iterator[bytes]:
+    """Отдавать архив кусками по мере чтения файлов (память не зависит от размера архива)
+
+    Файлы сохраняются без сжатия (ZIP_STORED): PDF и DOCX уже сжаты.
+    Файлы, которые не удалось открыть, перечисляются в missing_note в конце архива.
+    """
+    buffer = _ChunkBuffer()
+    missing: List[str] = []
+
+    with zipfile.ZipFile(buffer, "w", compression=zipfile.ZIP_STORED, allowZip64=True) as archive:
+        for entry in entries:
+            try:
+                source = entry.open()
+            except OSError:
+                missing.append(entry.arcname)
+                continue
+
+            info = zipfile.ZipInfo(entry.arcname, date_time=_zip_time(entry.modified))
+            info.compress_type = zipfile.ZIP_STORED
+            if entry.size is not None:
+                # По размеру zipfile решает, нужен ли ZIP64 для записи
+                info.file_size = entry.size
+
+            with source, archive.open(info, "w") as target:
+                while True:
+                    chunk = source.read(CHUNK_SIZE)
+                    if not chunk:
+                        break
+                    target.write(chunk)
+                    data = buffer.drain()
+                    if data:
+                        yield data
+
+            data = buffer.drain()
+            if data:
+                yield data
+
+        if missing:
+            archive.writestr(missing_note, "\n".join(missing) + "\n")
+
+    yield buffer.drain()
+
+
+def unique_arcname(name: str, used: set) -> str:
+    """Имя внутри архива без повторов: resume.pdf, resume (2).pdf, ..."""
+    candidate = name
+    stem, dot, extension = name.rpartition(".")
+    if not dot:
+        stem, extension = name, ""
+    counter = 2
+    while candidate in used:
+        candidate = f"{stem} ({counter}){dot}{extension}"
+        counter += 1
+    used.add(candidate)
+    return candidate
@@ -0,0 +1,56 @@
+"""
+Скрипт для переноса заявок закрытых учебных сезонов в архивные таблицы
+"""
+import argparse
+
+from app.database import SessionLocal, engine
+from app.models import Base
+from app.models.application_archive import ensure_season_storage
+from app.utils.archive import ARCHIVE_BATCH_SIZE, OPEN_STATUSES, archive_season, count_live_applications
+from app.utils.seasons import current_season, season_label
+
+def archive_seasons(seasons, include_open=False, batch_size=ARCHIVE_BATCH_SIZE):
+    """Перенести сезоны в архив (по умолчанию - все, кроме текущего и прошлого)"""
+
+    Base.metadata.create_all(bind=engine)
+    ensure_season_storage(engine)
+
+    db = SessionLocal()
+
+    try:
+        for season in seasons:
+            if season >= current_season():
+                print(f"Сезон {season_label(season)} еще не закрыт - пропускаем")
+                continue
+
+            if not count_live_applications(db, season):
+                continue
+
+            open_count = count_live_applications(db, season, OPEN_STATUSES)
+            if open_count and not include_open:
+                print(
+                    f"Сезон {season_label(season)}: {open_count} заявок еще не рассмотрено - "
+                    f"пропускаем (--include-open, чтобы перенести и их)"
+                )
+                continue
+
+            moved = archive_season(db, season, batch_size)
+            print(f"Сезон {season_label(season)}: перенесено в архив заявок: {moved}")
+
+    except Exception as e:
+        print(f"Ошибка при переносе в архив: {e}")
+        db.rollback()
+    finally:
+        db.close()
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Архивация заявок по учебным сезонам")
+    parser.add_argument("--season", type=int, action="append", help="сезон (2023 - учебный год 2023/2024); можно несколько")
+    parser.add_argument("--since", type=int, default=2015, help="первый сезон, если --season не задан")
+    parser.add_argument("--include-open", action="store_true", help="переносить и нерассмотренные заявки")
+    parser.add_argument("--batch-size", type=int, default=ARCHIVE_BATCH_SIZE)
+    args = parser.parse_args()
+
+    # Прошлый сезон остается в рабочих таблицах: по нему еще принимают решения
+    seasons = args.season or range(args.since, current_season() - 1)
+    archive_seasons(seasons, args.include_open, args.batch_size)
@@ -0,0 +1,51 @@
+"""
+Скрипт для пересчета агрегатов аналитики заявок за прошлые периоды
+"""
+import argparse
+from datetime import date
+
+from app.database import SessionLocal, engine
+from app.models import Base
+from app.models.analytics import ApplicationRollup  # noqa: F401 - регистрируем таблицы аналитики
+from app.models.application import Application
+from app.utils.rollups import recompute_range, seed_status_changes
+from sqlalchemy import func
+
+def backfill_rollups(date_from=None, date_to=None, seed=False):
+    """Пересчитать агрегаты за период (по умолчанию - за всю историю)"""
+    
+    Base.metadata.create_all(bind=engine)
+    
+    db = SessionLocal()
+    
+    try:
+        if seed:
+            created = seed_status_changes(db)
+            print(f"Создано записей истории статусов: {created}")
+        
+        if not date_from:
+            earliest = db.query(func.min(Application.created_at)).scalar()
+            date_from = earliest.date() if earliest else date.today()
+        date_to = date_to or date.today()
+        
+        recompute_range(db, date_from, date_to)
+        print(f"Агрегаты пересчитаны за период {date_from} - {date_to}")
+        
+    except Exception as e:
+        print(f"Ошибка при пересчете агрегатов: {e}")
+        db.rollback()
+    finally:
+        db.close()
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Пересчет агрегатов аналитики заявок")
+    parser.add_argument("--from", dest="date_from", type=date.fromisoformat)
+    parser.add_argument("--to", dest="date_to", type=date.fromisoformat)
+    parser.add_argument(
+        "--seed-status-changes",
+        action="store_true",
+        help="создать историю статусов для заявок, рассмотренных до ее появления"
+    )
+    args = parser.parse_args()
+    
+    backfill_rollups(args.date_from, args.date_to, args.seed_status_changes)
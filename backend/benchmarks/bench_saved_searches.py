@@ -0,0 +1,68 @@
+"""
+Бенчмарк сопоставления новой стажировки с сохраненными поисками
+
+Строит обратный индекс из синтетических поисков (фраза, корпус, кафедра, теги)
+и измеряет время сопоставления одной стажировки. БД не требуется.
+
+Запуск:
+    python benchmarks/bench_saved_searches.py --searches 100000
+"""
+import argparse
+import os
+import random
+import sys
+import time
+import timeit
+from types import SimpleNamespace
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from app.utils.saved_searches import Posting, SavedSearchIndex
+
+SKILLS = (
+    "python java sql django react аналитик разработчик данные машинное обучение backend "
+    "frontend devops linux docker kubernetes тестирование дизайн figma маркетинг excel"
+).split()
+FILLER = ("и", "в", "для", "работа", "команда", "опыт", "задачи", "проект", "стажер")
+
+
+def fake_search(search_id: int, vocabulary) -> SimpleNamespace:
+    return SimpleNamespace(
+        id=search_id,
+        search=random.choice(vocabulary) if random.random() < 0.6 else None,
+        campus_id=random.choice((None, 1, 2, 3)),
+        department_id=random.choice((None, None, None, *range(1, 8))),
+        tag_ids=random.sample(range(1, 40), random.choice((0, 0, 1, 2))),
+        tag_mode=random.choice(("and", "or")),
+    )
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--searches", type=int, default=100000)
+    parser.add_argument("--repeat", type=int, default=50)
+    args = parser.parse_args()
+
+    random.seed(1)
+    # Кроме популярных навыков - длинный хвост редких слов, как в реальных запросах
+    vocabulary = SKILLS + [f"skill{i}" for i in range(3000)]
+    index = SavedSearchIndex()
+
+    started = time.perf_counter()
+    for search_id in range(1, args.searches + 1):
+        index.add(fake_search(search_id, vocabulary))
+    print(f"Индекс из {len(index)} поисков построен за {time.perf_counter() - started:.2f} с")
+
+    description = " ".join(random.choice(SKILLS + list(FILLER)) for _ in range(600))
+    posting = Posting.create(
+        1, 2, 3, (5, 7, 9),
+        "Стажер Python-разработчик", description, "Знание SQL и Docker, опыт работы с Linux"
+    )
+
+    matches = index.match(posting)
+    seconds = min(timeit.repeat(lambda: index.match(posting), number=args.repeat, repeat=3)) / args.repeat
+    print(f"Сопоставление одной стажировки: {seconds * 1000:.2f} мс, совпадений: {len(matches)}")
+
+
+if __name__ == "__main__":
+    main()
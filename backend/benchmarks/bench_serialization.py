@@ -0,0 +1,102 @@
+"""
+Бенчмарк сериализации страницы списка (100 объектов с вложенными данными)
+
+Сравнивает стандартный путь FastAPI (валидация response_model, затем
+jsonable_encoder и json.dumps) со строгим путем через TypeAdapter и с быстрым
+путем (скомпилированный сериализатор + orjson). Объекты строятся по полям
+схем, поэтому бенчмарк не требует БД.
+
+Запуск:
+    python benchmarks/bench_serialization.py --items 100 --repeat 200
+"""
+import argparse
+import json
+import os
+import sys
+import timeit
+from datetime import date, datetime
+from types import SimpleNamespace
+from typing import Any, List
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from fastapi.encoders import jsonable_encoder
+from pydantic import TypeAdapter
+
+from app.schemas.internship import InternshipListResponse
+from app.schemas.application import ApplicationListResponse, ApplicationResponse
+from app.utils import serialization
+from app.utils.serialization import _nested_model, list_response
+
+
+def fake_value(annotation: Any, depth: int = 0) -> Any:
+    """Сгенерировать значение по аннотации поля схемы"""
+    nested = _nested_model(annotation)
+    if nested is not None:
+        schema, is_list = nested
+        if is_list:
+            return [fake_object(schema, depth + 1) for _ in range(3)]
+        return fake_object(schema, depth + 1)
+
+    text = str(annotation)
+    if "datetime" in text:
+        return datetime(2025, 9, 1, 12, 0)
+    if "date" in text:
+        return date(2025, 9, 1)
+    if "float" in text:
+        return 4.5
+    if "bool" in text:
+        return True
+    if "int" in text:
+        return 42
+    if "List" in text or "list" in text:
+        return []
+    return "Разработка алгоритмов машинного обучения для анализа данных. " * 4
+
+
+def fake_object(schema, depth: int = 0) -> SimpleNamespace:
+    return SimpleNamespace(**{
+        name: fake_value(field.annotation, depth)
+        for name, field in schema.model_fields.items()
+    })
+
+
+def fastapi_default(rows: List[Any], schema) -> bytes:
+    # Так FastAPI обрабатывает response_model: валидация, dump, jsonable_encoder, json.dumps
+    adapter = TypeAdapter(List[schema])
+    validated = adapter.validate_python(rows, from_attributes=True)
+    content = jsonable_encoder(adapter.dump_python(validated, mode="json"))
+    return json.dumps(content, ensure_ascii=False, separators=(",", ":")).encode("utf-8")
+
+
+def strict(rows: List[Any], schema) -> bytes:
+    serialization.STRICT_RESPONSE_VALIDATION = True
+    try:
+        return list_response(rows, schema).body
+    finally:
+        serialization.STRICT_RESPONSE_VALIDATION = False
+
+
+def fast(rows: List[Any], schema) -> bytes:
+    return list_response(rows, schema).body
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--items", type=int, default=100)
+    parser.add_argument("--repeat", type=int, default=200)
+    args = parser.parse_args()
+
+    for schema in (InternshipListResponse, ApplicationListResponse, ApplicationResponse):
+        rows = [fake_object(schema) for _ in range(args.items)]
+        print(f"{schema.__name__} ({args.items} объектов на страницу):")
+
+        baseline = None
+        for name, func in (("fastapi response_model", fastapi_default), ("strict TypeAdapter", strict), ("fast orjson", fast)):
+            seconds = min(timeit.repeat(lambda: func(rows, schema), number=args.repeat, repeat=3)) / args.repeat
+            baseline = baseline or seconds
+            print(f"  {name:>22}: {seconds * 1e6:9.1f} мкс/страница  x{baseline / seconds:.1f}")
+
+
+if __name__ == "__main__":
+    main()
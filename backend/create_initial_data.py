@@ -9,6 +9,15 @@ from app.models.campus import Campus
 from app.models.department import Department
 from app.models.tag import Tag
 from app.models.internship import Internship
+from app.models.internship_schedule import InternshipPublication  # noqa: F401 - регистрируем таблицу
+from app.models.analytics import ApplicationRollup  # noqa: F401 - регистрируем таблицы аналитики
+from app.models.revoked_token import RevokedToken  # noqa: F401 - регистрируем таблицу
+from app.models.file_text import FileText  # noqa: F401 - регистрируем таблицы извлеченного текста
+from app.models.saved_search import SavedSearch  # noqa: F401 - регистрируем таблицы сохраненных поисков
+from app.models.review_lease import ReviewLease  # noqa: F401 - регистрируем таблицу
+from app.models.idempotency import ApplicationIdempotencyKey  # noqa: F401 - регистрируем таблицу
+from app.models.application_constraints import ensure_application_constraints
+from app.models.application_archive import ensure_season_storage
 from app.auth.jwt import get_password_hash
 from datetime import datetime, timedelta
 
@@ -17,6 +26,8 @@ def create_initial_data():
     
     # Создаем таблицы
     Base.metadata.create_all(bind=engine)
+    ensure_application_constraints(engine)
+    ensure_season_storage(engine)
     
     db = SessionLocal()
     
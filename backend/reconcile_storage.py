@@ -0,0 +1,35 @@
+"""
+Скрипт для сверки каталога загрузок с БД: сироты на диске и записи без файлов
+"""
+import argparse
+import json
+
+from app.database import SessionLocal
+from app.utils.storage_gc import (
+    GRACE_SECONDS, MAX_OPS_PER_SECOND, QUARANTINE_SECONDS, reconcile_storage
+)
+
+def run(dry_run=False, rate=MAX_OPS_PER_SECOND, grace=GRACE_SECONDS, quarantine=QUARANTINE_SECONDS):
+    """Запустить сверку и вывести отчет"""
+    
+    db = SessionLocal()
+    
+    try:
+        report = reconcile_storage(db, dry_run=dry_run, rate=rate, grace=grace, quarantine=quarantine)
+        print(json.dumps(report.as_dict(), ensure_ascii=False, indent=2))
+        
+    except Exception as e:
+        print(f"Ошибка при сверке хранилища: {e}")
+        db.rollback()
+    finally:
+        db.close()
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Сверка загруженных файлов с БД")
+    parser.add_argument("--dry-run", action="store_true", help="только отчет, без переноса и удаления файлов")
+    parser.add_argument("--rate", type=float, default=MAX_OPS_PER_SECOND, help="операций в секунду (0 - без ограничения)")
+    parser.add_argument("--grace-hours", type=float, default=GRACE_SECONDS / 3600)
+    parser.add_argument("--quarantine-days", type=float, default=QUARANTINE_SECONDS / 86400)
+    args = parser.parse_args()
+    
+    run(args.dry_run, args.rate, args.grace_hours * 3600, args.quarantine_days * 86400)
@@ -0,0 +1,105 @@
+"""
+Общие фикстуры тестов с БД: SQLite в памяти со всеми таблицами приложения
+
+Модули приложения импортируются внутри фикстур, чтобы тесты чистых модулей
+не зависели от настроек БД.
+"""
+import itertools
+from datetime import datetime, timedelta
+
+import pytest
+
+
+@pytest.fixture
+def db():
+    from sqlalchemy import create_engine
+    from sqlalchemy.orm import sessionmaker
+    from sqlalchemy.pool import StaticPool
+
+    from app.database import Base
+    from app.models import (  # noqa: F401 - регистрируем таблицы
+        analytics, application, application_archive, file_text, idempotency,
+        internship_schedule, review_lease, revoked_token, saved_search,
+    )
+    from app.models.application_constraints import ensure_application_constraints
+
+    engine = create_engine("sqlite://", connect_args={"check_same_thread": False}, poolclass=StaticPool)
+    Base.metadata.create_all(bind=engine)
+    ensure_application_constraints(engine)
+
+    session = sessionmaker(bind=engine)()
+    try:
+        yield session
+    finally:
+        session.close()
+        engine.dispose()
+
+
+class Factory:
+    """Создание связанных записей с минимумом обязательных полей"""
+
+    def __init__(self, db):
+        self.db = db
+        self._counter = itertools.count(1)
+
+    def campus(self):
+        from app.models.campus import Campus
+
+        number = next(self._counter)
+        return self._add(Campus(name=f"Корпус {number}", code=f"C{number}", address="ул. Мира, 19"))
+
+    def department(self, campus=None):
+        from app.models.department import Department
+
+        campus = campus or self.campus()
+        return self._add(Department(name=f"Кафедра {next(self._counter)}", campus_id=campus.id))
+
+    def user(self, role: str = "student"):
+        from app.models.user import User
+
+        number = next(self._counter)
+        return self._add(User(
+            email=f"user{number}@university.edu",
+            first_name="Иван",
+            last_name=f"Петров{number}",
+            student_id=f"s{number}" if role == "student" else None,
+            hashed_password="x",
+            role=role,
+            is_active=True,
+        ))
+
+    def internship(self, status: str = "active", department=None, **values):
+        from app.models.internship import Internship
+
+        department = department or self.department()
+        return self._add(Internship(
+            title=values.pop("title", f"Стажировка {next(self._counter)}"),
+            description="Описание",
+            requirements="Требования",
+            deadline=datetime.now() + timedelta(days=30),
+            campus_id=department.campus_id,
+            department_id=department.id,
+            created_by_id=values.pop("created_by_id", None) or self.user("admin").id,
+            status=status,
+            **values,
+        ))
+
+    def application(self, internship, user=None, status: str = "pending", created_at=None):
+        from app.models.application import Application
+
+        return self._add(Application(
+            internship_id=internship.id,
+            user_id=(user or self.user()).id,
+            status=status,
+            created_at=created_at or datetime.now(),
+        ))
+
+    def _add(self, record):
+        self.db.add(record)
+        self.db.commit()
+        return record
+
+
+@pytest.fixture
+def factory(db):
+    return Factory(db)
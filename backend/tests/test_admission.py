@@ -0,0 +1,98 @@
+import asyncio
+
+from app.utils.admission import AdmissionController
+
+BUDGETS = {"high": 1.0, "normal": 0.05, "low": 0.0}
+
+
+def test_slots_are_limited_and_handed_over():
+    async def scenario():
+        controller = AdmissionController(limit=1, budgets=BUDGETS)
+        assert await controller.acquire("normal")
+
+        waiter = asyncio.create_task(controller.acquire("high"))
+        await asyncio.sleep(0)
+        assert controller.waiting == 1
+
+        controller.release()
+        assert await waiter
+        assert controller.in_flight == 1
+
+        controller.release()
+        assert controller.in_flight == 0
+
+    asyncio.run(scenario())
+
+
+def test_low_priority_is_shed_and_normal_times_out():
+    async def scenario():
+        controller = AdmissionController(limit=1, budgets=BUDGETS)
+        assert await controller.acquire("high")
+
+        assert not await controller.acquire("low")
+        assert not await controller.acquire("normal")
+        assert controller.shed == 2
+        assert controller.waiting == 0
+
+        controller.release()
+        assert controller.in_flight == 0
+
+    asyncio.run(scenario())
+
+
+def test_high_priority_waiter_is_served_first():
+    async def scenario():
+        controller = AdmissionController(limit=1, budgets={"high": 1.0, "normal": 1.0, "low": 0.0})
+        assert await controller.acquire("normal")
+
+        order = []
+
+        async def wait(priority):
+            await controller.acquire(priority)
+            order.append(priority)
+
+        tasks = [asyncio.create_task(wait("normal")), asyncio.create_task(wait("high"))]
+        await asyncio.sleep(0)
+        controller.release()
+        await asyncio.sleep(0)
+        controller.release()
+        await asyncio.gather(*tasks)
+
+        assert order == ["high", "normal"]
+
+    asyncio.run(scenario())
+
+
+def test_cancelled_waiter_does_not_leak_slot():
+    async def scenario():
+        controller = AdmissionController(limit=1, budgets=BUDGETS)
+        assert await controller.acquire("high")
+
+        waiter = asyncio.create_task(controller.acquire("high"))
+        await asyncio.sleep(0)
+        waiter.cancel()
+        await asyncio.gather(waiter, return_exceptions=True)
+        assert controller.waiting == 0
+
+        controller.release()
+        assert controller.in_flight == 0
+
+    asyncio.run(scenario())
+
+
+def test_cancelled_after_handover_returns_slot():
+    async def scenario():
+        controller = AdmissionController(limit=1, budgets=BUDGETS)
+        assert await controller.acquire("high")
+
+        waiter = asyncio.create_task(controller.acquire("high"))
+        await asyncio.sleep(0)
+        # Слот передан, но ожидающая задача отменена раньше, чем успела его забрать
+        controller.release()
+        waiter.cancel()
+        await asyncio.gather(waiter, return_exceptions=True)
+
+        assert controller.in_flight == 0
+        assert controller.waiting == 0
+
+    asyncio.run(scenario())
@@ -0,0 +1,115 @@
+import asyncio
+from datetime import datetime, timedelta
+
+import pytest
+from fastapi import HTTPException
+
+from app.api.applications import create_application
+from app.auth.tokens import Principal
+from app.models.application import Application
+from app.models.idempotency import ApplicationIdempotencyKey
+from app.schemas.application import ApplicationCreate
+
+
+def _principal(user):
+    return Principal(id=user.id, email=user.email, role=user.role)
+
+
+def _submit(db, user, internship, key=None):
+    return asyncio.run(create_application(
+        application_data=ApplicationCreate(internship_id=internship.id),
+        idempotency_key=key,
+        current_user=_principal(user),
+        db=db,
+    ))
+
+
+def _count(db, user):
+    return db.query(Application).filter(Application.user_id == user.id).count()
+
+
+def test_application_is_created(db, factory):
+    student, internship = factory.user(), factory.internship()
+
+    application = _submit(db, student, internship)
+
+    assert application.id is not None
+    assert (application.user_id, application.internship_id, application.status) == (student.id, internship.id, "pending")
+
+
+def test_duplicate_without_key_is_rejected(db, factory):
+    student, internship = factory.user(), factory.internship()
+    _submit(db, student, internship)
+
+    with pytest.raises(HTTPException) as error:
+        _submit(db, student, internship)
+
+    assert error.value.status_code == 400
+    assert error.value.detail == "Вы уже подали заявку на эту стажировку"
+    assert _count(db, student) == 1
+
+
+def test_inactive_and_missing_internships(db, factory):
+    student = factory.user()
+
+    with pytest.raises(HTTPException) as error:
+        _submit(db, student, factory.internship(status="draft"))
+    assert (error.value.status_code, error.value.detail) == (400, "Стажировка неактивна")
+
+    missing = factory.internship()
+    db.delete(missing)
+    db.commit()
+    with pytest.raises(HTTPException) as error:
+        _submit(db, student, missing)
+    assert error.value.status_code == 404
+    assert _count(db, student) == 0
+
+
+def test_retry_with_same_key_replays_application(db, factory):
+    student, internship = factory.user(), factory.internship()
+
+    first = _submit(db, student, internship, key="retry-1")
+    second = _submit(db, student, internship, key="retry-1")
+
+    assert second.id == first.id
+    assert _count(db, student) == 1
+
+
+def test_new_key_for_existing_application_is_a_duplicate(db, factory):
+    student, internship = factory.user(), factory.internship()
+    _submit(db, student, internship, key="first")
+
+    with pytest.raises(HTTPException) as error:
+        _submit(db, student, internship, key="second")
+    assert error.value.status_code == 400
+
+
+def test_key_reused_for_another_request_is_rejected(db, factory):
+    student = factory.user()
+    _submit(db, student, factory.internship(), key="reused")
+
+    with pytest.raises(HTTPException) as error:
+        _submit(db, student, factory.internship(), key="reused")
+
+    assert error.value.status_code == 422
+    assert _count(db, student) == 1
+
+
+def test_keys_are_scoped_to_user(db, factory):
+    internship = factory.internship()
+    first, second = factory.user(), factory.user()
+
+    assert _submit(db, first, internship, key="same").id != _submit(db, second, internship, key="same").id
+
+
+def test_expired_key_can_be_reused(db, factory):
+    student = factory.user()
+    _submit(db, student, factory.internship(), key="old")
+    db.query(ApplicationIdempotencyKey).update({"created_at": datetime.now() - timedelta(days=2)})
+    db.commit()
+
+    other = factory.internship()
+    application = _submit(db, student, other, key="old")
+
+    assert application.internship_id == other.id
+    assert _count(db, student) == 2
@@ -0,0 +1,168 @@
+import asyncio
+import json
+import socket
+import threading
+from types import SimpleNamespace
+
+from app.utils import events
+from app.utils.events import RESYNC_EVENT, EventBroker, LocalEventBackend, PostgresNotifyBackend
+
+
+def _transaction():
+    """Сессия, какой ее видит бэкенд: события копятся в info до коммита"""
+    return SimpleNamespace(info={})
+
+
+def _commit(broker, db):
+    broker.backend.flush(db.info.pop("pending_events", []))
+
+
+def _drain(queue):
+    items = []
+    while not queue.empty():
+        items.append(queue.get_nowait())
+    return items
+
+
+def test_events_are_delivered_after_commit():
+    async def scenario():
+        broker = EventBroker(LocalEventBackend())
+        await broker.start()
+        queue = broker.subscribe(1)
+        other = broker.subscribe(2)
+
+        db = _transaction()
+        broker.publish(db, 1, "status_changed", {"application_id": 5, "status": "accepted"})
+        assert queue.empty()
+
+        _commit(broker, db)
+        assert _drain(queue) == [("status_changed", json.dumps({"application_id": 5, "status": "accepted"}))]
+        assert other.empty()
+
+    asyncio.run(scenario())
+
+
+def test_all_connections_of_user_receive_event():
+    async def scenario():
+        broker = EventBroker(LocalEventBackend())
+        await broker.start()
+        tabs = [broker.subscribe(1), broker.subscribe(1)]
+        assert broker.connections == 2
+
+        broker.dispatch(json.dumps({"user_id": 1, "event": "status_changed", "data": {}}))
+        assert [len(_drain(queue)) for queue in tabs] == [1, 1]
+
+        broker.unsubscribe(1, tabs[0])
+        broker.unsubscribe(1, tabs[1])
+        assert broker.connections == 0
+        # Событие без подписчиков просто отбрасывается
+        broker.dispatch(json.dumps({"user_id": 1, "event": "status_changed", "data": {}}))
+
+    asyncio.run(scenario())
+
+
+def test_slow_client_gets_resync():
+    async def scenario():
+        broker = EventBroker(LocalEventBackend(), queue_size=3)
+        await broker.start()
+        queue = broker.subscribe(1)
+
+        for number in range(4):
+            broker.dispatch(json.dumps({"user_id": 1, "event": "status_changed", "data": {"n": number}}))
+
+        assert _drain(queue) == [(RESYNC_EVENT, "{}")]
+
+    asyncio.run(scenario())
+
+
+def test_broadcast_reaches_handler_not_subscribers():
+    async def scenario():
+        broker = EventBroker(LocalEventBackend())
+        await broker.start()
+        queue = broker.subscribe(1)
+        received = []
+        broker.on_broadcast("internship_status", received.append)
+
+        db = _transaction()
+        broker.broadcast(db, "internship_status", {"ids": [1, 2], "status": "expired"})
+        _commit(broker, db)
+
+        assert received == [{"ids": [1, 2], "status": "expired"}]
+        assert queue.empty()
+
+    asyncio.run(scenario())
+
+
+def test_dispatch_from_worker_thread():
+    async def scenario():
+        broker = EventBroker(LocalEventBackend())
+        await broker.start()
+        queue = broker.subscribe(1)
+
+        payload = json.dumps({"user_id": 1, "event": "status_changed", "data": {}})
+        thread = threading.Thread(target=broker.dispatch_threadsafe, args=(payload,))
+        thread.start()
+        thread.join()
+
+        assert await asyncio.wait_for(queue.get(), timeout=1) == ("status_changed", "{}")
+
+    asyncio.run(scenario())
+
+
+class BrokenConnection:
+    """Соединение LISTEN, чтение из которого падает"""
+
+    def __init__(self, sock):
+        self.sock = sock
+        self.notifies = []
+
+    def fileno(self):
+        return self.sock.fileno()
+
+    def poll(self):
+        raise OSError("server closed the connection unexpectedly")
+
+
+class Raw:
+    def __init__(self):
+        self.invalidated = False
+
+    def invalidate(self):
+        self.invalidated = True
+
+
+def test_listen_connection_is_restored_after_poll_failure(monkeypatch):
+    monkeypatch.setattr(events, "RECONNECT_MIN_SECONDS", 0)
+
+    async def scenario():
+        broken_socket, peer = socket.socketpair()
+        fresh_socket, fresh_peer = socket.socketpair()
+        broken_raw, fresh_raw = Raw(), Raw()
+        connections = [(fresh_raw, SimpleNamespace(fileno=fresh_socket.fileno, notifies=[]))]
+
+        backend = PostgresNotifyBackend()
+        monkeypatch.setattr(backend, "_connect", lambda: connections.pop(0))
+        broker = EventBroker(backend)
+        broker._loop = backend._loop = asyncio.get_running_loop()
+        backend.broker = broker
+        backend._watch(broken_raw, BrokenConnection(broken_socket))
+        queue = broker.subscribe(1)
+
+        # Данные на сокете - poll() падает, соединение заменяется
+        peer.send(b"x")
+        for _ in range(100):
+            await asyncio.sleep(0.01)
+            if backend._raw is fresh_raw:
+                break
+
+        assert broken_raw.invalidated
+        assert backend._raw is fresh_raw
+        assert backend._reconnect_task is None
+        assert _drain(queue) == [(RESYNC_EVENT, "{}")]
+
+        await backend.stop()
+        assert fresh_raw.invalidated
+        for sock in (broken_socket, peer, fresh_socket, fresh_peer):
+            sock.close()
+
+    asyncio.run(scenario())
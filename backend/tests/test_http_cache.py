@@ -0,0 +1,28 @@
+from app.utils.http_cache import if_match_satisfied, weak_etag
+
+
+def test_weak_etag_is_stable():
+    assert weak_etag("reference", 1) == weak_etag("reference", 1)
+    assert weak_etag("reference", 1) != weak_etag("reference", 2)
+    assert weak_etag("x").startswith('W/"')
+
+
+def test_if_match_without_condition():
+    etag = weak_etag("application", 1)
+    assert if_match_satisfied(None, etag)
+    assert if_match_satisfied("*", etag)
+    assert if_match_satisfied(" * ", etag)
+
+
+def test_if_match_compares_weak_and_strong_forms():
+    etag = weak_etag("application", 1)
+    strong = etag[2:]
+    assert if_match_satisfied(etag, etag)
+    assert if_match_satisfied(strong, etag)
+    assert if_match_satisfied(f'"other", {strong}', etag)
+
+
+def test_if_match_rejects_other_versions():
+    etag = weak_etag("application", 1)
+    assert not if_match_satisfied(weak_etag("application", 2), etag)
+    assert not if_match_satisfied('"other", W/"another"', etag)
@@ -0,0 +1,115 @@
+import asyncio
+from types import SimpleNamespace
+
+import pytest
+from fastapi import HTTPException
+
+from app.utils import rate_limit
+from app.utils.rate_limit import Limit, MemoryBucketStore
+
+
+class Clock:
+    def __init__(self):
+        self.now = 1000.0
+
+    def __call__(self):
+        return self.now
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    clock = Clock()
+    monkeypatch.setattr(rate_limit.time, "monotonic", clock)
+    return clock
+
+
+def test_burst_then_retry_after(clock):
+    store = MemoryBucketStore()
+    for _ in range(5):
+        assert store.take_now("ip:1", rate=1.0, burst=5) == (True, 0.0)
+
+    allowed, retry_after = store.take_now("ip:1", rate=1.0, burst=5)
+    assert not allowed
+    assert retry_after == pytest.approx(1.0)
+
+
+def test_tokens_refill_up_to_burst(clock):
+    store = MemoryBucketStore()
+    for _ in range(3):
+        store.take_now("ip:1", rate=0.5, burst=3)
+
+    clock.now += 2
+    assert store.take_now("ip:1", rate=0.5, burst=3)[0]
+    assert not store.take_now("ip:1", rate=0.5, burst=3)[0]
+
+    # Долгий простой не накапливает токенов больше burst
+    clock.now += 3600
+    results = [store.take_now("ip:1", rate=0.5, burst=3)[0] for _ in range(4)]
+    assert results == [True, True, True, False]
+
+
+def test_buckets_are_independent(clock):
+    store = MemoryBucketStore()
+    assert store.take_now("ip:1", rate=1.0, burst=1)[0]
+    assert not store.take_now("ip:1", rate=1.0, burst=1)[0]
+    assert store.take_now("ip:2", rate=1.0, burst=1)[0]
+
+
+def test_least_recently_used_buckets_are_evicted(clock):
+    store = MemoryBucketStore(maxsize=2)
+    store.take_now("a", rate=1.0, burst=1)
+    store.take_now("b", rate=1.0, burst=1)
+    store.take_now("c", rate=1.0, burst=1)
+
+    # Вытесненная корзина начинается заново - полной
+    assert store.take_now("a", rate=1.0, burst=1)[0]
+    assert not store.take_now("c", rate=1.0, burst=1)[0]
+
+
+def test_limit_rate_per_second():
+    assert Limit("ip", per_minute=30, burst=10).rate == pytest.approx(0.5)
+
+
+def test_take_all_debits_only_when_every_bucket_allows(clock):
+    store = MemoryBucketStore()
+    buckets = [("ip:1", 1.0, 5), ("account:a", 1.0, 1)]
+    assert store.take_all_now(buckets) == (True, 0.0)
+
+    allowed, retry_after = store.take_all_now(buckets)
+    assert not allowed
+    assert retry_after == pytest.approx(1.0)
+
+    # Отказ по аккаунту не расходует токены IP
+    results = [store.take_now("ip:1", rate=1.0, burst=5)[0] for _ in range(5)]
+    assert results == [True, True, True, True, False]
+
+
+def _request(ip="10.0.0.1"):
+    return SimpleNamespace(headers={}, client=SimpleNamespace(host=ip))
+
+
+def _login(account):
+    return asyncio.run(rate_limit.enforce_rate_limit(_request(), "login", account))
+
+
+def test_throttled_account_does_not_drain_shared_ip(clock, monkeypatch):
+    store = MemoryBucketStore()
+    monkeypatch.setattr(rate_limit, "local_store", store)
+    monkeypatch.setattr(rate_limit, "shared_store", store)
+    monkeypatch.setattr(rate_limit, "LIMITS", {
+        "login": [Limit("ip", per_minute=60, burst=20), Limit("account", per_minute=60, burst=5)],
+    })
+
+    for _ in range(5):
+        _login("a")
+    for _ in range(10):
+        with pytest.raises(HTTPException) as error:
+            _login("a")
+        assert error.value.status_code == 429
+
+    # Другой студент за тем же NAT использует оставшиеся 15 токенов IP
+    for account in ("b", "c", "d"):
+        for _ in range(5):
+            _login(account)
+    with pytest.raises(HTTPException):
+        _login("e")
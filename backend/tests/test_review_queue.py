@@ -0,0 +1,83 @@
+from datetime import datetime, timedelta
+
+from app.models.review_lease import ReviewLease
+from app.utils.review_queue import claim_applications, lease_holder, release_leases, renew_leases
+
+
+def _queue(factory, count, internship=None, start=datetime(2024, 10, 1)):
+    internship = internship or factory.internship()
+    return [
+        factory.application(internship, created_at=start + timedelta(minutes=minute))
+        for minute in range(count)
+    ]
+
+
+def test_oldest_applications_are_claimed_first(db, factory):
+    applications = _queue(factory, 5)
+    reviewer = factory.user("admin")
+
+    claimed, expires_at = claim_applications(db, reviewer.id, limit=3)
+
+    assert claimed == [application.id for application in applications[:3]]
+    assert expires_at > datetime.now()
+    assert all(lease_holder(db, application_id) == reviewer.id for application_id in claimed)
+
+
+def test_reviewers_get_disjoint_applications(db, factory):
+    applications = _queue(factory, 5)
+    first, second = factory.user("admin"), factory.user("admin")
+
+    first_claim, _ = claim_applications(db, first.id, limit=3)
+    second_claim, _ = claim_applications(db, second.id, limit=3)
+
+    assert not set(first_claim) & set(second_claim)
+    assert sorted(first_claim + second_claim) == [application.id for application in applications]
+    assert claim_applications(db, second.id, limit=3)[0] == []
+
+
+def test_only_pending_applications_are_claimed(db, factory):
+    internship = factory.internship()
+    pending = factory.application(internship)
+    factory.application(internship, status="accepted")
+    factory.application(internship, status="reviewed")
+
+    assert claim_applications(db, factory.user("admin").id, limit=10)[0] == [pending.id]
+
+
+def test_claim_filters(db, factory):
+    department = factory.department()
+    wanted = _queue(factory, 2, factory.internship(department=department))
+    _queue(factory, 2)
+    reviewer = factory.user("admin")
+
+    by_department, _ = claim_applications(db, reviewer.id, limit=10, department_id=department.id)
+    assert by_department == [application.id for application in wanted]
+
+    other = _queue(factory, 1)[0]
+    by_internship, _ = claim_applications(db, reviewer.id, limit=10, internship_id=other.internship_id)
+    assert by_internship == [other.id]
+
+
+def test_expired_lease_can_be_claimed_again(db, factory):
+    application = _queue(factory, 1)[0]
+    first, second = factory.user("admin"), factory.user("admin")
+    claim_applications(db, first.id, limit=1)
+
+    db.query(ReviewLease).update({"expires_at": datetime.now() - timedelta(seconds=1)})
+    db.commit()
+
+    assert claim_applications(db, second.id, limit=1)[0] == [application.id]
+    assert lease_holder(db, application.id) == second.id
+
+
+def test_renew_and_release_only_own_leases(db, factory):
+    applications = _queue(factory, 2)
+    first, second = factory.user("admin"), factory.user("admin")
+    claimed, _ = claim_applications(db, first.id, limit=2)
+
+    assert renew_leases(db, second.id, claimed)[0] == []
+    assert sorted(renew_leases(db, first.id, claimed)[0]) == sorted(claimed)
+
+    assert release_leases(db, second.id, claimed) == 0
+    assert release_leases(db, first.id, [applications[0].id]) == 1
+    assert claim_applications(db, second.id, limit=2)[0] == [applications[0].id]
@@ -0,0 +1,50 @@
+import uuid
+
+from app.utils.revocation import BloomFilter, RevocationList
+
+
+def test_bloom_filter_has_no_false_negatives():
+    bloom = BloomFilter(1000, error_rate=0.01)
+    items = [uuid.uuid4().hex for _ in range(1000)]
+    for item in items:
+        bloom.add(item)
+
+    assert all(item in bloom for item in items)
+    assert bloom.count == 1000
+
+
+def test_bloom_filter_false_positive_rate():
+    bloom = BloomFilter(1000, error_rate=0.01)
+    for _ in range(1000):
+        bloom.add(uuid.uuid4().hex)
+
+    false_positives = sum(uuid.uuid4().hex in bloom for _ in range(10000))
+    # При заполнении до capacity доля ложных срабатываний близка к error_rate
+    assert false_positives < 300
+
+
+def _claims(uid=1, jti="jti", fam="fam", iat=1000.0):
+    return {"uid": uid, "jti": jti, "fam": fam, "iat": iat}
+
+
+def test_check_cached_requires_loaded_filter():
+    revocations = RevocationList(capacity=100)
+    assert revocations.check_cached(_claims()) is None
+
+
+def test_check_cached_answers_from_memory():
+    revocations = RevocationList(capacity=100)
+    revocations._loaded = True
+
+    assert revocations.check_cached(_claims()) is False
+
+    revocations.add("user", "event", user_id=1, not_before=1000.0)
+    assert revocations.check_cached(_claims(iat=1000.0)) is True
+    # Токен, выданный после отзыва, действителен
+    assert revocations.check_cached(_claims(iat=1000.5)) is False
+
+    # Срабатывание фильтра подтверждается по БД
+    revocations.add("token", "revoked-jti")
+    assert revocations.check_cached(_claims(uid=2, jti="revoked-jti")) is None
+    revocations.add("family", "revoked-fam")
+    assert revocations.check_cached(_claims(uid=2, fam="revoked-fam")) is None
@@ -0,0 +1,109 @@
+from datetime import date, datetime, timedelta
+
+import pytest
+
+from app.models.analytics import ApplicationRollup, ApplicationStatusChange
+from app.utils.rollups import get_trends, recompute_rollups, week_start
+
+# Понедельник
+MONDAY = date(2024, 10, 7)
+
+
+def _at(day: date, hour: int = 12) -> datetime:
+    return datetime.combine(day, datetime.min.time()) + timedelta(hours=hour)
+
+
+def _decide(db, application, status, changed_at):
+    db.add(ApplicationStatusChange(
+        application_id=application.id, from_status="pending", to_status=status, changed_at=changed_at
+    ))
+    application.status = status
+    db.commit()
+
+
+def _rows(db, granularity, dimension):
+    return {
+        (row.bucket_start, row.dimension_id): row
+        for row in db.query(ApplicationRollup).filter(
+            ApplicationRollup.granularity == granularity,
+            ApplicationRollup.dimension == dimension,
+        )
+    }
+
+
+def _seed(db, factory):
+    first_department = factory.department()
+    second_department = factory.department()
+    python = factory.internship(department=first_department)
+    design = factory.internship(department=second_department)
+
+    applications = [
+        factory.application(python, created_at=_at(MONDAY, 9)),
+        factory.application(python, created_at=_at(MONDAY, 15)),
+        factory.application(design, created_at=_at(MONDAY + timedelta(days=1))),
+    ]
+    _decide(db, applications[0], "accepted", _at(MONDAY, 9) + timedelta(hours=3))
+    _decide(db, applications[2], "rejected", _at(MONDAY + timedelta(days=2), 12))
+    return first_department, second_department
+
+
+def test_daily_rollups(db, factory):
+    first_department, second_department = _seed(db, factory)
+
+    recompute_rollups(db, MONDAY, MONDAY + timedelta(days=6))
+
+    daily = _rows(db, "day", "all")
+    assert daily[(MONDAY, 0)].submitted == 2
+    assert daily[(MONDAY, 0)].accepted == 1
+    assert daily[(MONDAY, 0)].review_count == 1
+    assert daily[(MONDAY, 0)].review_seconds_total == pytest.approx(3 * 3600)
+    assert daily[(MONDAY + timedelta(days=1), 0)].submitted == 1
+    assert daily[(MONDAY + timedelta(days=2), 0)].rejected == 1
+
+    by_department = _rows(db, "day", "department")
+    assert by_department[(MONDAY, first_department.id)].submitted == 2
+    assert by_department[(MONDAY + timedelta(days=1), second_department.id)].submitted == 1
+    assert (MONDAY, second_department.id) not in by_department
+
+
+def test_weekly_rollups_sum_days(db, factory):
+    _seed(db, factory)
+
+    recompute_rollups(db, MONDAY, MONDAY + timedelta(days=6))
+
+    weekly = _rows(db, "week", "all")
+    assert list(weekly) == [(week_start(MONDAY), 0)]
+    week = weekly[(MONDAY, 0)]
+    assert (week.submitted, week.accepted, week.rejected, week.review_count) == (3, 1, 1, 2)
+
+
+def test_recompute_is_idempotent(db, factory):
+    _seed(db, factory)
+
+    first = recompute_rollups(db, MONDAY, MONDAY + timedelta(days=6))
+    second = recompute_rollups(db, MONDAY, MONDAY + timedelta(days=6))
+
+    assert first == second
+    assert db.query(ApplicationRollup).count() == first
+    assert _rows(db, "day", "all")[(MONDAY, 0)].submitted == 2
+
+
+def test_partial_recompute_keeps_week_totals(db, factory):
+    _seed(db, factory)
+    recompute_rollups(db, MONDAY, MONDAY + timedelta(days=6))
+
+    # Пересчет одного дня пересобирает неделю из всех ее дневных строк
+    recompute_rollups(db, MONDAY + timedelta(days=2), MONDAY + timedelta(days=2))
+
+    assert _rows(db, "week", "all")[(MONDAY, 0)].submitted == 3
+
+
+def test_trends_average_review_time(db, factory):
+    _seed(db, factory)
+    recompute_rollups(db, MONDAY, MONDAY + timedelta(days=6))
+
+    trends = get_trends(db, "day", "all", MONDAY, MONDAY + timedelta(days=6))
+
+    assert [row["bucket"] for row in trends] == [MONDAY, MONDAY + timedelta(days=1), MONDAY + timedelta(days=2)]
+    assert trends[0]["avg_review_hours"] == 3.0
+    assert trends[1]["avg_review_hours"] is None
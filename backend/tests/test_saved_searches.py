@@ -0,0 +1,81 @@
+import random
+from types import SimpleNamespace
+
+from app.utils.saved_searches import CompiledSearch, Posting, SavedSearchIndex
+
+WORDS = ["python", "java", "аналитик", "backend", "data", "ml", "design", "qa", "devops", "го"]
+
+
+def _row(search_id, search=None, campus_id=None, department_id=None, tag_ids=None, tag_mode="and"):
+    return SimpleNamespace(
+        id=search_id, search=search, campus_id=campus_id,
+        department_id=department_id, tag_ids=tag_ids, tag_mode=tag_mode,
+    )
+
+
+def _random_row(rng, search_id):
+    return _row(
+        search_id,
+        search=rng.choice([None, "", rng.choice(WORDS), rng.choice(WORDS)[:2], " ".join(rng.sample(WORDS, 2))]),
+        campus_id=rng.choice([None, 1, 2, 3]),
+        department_id=rng.choice([None, None, 10, 11, 12]),
+        tag_ids=rng.sample(range(1, 9), rng.randint(0, 3)) or None,
+        tag_mode=rng.choice(["and", "or"]),
+    )
+
+
+def _random_posting(rng, posting_id):
+    return Posting.create(
+        posting_id,
+        rng.choice([None, 1, 2, 3]),
+        rng.choice([None, 10, 11, 12]),
+        rng.sample(range(1, 9), rng.randint(0, 4)),
+        " ".join(rng.sample(WORDS, 3)).title(),
+        " ".join(rng.sample(WORDS, 4)),
+        None,
+    )
+
+
+def _brute_force(rows, posting):
+    return {row.id for row in rows if CompiledSearch.from_row(row).matches(posting)}
+
+
+def test_index_matches_brute_force():
+    rng = random.Random(20240901)
+    rows = [_random_row(rng, search_id) for search_id in range(1, 3001)]
+    index = SavedSearchIndex()
+    for row in rows:
+        index.add(row)
+
+    for posting_id in range(200):
+        posting = _random_posting(rng, posting_id)
+        assert set(index.match(posting)) == _brute_force(rows, posting)
+
+
+def test_removed_and_replaced_searches():
+    index = SavedSearchIndex()
+    index.add(_row(1, search="python"))
+    index.add(_row(2, tag_ids=[5], tag_mode="or"))
+    posting = Posting.create(1, None, None, [5], "Python developer")
+    assert sorted(index.match(posting)) == [1, 2]
+
+    index.remove(2)
+    assert index.match(posting) == [1]
+
+    # Повторное добавление с тем же id заменяет условия поиска
+    index.add(_row(1, search="java"))
+    assert index.match(posting) == []
+    assert len(index) == 1
+
+
+def test_search_conditions():
+    posting = Posting.create(1, 1, 10, [1, 2], "Junior Python", "Работа с данными", None)
+
+    assert CompiledSearch.from_row(_row(1)).matches(posting)
+    assert CompiledSearch.from_row(_row(1, search="  PYTHON ")).matches(posting)
+    assert CompiledSearch.from_row(_row(1, search="данн")).matches(posting)
+    assert not CompiledSearch.from_row(_row(1, campus_id=2)).matches(posting)
+    assert CompiledSearch.from_row(_row(1, tag_ids=[1, 2])).matches(posting)
+    assert not CompiledSearch.from_row(_row(1, tag_ids=[1, 3])).matches(posting)
+    assert CompiledSearch.from_row(_row(1, tag_ids=[1, 3], tag_mode="or")).matches(posting)
+    assert not CompiledSearch.from_row(_row(1, tag_ids=[3, 4], tag_mode="or")).matches(posting)
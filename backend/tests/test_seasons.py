@@ -0,0 +1,35 @@
+from datetime import datetime
+
+import pytest
+from fastapi import HTTPException
+
+from app.utils import seasons
+from app.utils.seasons import season_bounds, season_label, season_of, selected_season
+
+
+def test_season_starts_on_september_first():
+    assert season_of(datetime(2024, 8, 31, 23, 59, 59)) == 2023
+    assert season_of(datetime(2024, 9, 1)) == 2024
+    assert season_of(datetime(2025, 1, 15)) == 2024
+
+
+def test_season_bounds_are_half_open():
+    start, end = season_bounds(2024)
+    assert start == datetime(2024, 9, 1)
+    assert end == datetime(2025, 9, 1)
+    assert season_of(start) == 2024
+    assert season_of(end) == 2025
+
+
+def test_season_label():
+    assert season_label(2024) == "2024/2025"
+
+
+def test_selected_season(monkeypatch):
+    monkeypatch.setattr(seasons, "current_season", lambda: 2024)
+
+    assert selected_season(None) == 2024
+    assert selected_season(2020) == 2020
+    with pytest.raises(HTTPException) as error:
+        selected_season(2025)
+    assert error.value.status_code == 400
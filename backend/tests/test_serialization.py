@@ -0,0 +1,97 @@
+from datetime import datetime, timezone
+from decimal import Decimal
+from types import SimpleNamespace
+from typing import List, Optional
+
+import pytest
+from pydantic import BaseModel, ConfigDict, Field, computed_field, field_validator
+
+from app.utils import serialization
+from app.utils.serialization import item_response, list_response
+
+
+class TagResponse(BaseModel):
+    model_config = ConfigDict(from_attributes=True)
+
+    id: int
+    name: str
+
+
+class StudentResponse(BaseModel):
+    model_config = ConfigDict(from_attributes=True)
+
+    id: int
+    first_name: str
+    last_name: str
+
+    @computed_field
+    @property
+    def full_name(self) -> str:
+        return f"{self.last_name} {self.first_name}"
+
+
+class InternshipResponse(BaseModel):
+    model_config = ConfigDict(from_attributes=True)
+
+    id: int
+    title: str
+    salary: Optional[Decimal]
+    rating: float
+    status: str
+    created_at: datetime
+    published_at: Optional[datetime]
+    tags: List[TagResponse]
+    owner: Optional[StudentResponse]
+    external_id: int = Field(serialization_alias="externalId")
+
+    @field_validator("title")
+    @classmethod
+    def strip_title(cls, value: str) -> str:
+        return value.strip()
+
+
+def _internship(internship_id: int, **overrides):
+    values = dict(
+        id=internship_id,
+        title="  Стажировка Python  ",
+        salary=Decimal("45000.50"),
+        rating=4.5,
+        status="active",
+        created_at=datetime(2024, 9, 1, 10, 30, 15, 123456),
+        published_at=datetime(2024, 9, 2, tzinfo=timezone.utc),
+        tags=[SimpleNamespace(id=1, name="backend"), SimpleNamespace(id=2, name="данные")],
+        owner=SimpleNamespace(id=7, first_name="Иван", last_name="Петров"),
+        external_id=internship_id * 10,
+    )
+    values.update(overrides)
+    return SimpleNamespace(**values)
+
+
+ROWS = [
+    _internship(1),
+    _internship(2, salary=None, published_at=None, owner=None, tags=[]),
+]
+
+
+def _body(build, strict: bool, monkeypatch) -> bytes:
+    monkeypatch.setattr(serialization, "STRICT_RESPONSE_VALIDATION", strict)
+    return build().body
+
+
+@pytest.mark.parametrize("build", [
+    lambda: list_response(ROWS, InternshipResponse),
+    lambda: item_response(ROWS[0], InternshipResponse),
+    lambda: list_response([row.tags[0] for row in ROWS[:1]], TagResponse),
+], ids=["list", "item", "plain"])
+def test_fast_path_matches_strict_validation(build, monkeypatch):
+    assert _body(build, False, monkeypatch) == _body(build, True, monkeypatch)
+
+
+def test_fast_path_keeps_schema_logic(monkeypatch):
+    monkeypatch.setattr(serialization, "STRICT_RESPONSE_VALIDATION", False)
+    body = list_response(ROWS[:1], InternshipResponse).body.decode()
+
+    assert '"title":"Стажировка Python"' in body
+    assert '"salary":"45000.50"' in body
+    assert '"full_name":"Петров Иван"' in body
+    assert '"externalId":10' in body
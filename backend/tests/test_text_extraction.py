@@ -0,0 +1,63 @@
+import io
+import zipfile
+
+import pytest
+
+from app.utils import text_extraction
+from app.utils.text_extraction import UnsupportedDocument, extract_text
+
+DOCX_TYPE = "application/vnd.openxmlformats-officedocument.wordprocessingml.document"
+WORD_NS = "http://schemas.openxmlformats.org/wordprocessingml/2006/main"
+
+
+def _docx(*paragraphs: str) -> bytes:
+    body = "".join(
+        "<w:p>" + "<w:tab/>".join(f"<w:r><w:t>{part}</w:t></w:r>" for part in paragraph.split("\t")) + "</w:p>"
+        for paragraph in paragraphs
+    )
+    document = f'<?xml version="1.0" encoding="UTF-8"?><w:document xmlns:w="{WORD_NS}"><w:body>{body}</w:body></w:document>'
+    buffer = io.BytesIO()
+    with zipfile.ZipFile(buffer, "w") as archive:
+        archive.writestr("word/document.xml", document)
+    return buffer.getvalue()
+
+
+def test_docx_paragraphs_and_tabs():
+    content = _docx("Иван Петров", "Навыки:\tPython, SQL", "")
+    assert extract_text(content, DOCX_TYPE) == "Иван Петров\nНавыки: Python, SQL"
+
+
+def test_type_detected_by_extension():
+    assert extract_text(_docx("Резюме"), "application/octet-stream", "cv.DOCX") == "Резюме"
+
+
+def test_docx_size_limit(monkeypatch):
+    monkeypatch.setattr(text_extraction, "MAX_DOCX_XML_BYTES", 10)
+    with pytest.raises(UnsupportedDocument):
+        extract_text(_docx("Слишком длинный документ"), DOCX_TYPE)
+
+
+def test_doc_utf16_runs():
+    content = b"\x00\x01binary" + "Опыт работы Python".encode("utf-16-le") + b"\xff\xfe\x00"
+    assert "Опыт работы Python" in extract_text(content, "application/msword")
+
+
+def test_doc_ascii_fallback():
+    content = b"\x00\x01\x02Experienced developer\x00\x03"
+    assert extract_text(content, None, "old.doc") == "Experienced developer"
+
+
+def test_text_is_normalized_and_truncated(monkeypatch):
+    monkeypatch.setattr(text_extraction, "MAX_TEXT_CHARS", 5)
+    assert extract_text(_docx("  a   b  ", "", "cdef"), DOCX_TYPE) == "a b\nc"
+
+
+def test_unsupported_type():
+    with pytest.raises(UnsupportedDocument):
+        extract_text(b"GIF89a", "image/gif", "photo.gif")
+
+
+@pytest.mark.skipif(text_extraction.PdfReader is not None, reason="pypdf установлен")
+def test_pdf_requires_pypdf():
+    with pytest.raises(UnsupportedDocument):
+        extract_text(b"%PDF-1.4", "application/pdf")
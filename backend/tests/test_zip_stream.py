@@ -0,0 +1,80 @@
+import io
+import zipfile
+from datetime import datetime
+
+from app.utils import zip_stream
+from app.utils.zip_stream import ZipEntry, stream_zip, unique_arcname
+
+
+def _entry(name, content: bytes, **kwargs):
+    return ZipEntry(arcname=name, open=lambda: io.BytesIO(content), size=len(content), **kwargs)
+
+
+def _missing(name):
+    def open_missing():
+        raise FileNotFoundError(name)
+    return ZipEntry(arcname=name, open=open_missing)
+
+
+def test_archive_round_trip():
+    entries = [
+        _entry("1_Петров_Иван/resume_cv.pdf", b"%PDF" + b"x" * 1000, modified=datetime(2024, 9, 1, 12, 0)),
+        _entry("1_Петров_Иван/portfolio.docx", b"PK" + b"y" * 10),
+    ]
+    archive = zipfile.ZipFile(io.BytesIO(b"".join(stream_zip(entries))))
+
+    assert archive.testzip() is None
+    assert archive.namelist() == [entry.arcname for entry in entries]
+    assert archive.read("1_Петров_Иван/resume_cv.pdf") == b"%PDF" + b"x" * 1000
+    info = archive.getinfo("1_Петров_Иван/resume_cv.pdf")
+    assert info.compress_type == zipfile.ZIP_STORED
+    assert info.date_time == (2024, 9, 1, 12, 0, 0)
+
+
+def test_archive_is_streamed_lazily(monkeypatch):
+    monkeypatch.setattr(zip_stream, "CHUNK_SIZE", 16)
+    opened = []
+
+    def entry(name):
+        def open_file():
+            opened.append(name)
+            return io.BytesIO(b"z" * 100)
+        return ZipEntry(arcname=name, open=open_file, size=100)
+
+    chunks = stream_zip(entry(f"file{i}.pdf") for i in range(3))
+    first = next(chunks)
+
+    # Первые байты отданы до того, как открыты остальные файлы
+    assert first
+    assert opened == ["file0.pdf"]
+    rest = list(chunks)
+    assert len(rest) > 3
+    assert opened == ["file0.pdf", "file1.pdf", "file2.pdf"]
+    assert zipfile.ZipFile(io.BytesIO(first + b"".join(rest))).testzip() is None
+
+
+def test_missing_files_are_listed():
+    entries = [_missing("a/resume.pdf"), _entry("a/cover.pdf", b"ok"), _missing("b/resume.pdf")]
+    archive = zipfile.ZipFile(io.BytesIO(b"".join(stream_zip(entries))))
+
+    assert archive.namelist() == ["a/cover.pdf", "_missing.txt"]
+    assert archive.read("_missing.txt") == b"a/resume.pdf\nb/resume.pdf\n"
+
+
+def test_empty_archive():
+    archive = zipfile.ZipFile(io.BytesIO(b"".join(stream_zip([]))))
+    assert archive.namelist() == []
+
+
+def test_dates_before_1980_are_clamped():
+    data = b"".join(stream_zip([_entry("old.pdf", b"x", modified=datetime(1970, 1, 1))]))
+    assert zipfile.ZipFile(io.BytesIO(data)).getinfo("old.pdf").date_time == (1980, 1, 1, 0, 0, 0)
+
+
+def test_unique_arcname():
+    used = set()
+    assert unique_arcname("resume.pdf", used) == "resume.pdf"
+    assert unique_arcname("resume.pdf", used) == "resume (2).pdf"
+    assert unique_arcname("resume.pdf", used) == "resume (3).pdf"
+    assert unique_arcname("README", used) == "README"
+    assert unique_arcname("README", used) == "README (2)"